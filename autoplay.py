@@ -0,0 +1,185 @@
+"""Autoplayer for soak testing and balance checks
+
+Every frame the AutoPlayer copies the World into scratch Worlds
+(World.copy_to()) and plays plans in them with the real World.step()
+rules. A plan is HORIZON frames of inputs made of SEGMENT frame long
+pieces of doing nothing, jumping, crawling or dropping from a jump.
+It first checks the rest of the plan it picked last frame, if an egg
+hits it a depth first search (doing nothing first) looks for a plan no
+egg hits, or the least bad one found before the time budget runs out.
+Only the plan's first frame of input is sent to the real game.
+
+Eggs that haven't spawned yet can't be seen, the scratch World uses
+its own random numbers.
+
+Watch it play with:
+    python main.py --autoplay
+or play games headless and print how long each character survives:
+    python autoplay.py --games 20
+"""
+
+import time
+import argparse
+
+from world import (World, GROUND_Y, INPUT_JUMP, INPUT_DOWN, INPUT_DROP,
+                   SPAWN_RULES)
+
+HORIZON = 40  # frames looked ahead, a jump takes 34
+SEGMENT = 4  # frames between choices in a plan
+BUDGET = 0.002  # seconds of looking ahead per frame
+
+NOTHING = 0
+JUMP = INPUT_JUMP
+CRAWL = INPUT_DOWN
+DROP = INPUT_DROP | INPUT_DOWN  # drop from a jump and crawl when landing
+
+# what can be done in a segment, doing nothing first. Jumping and
+# crawling only do something on the ground, dropping only in the air
+GROUND_ACTIONS = [NOTHING, JUMP, CRAWL]
+AIR_ACTIONS = [NOTHING, DROP]
+
+NO_HITS = (False, False, 0)  # cost of a plan that isn't hit
+
+
+def get_segment(action):
+    """input bits for each frame of a segment, INPUT_DROP is only sent
+    on the first frame like pressing [down_arrow]"""
+    return [action] + [action & ~INPUT_DROP] * (SEGMENT - 1)
+
+
+class AutoPlayer:
+    """Picks World.step() inputs by looking ahead, get_inputs() once per
+    step. Keeps counts of how much looking ahead it did"""
+
+    def __init__(self, budget=BUDGET, horizon=HORIZON):
+        self.budget = budget
+        self.depth = horizon // SEGMENT  # segments in a plan
+        self.horizon = self.depth * SEGMENT
+        # worlds[i] is the game after i segments of the plan being tried
+        self.worlds = [World() for _ in range(self.depth + 1)]
+        self.plan = []  # inputs for the next frames
+        self.deadline = 0.0
+        self.best = None  # (cost, inputs) of the least bad plan found
+        self.rollouts = 0
+        self.out_of_time = 0  # decisions that ran out of time searching
+        self.times = []  # seconds each decision took
+
+    def play(self, world, inputs, start):
+        """Step `world` with each of `inputs`, plan frame `start` is the
+        first one. Returns the cost (lower is better, NO_HITS if the
+        player isn't hit) or None if time ran out"""
+        self.rollouts += 1
+        for i, frame_inputs in enumerate(inputs):
+            if time.perf_counter() > self.deadline:
+                return None
+            for event in world.step(frame_inputs):
+                if event.kind == "damage" or event.kind == "shield_break":
+                    # dying is worst, then getting hit sooner
+                    return world.dead, True, -(start + i)
+        return NO_HITS
+
+    def search(self, depth, path):
+        """Depth first search for a plan (appended to `path`) that isn't
+        hit, starting from self.worlds[depth]. Returns True if it finds
+        one, keeps the least bad plan in self.best otherwise"""
+        if depth == self.depth:
+            return True
+        world = self.worlds[depth]
+        child = self.worlds[depth + 1]
+        on_ground = world.player_rect.bottom >= GROUND_Y
+        for action in GROUND_ACTIONS if on_ground else AIR_ACTIONS:
+            world.copy_to(child)
+            inputs = get_segment(action)
+            cost = self.play(child, inputs, depth * SEGMENT)
+            if cost is None:
+                return False
+            path.extend(inputs)
+            if cost == NO_HITS:
+                if self.search(depth + 1, path):
+                    return True
+            elif self.best is None or cost < self.best[0]:
+                self.best = (cost, list(path))
+            del path[-SEGMENT:]
+            if time.perf_counter() > self.deadline:
+                return False
+        return False
+
+    def get_inputs(self, world):
+        """input bits for the next World.step()"""
+        start_time = time.perf_counter()
+        self.deadline = start_time + self.budget
+        # keep following the last plan if nothing hits it
+        plan = self.plan[1:]
+        plan += [NOTHING] * (self.horizon - len(plan))
+        world.copy_to(self.worlds[0])
+        cost = self.play(self.worlds[0], plan, 0)
+        if cost != NO_HITS:
+            self.best = None if cost is None else (cost, plan)
+            world.copy_to(self.worlds[0])
+            path = []
+            if self.search(0, path):
+                plan = path
+            else:
+                if time.perf_counter() > self.deadline:
+                    self.out_of_time += 1
+                if self.best is not None:
+                    plan = self.best[1]
+                    plan += [NOTHING] * (self.horizon - len(plan))
+        self.plan = plan
+
+        self.times.append(time.perf_counter() - start_time)
+        return plan[0]
+
+
+def get_percentile(values, percent):
+    values = sorted(values)
+    return values[min(len(values) - 1, len(values) * percent // 100)]
+
+
+def play_games(character, games, max_frames, budget):
+    """play `games` games headless, returns (frames survived per game,
+    the AutoPlayer)"""
+    player = AutoPlayer(budget)
+    survived = []
+    for game in range(games):
+        world = World(character, seed=game)
+        while not world.dead and world.frame < max_frames:
+            world.step(player.get_inputs(world))
+        survived.append(world.frame)
+    return survived, player
+
+
+def main(games, max_frames, budget):
+    phase_4 = SPAWN_RULES.phases[-1].start
+    print(f"{games} games per character, up to {max_frames} frames, "
+          f"{budget * 1000:g} ms budget, {HORIZON} frame horizon")
+    print("character  decisions/s  ms avg  ms p99  over budget  out of time"
+          "  frames p10/p50/p90  phase 4  survived")
+    for character in (1, 2, 3):
+        survived, player = play_games(character, games, max_frames, budget)
+        times = player.times
+        decisions = len(times)
+        over = sum(elapsed > budget for elapsed in times)
+        print(f"{character:>9} {decisions / sum(times):>12,.0f} "
+              f"{sum(times) / decisions * 1000:>7.3f} "
+              f"{get_percentile(times, 99) * 1000:>7.2f} "
+              f"{over / decisions:>12.2%} "
+              f"{player.out_of_time / decisions:>12.2%} "
+              f"{get_percentile(survived, 10):>7}/"
+              f"{get_percentile(survived, 50)}/"
+              f"{get_percentile(survived, 90)}"
+              f"{sum(f >= phase_4 for f in survived) / games:>9.0%}"
+              f"{sum(f >= max_frames for f in survived) / games:>10.0%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="play Egg Jump headless with the autoplayer")
+    parser.add_argument("--games", type=int, default=10,
+                        help="games played with each character")
+    parser.add_argument("--max-frames", type=int, default=3 * 60 * 60,
+                        help="stop a game that lasts this many frames")
+    parser.add_argument("--budget", type=float, default=BUDGET * 1000,
+                        help="milliseconds of looking ahead per frame")
+    args = parser.parse_args()
+    main(args.games, args.max_frames, args.budget / 1000)
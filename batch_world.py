@@ -0,0 +1,508 @@
+"""Batched Egg Jump simulator using NumPy
+
+Runs many games at the same time by storing every game's state in
+arrays (one row per game) and advancing all of them at once, instead of
+looping over Egg objects like world.World does. Used for difficulty
+tuning where we need the results of a very large number of games.
+
+The rules are the same as world.py, frame for frame: every game always
+has exactly 4 eggs (one is spawned each time one leaves the screen), so
+eggs are stored in (games, 4) arrays kept in the same order as
+World.eggs. A game that dies is restarted automatically with the same
+character and its final score is returned by step().
+
+Pixel perfect collisions use the same masks as World: for every player
+pose and egg type, Mask.convolve() gives which offsets between the two
+make their pixels overlap, and eggs whose rects overlap the player's
+are looked up in that table.
+"""
+
+import numpy as np
+import pygame
+
+from world import (MIN_EGG_DIST, GROUND_Y, GRAVITY, SMALL_SCALE,
+                   INPUT_JUMP, INPUT_DOWN, INPUT_DROP, SPAWN_RULES,
+                   DEFAULT_MAX_POWER_UP_VAL, get_egg_size, get_egg_lift,
+                   get_power_up_size, get_player_size, get_power_up_wait,
+                   get_player_mask, get_egg_mask)
+
+# egg types, same order as the names in EGG_TYPES
+NORMAL, FRIED, FLYING, FLYING2 = range(4)
+EGG_TYPES = ["normal", "fried", "flying", "flying2"]
+EGG_WIDTH = np.array([get_egg_size[name][0] for name in EGG_TYPES])
+EGG_HEIGHT = np.array([get_egg_size[name][1] for name in EGG_TYPES])
+# flying eggs float above the ground
+EGG_TOP = np.array([GROUND_Y - get_egg_lift[name] - get_egg_size[name][1]
+                    for name in EGG_TYPES])
+
+# power up types, 0 means the player has no power up
+NO_POWER_UP, HEALTH, SHIELD, FLY, SMALL = range(5)
+POWER_UP_TYPES = ["", "health", "shield", "fly", "small"]
+POWER_UP_WIDTH = np.array([0] + [get_power_up_size[name][0]
+                                 for name in POWER_UP_TYPES[1:]])
+POWER_UP_HEIGHT = np.array([0] + [get_power_up_size[name][1]
+                                  for name in POWER_UP_TYPES[1:]])
+
+# player poses, sizes are indexed by [is_small, pose]
+WALK, WALK2, JUMP, CRAWL, CRAWL2, FLY_POSE = range(6)
+POSES = ["walk", "walk2", "jump", "crawl", "crawl2", "fly"]
+PLAYER_WIDTH = np.array([[get_player_size[pose][0] for pose in POSES],
+                         [int(get_player_size[pose][0] * SMALL_SCALE)
+                          for pose in POSES]])
+PLAYER_HEIGHT = np.array([[get_player_size[pose][1] for pose in POSES],
+                          [int(get_player_size[pose][1] * SMALL_SCALE)
+                           for pose in POSES]])
+MAX_EGG_WIDTH = int(EGG_WIDTH.max())
+MAX_EGG_HEIGHT = int(EGG_HEIGHT.max())
+
+
+def get_hit_table():
+    """[is_small, pose, egg type, x, y] is True if the egg's pixels
+    overlap the player's when the egg's top left corner is at
+    (x - MAX_EGG_WIDTH + 1, y - MAX_EGG_HEIGHT + 1) from the player's"""
+    table = np.zeros((2, len(POSES), len(EGG_TYPES),
+                      MAX_EGG_WIDTH + PLAYER_WIDTH.max() - 1,
+                      MAX_EGG_HEIGHT + PLAYER_HEIGHT.max() - 1), dtype=bool)
+    for is_small in (0, 1):
+        for pose, pose_name in enumerate(POSES):
+            player_mask = get_player_mask[(pose_name, bool(is_small))]
+            for egg_type, egg_name in enumerate(EGG_TYPES):
+                egg_mask = get_egg_mask[egg_name]
+                # bit (x, y) is set if the egg overlaps with its bottom
+                # right corner at (x, y), so its left at x - width + 1
+                hits = player_mask.convolve(egg_mask)
+                width, height = hits.get_size()
+                left = MAX_EGG_WIDTH - EGG_WIDTH[egg_type]
+                top = MAX_EGG_HEIGHT - EGG_HEIGHT[egg_type]
+                table[is_small, pose, egg_type,
+                      left:left + width, top:top + height] = (
+                    pygame.surfarray.array_red(hits.to_surface()) > 0)
+    return table
+
+
+HIT_TABLE = get_hit_table()
+
+
+def get_max_power_up_table():
+    """max power up values indexed by [character, power up type],
+    includes the bonus each character gets"""
+    table = np.zeros((4, 5))
+    for character in (1, 2, 3):
+        for index, name in enumerate(POWER_UP_TYPES[1:], start=1):
+            table[character, index] = DEFAULT_MAX_POWER_UP_VAL[name]
+    table[1, HEALTH] *= 3
+    table[2, SHIELD] *= 2
+    table[3, FLY] *= 2
+    table[3, SMALL] *= 2
+    return table
+
+
+MAX_POWER_UP_VAL = get_max_power_up_table()
+START_HP = np.array([0, 100, 30, 50])
+START_SHIELD = np.array([0, 5, 25, 0])
+
+
+def round_like_rect(values):
+    """pygame.Rect rounds floats half away from zero when assigned"""
+    return np.trunc(values + np.copysign(0.5, values)).astype(np.int64)
+
+
+# the spawn rules of world.py as arrays, one entry per phase
+PHASE_STARTS = np.array([phase.start for phase in SPAWN_RULES.phases])
+
+
+def get_phase_arrays(phase):
+    """arrays of a Phase's rules, indexed by its egg rule number"""
+    eggs = phase.eggs
+    return {"type": np.array([EGG_TYPES.index(egg.type) for egg in eggs]),
+            "prob": np.array(phase.table.prob),
+            "alias": np.array(phase.table.alias),
+            "gap_low": np.array([egg.gap[0] for egg in eggs]),
+            "gap_high": np.array([egg.gap[1] for egg in eggs]),
+            "far_low": np.array([egg.far[0] for egg in eggs]),
+            "far_high": np.array([egg.far[1] for egg in eggs])}
+
+
+PHASE_ARRAYS = [get_phase_arrays(phase) for phase in SPAWN_RULES.phases]
+
+
+def get_phase(frames):
+    """Vectorized world.get_phase()"""
+    return np.searchsorted(PHASE_STARTS, frames, side="right")
+
+
+def get_obstacle_speed(frames):
+    """Vectorized world.get_obstacle_speed()"""
+    curve = SPAWN_RULES.speed
+    frames = frames.astype(np.float64)
+    linear = (frames * (curve.fastest - curve.slowest) / curve.ramp_frames
+              + curve.slowest)
+    # np.maximum avoids log2(0) warnings for the frames that use linear
+    logarithmic = curve.fastest + curve.log_scale * np.log2(
+        np.maximum(frames, 1) / curve.ramp_frames)
+    return np.where(frames < curve.ramp_frames, linear, logarithmic)
+
+
+def get_eggs(rng, prev_loc, frames):
+    """Vectorized world.get_egg(), returns the (left, type, visible)
+    arrays of one new egg per entry of prev_loc/frames, random numbers
+    are drawn in the same order as world.get_egg()"""
+    count = len(frames)
+    phase = get_phase(frames)
+    rule = np.zeros(count, dtype=np.int64)
+    egg_type = np.zeros(count, dtype=np.int64)
+    visible = np.ones(count, dtype=bool)
+    gap_low = np.zeros(count, dtype=np.int64)
+    gap_high = np.zeros(count, dtype=np.int64)
+    far_low = np.zeros(count, dtype=np.int64)
+    far_high = np.zeros(count, dtype=np.int64)
+    for phase_rules, arrays in zip(SPAWN_RULES.phases, PHASE_ARRAYS):
+        pick = np.flatnonzero(phase == phase_rules.number)
+        if len(pick) == 0:
+            continue
+        # pick egg types with the alias method like AliasTable.sample()
+        if len(phase_rules.eggs) > 1:
+            column = rng.random(len(pick)) * len(phase_rules.eggs)
+            i = column.astype(np.int64)
+            rule[pick] = np.where(column - i < arrays["prob"][i], i,
+                                  arrays["alias"][i])
+        # chance the egg slowly turns invisible
+        if phase_rules.invisible_chance:
+            visible[pick] = (rng.random(len(pick)) >=
+                             phase_rules.invisible_chance)
+        chosen = rule[pick]
+        egg_type[pick] = arrays["type"][chosen]
+        gap_low[pick] = arrays["gap_low"][chosen]
+        gap_high[pick] = arrays["gap_high"][chosen]
+        far_low[pick] = arrays["far_low"][chosen]
+        far_high[pick] = arrays["far_high"][chosen]
+
+    # gap to the previous egg and the minimum spawn location
+    gap = rng.integers(gap_low, gap_high + 1, size=count)
+    far = rng.integers(far_low, far_high + 1, size=count)
+
+    left = np.maximum(MIN_EGG_DIST + prev_loc + gap, far)
+    return left, egg_type, visible
+
+
+def get_power_up_waits(rng, count):
+    """Vectorized world.get_power_up_wait() of `count` rng.random()
+    numbers, exactly the same numbers as World"""
+    return np.array([get_power_up_wait(number)
+                     for number in rng.random(count).tolist()],
+                    dtype=np.int64)
+
+
+class BatchWorld:
+    """N games of Egg Jump stepped together
+
+    All attributes are arrays with one entry (or row) per game, so
+    batch.player_hp[i] is the HP of game i.
+
+    rng needs integers(low, high, size) and random(size) methods like
+    numpy.random.Generator, where high is exclusive."""
+
+    EGGS = 4  # every game always has this many eggs
+    POWER_UP_SLOTS = 8  # power ups on screen at once (usually 0 or 1)
+
+    def __init__(self, games, characters=1, rng=None):
+        self.games = games
+        self.rng = np.random.default_rng() if rng is None else rng
+        self.character = np.zeros(games, dtype=np.int64)
+        self.character[:] = characters
+
+        self.frame = np.zeros(games, dtype=np.int64)
+        self.jump_start_speed = np.zeros(games)
+        self.players_fall_speed = np.zeros(games)
+        self.player_is_small = np.zeros(games, dtype=bool)
+        self.player_pose = np.zeros(games, dtype=np.int64)
+        self.player_x = np.zeros(games, dtype=np.int64)
+        self.player_y = np.zeros(games, dtype=np.int64)
+        self.player_hp = np.zeros(games)
+        self.player_shield = np.zeros(games)
+        self.power_up_type = np.zeros(games, dtype=np.int64)
+        self.power_up_value = np.zeros(games, dtype=np.int64)
+        self.next_power_up = np.zeros(games, dtype=np.int64)
+
+        shape = (games, self.EGGS)
+        self.egg_x = np.zeros(shape, dtype=np.int64)
+        self.egg_type = np.zeros(shape, dtype=np.int64)
+        self.egg_destroyed = np.zeros(shape, dtype=bool)
+        self.egg_visible = np.ones(shape, dtype=bool)
+
+        shape = (games, self.POWER_UP_SLOTS)
+        self.item_active = np.zeros(shape, dtype=bool)
+        self.item_x = np.zeros(shape, dtype=np.int64)
+        self.item_type = np.zeros(shape, dtype=np.int64)
+        self.item_value = np.zeros(shape, dtype=np.int64)
+
+        self.reset(np.ones(games, dtype=bool))
+
+    @property
+    def score(self):
+        return self.frame // 4
+
+    def reset(self, mask):
+        """Restart the games selected by the boolean mask"""
+        games = np.flatnonzero(mask)
+        if len(games) == 0:
+            return
+        character = self.character[games]
+        self.frame[games] = 0
+        self.jump_start_speed[games] = -17
+        self.players_fall_speed[games] = 0
+        self.player_is_small[games] = False
+        self.player_pose[games] = WALK
+        self.player_x[games] = 25
+        self.player_y[games] = GROUND_Y - PLAYER_HEIGHT[0, WALK]
+        self.player_hp[games] = START_HP[character]
+        self.player_shield[games] = START_SHIELD[character]
+        self.power_up_type[games] = NO_POWER_UP
+        self.power_up_value[games] = 0
+        self.item_active[games] = False
+
+        # spawn phase 1 eggs and space them out
+        frames = self.frame[games]
+        prev_loc = np.full(len(games), 800)
+        for slot in range(self.EGGS):
+            self.spawn_eggs(games, slot, prev_loc, frames)
+            prev_loc = self.egg_x[games, slot] + EGG_WIDTH[
+                self.egg_type[games, slot]]
+        # frame the first power up spawns on
+        self.next_power_up[games] = get_power_up_waits(self.rng, len(games))
+
+    def spawn_eggs(self, games, slot, prev_loc, frames):
+        """write a new egg from get_eggs() into `slot` of each game in
+        `games`"""
+        left, egg_type, visible = get_eggs(self.rng, prev_loc, frames)
+        self.egg_x[games, slot] = left
+        self.egg_type[games, slot] = egg_type
+        self.egg_destroyed[games, slot] = False
+        self.egg_visible[games, slot] = visible
+
+    def step(self, inputs):
+        """Advance every game by one frame, `inputs` holds each game's
+        INPUT_* bits. Returns (done, final_score): which games died this
+        frame and their score, those games are restarted"""
+        inputs = np.asarray(inputs)
+        small = self.player_is_small
+        pose_width = PLAYER_WIDTH[small.astype(np.int64), self.player_pose]
+        pose_height = PLAYER_HEIGHT[small.astype(np.int64), self.player_pose]
+        bottom = self.player_y + pose_height
+        fall_speed = self.players_fall_speed
+        power_up = self.power_up_type
+
+        # [space] or [up_arrow] to jump, you can hold down keys
+        jump = ((inputs & INPUT_JUMP) != 0) & (bottom >= GROUND_Y)
+        fall_speed[jump] = self.jump_start_speed[jump]
+        # [down_arrow] to drop down from a jump or flying
+        drop = ((inputs & INPUT_DROP) != 0) & (bottom < GROUND_Y) & ~jump
+        drop_speed = -self.jump_start_speed * 0.75
+        fall_speed[drop] = np.maximum(fall_speed[drop], drop_speed[drop])
+        stop_flying = drop & (power_up == FLY)
+        fall_speed[stop_flying] = drop_speed[stop_flying]
+        power_up[stop_flying] = NO_POWER_UP
+        self.power_up_value[stop_flying] = 0
+
+        # reset power up dependent variables
+        self.jump_start_speed[:] = -17
+        small[:] = False
+
+        # heal or gain shield over time
+        pick = power_up == HEALTH
+        self.player_hp[pick] = np.minimum(100, self.player_hp[pick] + 0.2)
+        pick = power_up == SHIELD
+        self.player_shield[pick] = np.minimum(
+            25, self.player_shield[pick] + 0.2)
+        # start falling after finished flying
+        pick = (power_up == FLY) & (self.power_up_value == 1)
+        self.player_y[pick] = 80
+        fall_speed[pick] = 0
+        # make player smaller and jump higher
+        pick = power_up == SMALL
+        self.jump_start_speed[pick] = -20
+        small[pick] = True
+
+        # reduce time remaining for power up
+        pick = power_up != NO_POWER_UP
+        self.power_up_value[pick] -= 1
+        finished = pick & (self.power_up_value <= 0)
+        power_up[finished] = NO_POWER_UP
+        self.power_up_value[finished] = 0
+
+        # adjust player's vertical location, don't go below ground
+        fall_speed += GRAVITY
+        self.player_y = round_like_rect(self.player_y + fall_speed)
+        bottom = np.minimum(GROUND_Y, self.player_y + pose_height)
+
+        # choose the player's pose and hitbox
+        crawl = ((inputs & INPUT_DOWN) != 0) & (bottom == GROUND_Y)
+        first_half = self.frame % 20 < 10
+        pose = np.where(bottom != GROUND_Y, JUMP,
+                        np.where(first_half, WALK, WALK2))
+        pose = np.where(crawl, np.where(first_half, CRAWL, CRAWL2), pose)
+        flying = power_up == FLY
+        pose[flying] = FLY_POSE
+        self.player_pose = pose
+        size_index = small.astype(np.int64)
+        pose_width = PLAYER_WIDTH[size_index, pose]
+        pose_height = PLAYER_HEIGHT[size_index, pose]
+        self.player_x = np.where(flying, 15, np.where(crawl, 15, 25))
+        self.player_y = np.where(flying, 80, bottom - pose_height)
+        player_left = self.player_x
+        player_right = player_left + pose_width
+        player_top = self.player_y
+        player_bottom = player_top + pose_height
+
+        # move eggs and check for collisions, last egg first like World
+        speed = get_obstacle_speed(self.frame)
+        self.egg_x = round_like_rect(self.egg_x - speed[:, None])
+        egg_type = self.egg_type
+        egg_right = self.egg_x + EGG_WIDTH[egg_type]
+        removed = egg_right <= 0
+        egg_top = EGG_TOP[egg_type]
+        hit = ((self.egg_x < player_right[:, None]) &
+               (egg_right > player_left[:, None]) &
+               (egg_top < player_bottom[:, None]) &
+               (egg_top + EGG_HEIGHT[egg_type] > player_top[:, None]) &
+               ~self.egg_destroyed & ~removed)
+        # the rects overlap, check if any pixels do
+        games, slots = np.nonzero(hit)
+        if len(games):
+            hit[games, slots] = HIT_TABLE[
+                size_index[games], pose[games], egg_type[games, slots],
+                self.egg_x[games, slots] - player_left[games] +
+                MAX_EGG_WIDTH - 1,
+                egg_top[games, slots] - player_top[games] +
+                MAX_EGG_HEIGHT - 1]
+        self.egg_destroyed |= hit
+        hp = self.player_hp
+        shield = self.player_shield
+        for slot in reversed(range(self.EGGS)):
+            games = np.flatnonzero(hit[:, slot])
+            if len(games) == 0:
+                continue
+            fried = egg_type[games, slot] == FRIED
+            has_shield = shield[games] > 0
+            # normal egg: instant kill or break shield
+            # fried egg: take 20 damage
+            shield[games] = np.where(
+                has_shield,
+                np.where(fried, np.maximum(0, shield[games] - 20), 0),
+                shield[games])
+            hp[games] = np.where(
+                has_shield, hp[games],
+                np.where(fried, hp[games] - 20, 0))
+
+        # replace eggs that left the screen, keeping list order
+        removed_count = removed.sum(axis=1)
+        if removed_count.any():
+            order = np.argsort(removed, axis=1, kind="stable")
+            for name in ("egg_x", "egg_type", "egg_destroyed",
+                         "egg_visible"):
+                setattr(self, name, np.take_along_axis(
+                    getattr(self, name), order, axis=1))
+            for new in range(int(removed_count.max())):
+                games = np.flatnonzero(removed_count > new)
+                slot = self.EGGS - removed_count[games] + new
+                prev_loc = (self.egg_x[games, slot - 1] +
+                            EGG_WIDTH[self.egg_type[games, slot - 1]])
+                self.spawn_eggs_at(games, slot, prev_loc)
+
+        # spawn power-ups around every 1000 frames
+        spawn = self.frame >= self.next_power_up
+        if spawn.any():
+            games = np.flatnonzero(spawn)
+            self.spawn_power_ups(games)
+            self.next_power_up[games] = (
+                self.frame[games] + 1 +
+                get_power_up_waits(self.rng, len(games)))
+        self.update_power_ups(speed, player_left, player_right,
+                              player_top, player_bottom)
+
+        done = hp <= 0
+        self.frame += 1
+        final_score = np.where(done, self.frame // 4, 0)
+        self.reset(done)
+        return done, final_score
+
+    def spawn_eggs_at(self, games, slots, prev_loc):
+        """spawn_eggs() where each game writes to a different slot"""
+        # group games by slot so each call writes one column
+        for slot in np.unique(slots):
+            pick = slots == slot
+            self.spawn_eggs(games[pick], slot, prev_loc[pick],
+                            self.frame[games[pick]])
+
+    def spawn_power_ups(self, games):
+        """Vectorized World.get_power_up()"""
+        # make sure it doesn't fully overlap with eggs
+        location = np.full(len(games), 800)
+        for slot in range(self.EGGS):
+            egg_l = self.egg_x[games, slot]
+            egg_r = egg_l + EGG_WIDTH[self.egg_type[games, slot]]
+            overlap = (((egg_l <= location) & (location <= egg_r)) |
+                       ((location <= egg_l) & (egg_l <= location + 40)))
+            location = np.where(overlap, egg_r + 20, location)
+
+        # don't spawn power ups that are currently useless
+        # also apply character power up restrictions
+        character = self.character[games]
+        no_health = (self.player_hp[games] > 99) | (character == 3)
+        no_shield = character == 3
+        choice_count = 4 - no_health - no_shield
+        roll = self.rng.integers(0, choice_count, size=len(games))
+        # skip over the removed choices, the order is health, shield,
+        # fly, small like World.get_power_up()
+        chosen = roll + HEALTH + no_health
+        chosen = chosen + (no_shield & (chosen >= SHIELD))
+
+        # put the power up in the first free slot, in list order
+        free = ~self.item_active[games]
+        has_free = free.any(axis=1)
+        games = games[has_free]
+        slot = np.argmax(free[has_free], axis=1)
+        chosen = chosen[has_free]
+        self.item_active[games, slot] = True
+        self.item_x[games, slot] = location[has_free]
+        self.item_type[games, slot] = chosen
+        self.item_value[games, slot] = MAX_POWER_UP_VAL[
+            self.character[games], chosen]
+
+        # keep power ups ordered by left edge like World.power_ups
+        order = np.lexsort((self.item_x, ~self.item_active))
+        for name in ("item_active", "item_x", "item_type", "item_value"):
+            setattr(self, name, np.take_along_axis(
+                getattr(self, name), order, axis=1))
+
+    def update_power_ups(self, speed, player_left, player_right,
+                         player_top, player_bottom):
+        """move power up spawns towards player and check if
+        the player picked up any"""
+        active = self.item_active
+        if not active.any():
+            return
+        item_type = self.item_type
+        self.item_x = np.where(active,
+                               round_like_rect(self.item_x - speed[:, None]),
+                               self.item_x)
+        item_right = self.item_x + POWER_UP_WIDTH[item_type]
+        active &= item_right > 0  # out of map, remove it
+        item_top = GROUND_Y - POWER_UP_HEIGHT[item_type]
+        picked = (active &
+                  (self.item_x < player_right[:, None]) &
+                  (item_right > player_left[:, None]) &
+                  (item_top < player_bottom[:, None]) &
+                  (GROUND_Y > player_top[:, None]))
+        # last power up first like World, so the first one wins
+        for slot in reversed(range(self.POWER_UP_SLOTS)):
+            games = np.flatnonzero(picked[:, slot])
+            self.power_up_type[games] = item_type[games, slot]
+            self.power_up_value[games] = self.item_value[games, slot]
+        active &= ~picked  # don't pick up power-up twice
+
+        # keep power ups in list order with the free slots at the end
+        order = np.argsort(~active, axis=1, kind="stable")
+        for name in ("item_active", "item_x", "item_type", "item_value"):
+            setattr(self, name, np.take_along_axis(
+                getattr(self, name), order, axis=1))
@@ -0,0 +1,128 @@
+"""Memory allocated by playing frames, measured with tracemalloc
+
+Run from the project folder with:
+    python -m benchmarks.bench_alloc [frames]
+
+Plays games with a simple scripted player (the shield is refilled so
+games get to every phase) and measures, after a warm up:
+- how much memory stays allocated after `frames` steps (should be 0)
+- the most memory allocated at once inside a step, on average
+- how many Eggs and Power_ups were made instead of reused from the
+  pools in world.py, while playing (only when more are on screen at
+  once than ever before) and across new games (should be 0). The pools
+  are emptied before each measurement, the new games are played once
+  to fill them, then played again and counted
+"""
+
+import sys
+import random
+import tracemalloc
+
+import world
+from world import World, INPUT_JUMP, INPUT_DOWN
+
+WARM_UP = 3000  # frames played before measuring, fills the pools
+MAX_KEPT = 8  # bytes/frame that can stay allocated (the score, HP...)
+GAMES = 20  # games started while counting new objects
+
+
+def get_inputs(game_world):
+    """jump over ground eggs and crawl under flying ones"""
+    inputs = 0
+    for egg in game_world.eggs:
+        distance = egg.rect.left - game_world.player_rect.right
+        if 0 <= distance <= 40 + 4 * game_world.frame // 1000:
+            if egg.type in ("normal", "fried"):
+                inputs |= INPUT_JUMP
+            else:
+                inputs |= INPUT_DOWN
+    return inputs
+
+
+def play(game_world, frames, on_step=None):
+    for _ in range(frames):
+        game_world.step(get_inputs(game_world))
+        if on_step is not None:
+            on_step()
+        if game_world.player_shield == 0:  # keep the game going
+            game_world.player_shield = 25
+
+
+def clear_pools():
+    """start a measurement with empty pools, whatever ran before"""
+    world.egg_pool.clear()
+    world.power_up_pool.clear()
+
+
+def get_pooled_objects(worlds):
+    """Eggs and Power_ups that exist, in the pools or in a World"""
+    eggs = len(world.egg_pool) + sum(len(w.eggs) for w in worlds)
+    power_ups = (len(world.power_up_pool) +
+                 sum(len(w.power_ups) for w in worlds))
+    return eggs, power_ups
+
+
+def measure_frames(frames):
+    clear_pools()
+    game_world = World(1, seed=0)
+    play(game_world, WARM_UP)
+    peaks = [0]
+
+    def record_peak():
+        current, peak = tracemalloc.get_traced_memory()
+        peaks[0] += peak - current
+        tracemalloc.reset_peak()
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    start_memory = tracemalloc.get_traced_memory()[0]
+    objects = get_pooled_objects([game_world])
+    play(game_world, frames, record_peak)
+    end_memory = tracemalloc.get_traced_memory()[0]
+    after = tracemalloc.take_snapshot()
+    new_objects = get_pooled_objects([game_world])
+    tracemalloc.stop()
+
+    kept = (end_memory - start_memory) / frames
+    print(f"{frames} frames from frame {WARM_UP}: "
+          f"{kept:.2f} bytes/frame kept allocated, "
+          f"{peaks[0] / frames:.0f} bytes/frame allocated at once "
+          f"(freed by the end of the step)")
+    print(f"new Eggs: {new_objects[0] - objects[0]}, "
+          f"new Power_ups: {new_objects[1] - objects[1]}")
+    for stat in after.compare_to(before, "lineno")[:3]:
+        print("  biggest change:", stat)
+    return kept <= MAX_KEPT
+
+
+def measure_games():
+    """new games reuse the last game's eggs and power ups"""
+    clear_pools()
+    game_world = World(1, seed=0)
+
+    def play_games():
+        for game in range(GAMES):
+            game_world.reset(game % 3 + 1, seed=game)
+            play(game_world, 1000)
+
+    play_games()  # warm up, the pools get as big as these games need
+    objects = get_pooled_objects([game_world])
+    play_games()  # the same games again only reuse them
+    new_objects = get_pooled_objects([game_world])
+    print(f"{GAMES} new games: {new_objects[0] - objects[0]} new Eggs, "
+          f"{new_objects[1] - objects[1]} new Power_ups")
+    return new_objects == objects
+
+
+def main(frames):
+    random.seed(0)
+    frames_ok = measure_frames(frames)
+    games_ok = measure_games()
+    if not (frames_ok and games_ok):
+        print("playing allocated new entities", file=sys.stderr)
+        sys.exit(1)
+    print("playing frames reuse every entity")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000)
@@ -0,0 +1,129 @@
+"""Equivalence check and throughput benchmark for batch_world.py
+
+Run from the project folder with:
+    python -m benchmarks.bench_batch_world [frames]
+
+First plays single games with both world.World and BatchWorld(1) using
+the same random numbers and checks the state matches every frame, then
+measures games*frames per second for different numbers of games.
+"""
+
+import sys
+import time
+import random
+
+import numpy as np
+
+from world import World, INPUT_JUMP, INPUT_DOWN, INPUT_DROP
+from batch_world import BatchWorld, EGG_TYPES, POWER_UP_TYPES, POSES
+
+
+class ScalarRandom:
+    """Feeds BatchWorld from a random.Random one number at a time, so a
+    batch of 1 game uses the exact numbers World would use with the
+    same seed"""
+
+    def __init__(self, seed):
+        self.generator = random.Random(seed)
+
+    def integers(self, low, high, size):
+        low = np.broadcast_to(low, (size,))
+        high = np.broadcast_to(high, (size,))
+        return np.array([self.generator.randint(int(a), int(b) - 1)
+                         for a, b in zip(low, high)], dtype=np.int64)
+
+    def random(self, size):
+        return np.array([self.generator.random() for _ in range(size)])
+
+
+def get_inputs(world, rng):
+    """simple player: jump over ground eggs and crawl under flying ones,
+    with some random key presses so every rule gets used"""
+    inputs = 0
+    for egg in world.eggs:
+        distance = egg.rect.left - world.player_rect.right
+        if 0 <= distance <= 40 + 4 * world.frame // 1000:
+            if egg.type in ("normal", "fried"):
+                inputs |= INPUT_JUMP
+            else:
+                inputs |= INPUT_DOWN
+    if rng.random() < 0.05:
+        inputs ^= rng.choice([INPUT_JUMP, INPUT_DOWN, INPUT_DROP])
+    return inputs
+
+
+def compare(world, batch):
+    """raise an AssertionError if the two games are in different states"""
+    assert world.frame == batch.frame[0]
+    assert world.player_hp == batch.player_hp[0]
+    assert world.player_shield == batch.player_shield[0]
+    assert world.player_pose == POSES[batch.player_pose[0]]
+    assert tuple(world.player_rect.topleft) == (batch.player_x[0],
+                                                batch.player_y[0])
+    assert world.cur_power_up.type == POWER_UP_TYPES[batch.power_up_type[0]]
+    assert world.cur_power_up.value == batch.power_up_value[0]
+    eggs = [(egg.rect.x, egg.type, egg.destroyed, bool(egg.visible))
+            for egg in world.eggs]
+    batch_eggs = [(batch.egg_x[0, i], EGG_TYPES[batch.egg_type[0, i]],
+                   batch.egg_destroyed[0, i], batch.egg_visible[0, i])
+                  for i in range(batch.EGGS)]
+    assert eggs == batch_eggs, (eggs, batch_eggs)
+    power_ups = [(p.rect.x, p.type, p.value) for p in world.power_ups]
+    batch_power_ups = [(batch.item_x[0, i],
+                        POWER_UP_TYPES[batch.item_type[0, i]],
+                        batch.item_value[0, i])
+                       for i in range(batch.POWER_UP_SLOTS)
+                       if batch.item_active[0, i]]
+    assert power_ups == batch_power_ups, (power_ups, batch_power_ups)
+
+
+def check_equivalence(games=12, max_frames=6_000):
+    """play `games` games both ways and compare every frame"""
+    frames = 0
+    for game in range(games):
+        character = game % 3 + 1
+        world = World(character, seed=game)
+        batch = BatchWorld(1, character, rng=ScalarRandom(game))
+        compare(world, batch)
+        inputs_rng = random.Random(-game)
+        for _ in range(max_frames):
+            # keep refilling the shield in half of the games so they
+            # get to the later phases
+            if game % 2:
+                world.player_shield = batch.player_shield[0] = 25
+            inputs = get_inputs(world, inputs_rng)
+            world.step(inputs)
+            if world.dead:  # batch game restarts, compare the score
+                done, score = batch.step([inputs])
+                assert done[0] and score[0] == world.score
+                break
+            batch.step([inputs])
+            compare(world, batch)
+            frames += 1
+    return frames
+
+
+def throughput(games, frames):
+    """games * frames stepped per second"""
+    batch = BatchWorld(games, np.arange(games) % 3 + 1,
+                       rng=np.random.default_rng(0))
+    rng = np.random.default_rng(1)
+    inputs = rng.choice([0, INPUT_JUMP, INPUT_DOWN], size=(frames, games))
+    start = time.perf_counter()
+    for frame in range(frames):
+        batch.step(inputs[frame])
+    return games * frames / (time.perf_counter() - start)
+
+
+def main():
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    checked = check_equivalence()
+    print(f"equivalence: {checked} frames match world.World")
+
+    print("games   games*frames/sec")
+    for games in (1, 10, 100, 1_000, 10_000, 100_000):
+        print(f"{games:>7} {throughput(games, frames):>15,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""Cost of capturing every frame, with a normal and a very slow disk
+
+Run from the project folder with:
+    python -m benchmarks.bench_capture [frames]
+
+Plays `frames` frames with the autoplayer at 60 FPS four times: without
+capturing, with a writer thread that only hands the buffers back (the
+cost of copying the screen, and the noise of the computer), capturing
+to a file, and capturing through a disk that takes SLOW_WRITE seconds
+to write each frame. It prints the frame time and how long grab() took,
+and checks that:
+- every frame written decodes to exactly the pixels that were on screen
+- with a normal and the slow disk, grab()'s 99th percentile is at most
+  GRAB_MARGIN_MS over the copy only run's, so writing adds nothing to
+  the game loop but the noise of the computer
+- with the slow disk frames are dropped and counted, not waited for
+"""
+
+import os
+import sys
+import time
+import hashlib
+import tempfile
+from collections import defaultdict
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+from capture import CaptureWriter, read_capture
+from main import Game, create_window
+from sprites import build_atlas
+
+FRAME_TIME = 1 / 60
+# how much slower grab() can be at the 99th percentile than when the
+# thread writes nothing. Copying the screen takes about 0.3 ms either
+# way, the copy only run measures the computer's own hiccups
+GRAB_MARGIN_MS = 1.0
+SLOW_WRITE = 0.1  # seconds the slow disk takes to write a frame
+
+
+class CopyOnlyWriter(CaptureWriter):
+    """a CaptureWriter whose thread hands the buffers straight back"""
+
+    def run(self):
+        while True:
+            item = self.waiting.get()
+            if item is None:
+                break
+            self.free.put(item[1])
+
+
+class SlowCaptureWriter(CaptureWriter):
+    """a CaptureWriter with a disk that can only write 10 frames/second"""
+
+    def write_record(self, frame, key, top, rows, data):
+        time.sleep(SLOW_WRITE)
+        super().write_record(frame, key, top, rows, data)
+
+
+def get_ms(times, percent=None):
+    if percent is None:
+        return sum(times) / len(times) * 1000
+    return sorted(times)[len(times) * percent // 100] * 1000
+
+
+def play(screen, frames, writer=None):
+    """play frames at 60 FPS, returns (frame times, grab() times,
+    digest of each frame's pixels)"""
+    game = Game(screen, autoplay=True)
+    game.start_game(1)
+    frame_times = []
+    grab_times = []
+    digests = []
+    next_frame = time.perf_counter()
+    for _ in range(frames):
+        start = time.perf_counter()
+        game.run_frame([], defaultdict(bool))
+        game.renderer.present()
+        if writer is not None:
+            grab_start = time.perf_counter()
+            writer.grab(screen)
+            grab_times.append(time.perf_counter() - grab_start)
+        frame_times.append(time.perf_counter() - start)
+        if writer is not None:  # not timed, only to check the file
+            digests.append(hashlib.blake2b(
+                pygame.image.tobytes(screen, "RGB")).digest())
+        next_frame += FRAME_TIME
+        time.sleep(max(0.0, next_frame - time.perf_counter()))
+    return frame_times, grab_times, digests
+
+
+def check_file(path, digests):
+    """every frame in the capture has the pixels that were on screen"""
+    frames = read_capture(path)
+    next(frames)
+    written = 0
+    for frame, rgb in frames:
+        assert hashlib.blake2b(rgb).digest() == digests[frame], frame
+        written += 1
+    return written
+
+
+def main(frames):
+    pygame.init()
+    screen = create_window(False)
+    build_atlas()
+    ok = True
+    frame_times, _, _ = play(screen, frames)
+    print(f"no capture: {get_ms(frame_times):.3f} ms/frame")
+    print("disk      frame ms  grab ms avg  p99   max  written  dropped  "
+          "KB/frame")
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "copy.eggc")
+        writer = CopyOnlyWriter(path, screen)
+        frame_times, grab_times, _ = play(screen, frames, writer)
+        writer.close()
+        print(f"copy     {get_ms(frame_times):>9.3f} "
+              f"{get_ms(grab_times):>12.3f} "
+              f"{get_ms(grab_times, 99):>5.2f} "
+              f"{max(grab_times) * 1000:>5.2f}")
+        max_grab = get_ms(grab_times, 99) + GRAB_MARGIN_MS
+        for name, writer_class in (("normal", CaptureWriter),
+                                   ("slow", SlowCaptureWriter)):
+            path = os.path.join(folder, f"{name}.eggc")
+            writer = writer_class(path, screen)
+            frame_times, grab_times, digests = play(screen, frames, writer)
+            writer.close()
+            written = check_file(path, digests)
+            print(f"{name:<8} {get_ms(frame_times):>9.3f} "
+                  f"{get_ms(grab_times):>12.3f} "
+                  f"{get_ms(grab_times, 99):>5.2f} "
+                  f"{max(grab_times) * 1000:>5.2f} {written:>8} "
+                  f"{writer.dropped:>8} "
+                  f"{os.path.getsize(path) / written / 1000:>9.1f}")
+            ok &= written + writer.dropped == frames
+            ok &= written == writer.written
+            ok &= get_ms(grab_times, 99) <= max_grab
+            if name == "slow":
+                ok &= writer.dropped > 0
+    if not ok:
+        print("capturing blocked the game loop or lost frames",
+              file=sys.stderr)
+        sys.exit(1)
+    print(f"every frame written matches the screen, grab() stayed under "
+          f"{max_grab:.2f} ms (copy only + {GRAB_MARGIN_MS} ms) and the "
+          f"slow disk dropped frames instead of waiting")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 300)
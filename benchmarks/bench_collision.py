@@ -0,0 +1,119 @@
+"""Cost of pixel perfect collisions on top of the rect test
+
+Run from the project folder with:
+    python -m benchmarks.bench_collision [repeats]
+
+First checks the masks in world.py and the hit table batch_world.py
+builds from them agree for every player pose, size and egg type at
+every offset where their rects overlap, and prints how many of those
+offsets were hits only because of transparent pixels. Then puts up to
+hundreds of eggs on top of the player (none of them destroyed, so every
+one goes through both tests every frame) and times update_eggs() with
+only the rect test vs rect + mask.
+"""
+
+import sys
+import time
+import random
+
+from world import (World, Event, GROUND_Y, egg_pool, new_egg,
+                   get_egg_lift, get_egg_size, get_obstacle_speed,
+                   get_player_mask, get_egg_mask)
+from batch_world import (HIT_TABLE, POSES, EGG_TYPES, MAX_EGG_WIDTH,
+                         MAX_EGG_HEIGHT)
+
+OVERLAPPING = [4, 20, 100, 500]  # eggs on top of the player
+FRAME_MS = 1000 / 60
+
+
+class RectWorld(World):
+    """World with the collision code from before hit masks"""
+
+    def update_eggs(self, events):
+        eggs = self.eggs
+        eggs.scroll(get_obstacle_speed(self.frame))
+        for _ in range(eggs.retire(egg_pool)):
+            eggs.add(new_egg("normal", 1600, GROUND_Y, True))
+        for i in reversed(eggs.get_near(self.player_rect)):
+            egg = eggs[i]
+            if not egg.rect.colliderect(self.player_rect) or egg.destroyed:
+                continue
+            egg.destroyed = True
+            self.player_hp -= 20
+            events.append(Event("damage", egg.type, egg.rect))
+
+
+def check_masks():
+    """World's Mask.overlap() and batch_world's HIT_TABLE give the same
+    answer, and count rect hits that aren't pixel hits"""
+    print("egg       rect hits  pixel hits")
+    for egg_index, egg_type in enumerate(EGG_TYPES):
+        egg_mask = get_egg_mask[egg_type]
+        egg_width, egg_height = egg_mask.get_size()
+        rect_hits = pixel_hits = 0
+        for (pose, is_small), player_mask in get_player_mask.items():
+            pose_index = POSES.index(pose)
+            width, height = player_mask.get_size()
+            for dx in range(-egg_width + 1, width):
+                for dy in range(-egg_height + 1, height):
+                    hit = bool(player_mask.overlap(egg_mask, (dx, dy)))
+                    table_hit = HIT_TABLE[int(is_small), pose_index,
+                                          egg_index,
+                                          dx + MAX_EGG_WIDTH - 1,
+                                          dy + MAX_EGG_HEIGHT - 1]
+                    assert hit == table_hit, (pose, is_small, egg_type,
+                                              dx, dy)
+                    rect_hits += 1
+                    pixel_hits += hit
+        print(f"{egg_type:<9} {rect_hits:>10} {pixel_hits:>11} "
+              f"({pixel_hits / rect_hits:.0%})")
+    print("world.py masks and batch_world.HIT_TABLE agree")
+
+
+def fill(world, count, rng):
+    """`count` eggs whose rects will overlap the player after moving"""
+    for egg in world.eggs:
+        egg_pool.append(egg)
+    world.eggs.clear()
+    player = world.player_rect
+    speed = round(get_obstacle_speed(world.frame))
+    lefts = []
+    for _ in range(count):
+        egg_type = rng.choice(EGG_TYPES)
+        left = rng.randint(player.left - get_egg_size[egg_type][0] + 1,
+                           player.right - 1) + speed
+        lefts.append((left, egg_type))
+    lefts.sort()
+    for left, egg_type in lefts:
+        world.eggs.add(new_egg(egg_type, left,
+                               GROUND_Y - get_egg_lift[egg_type], True))
+
+
+def time_collisions(world_class, count, repeats):
+    """milliseconds per update_eggs() with `count` eggs on the player"""
+    world = world_class(1, seed=0)
+    world.update_player_pose(0)
+    world.player_hp = 10 ** 9  # survive being hit by everything
+    rng = random.Random(count)
+    total = 0
+    for _ in range(repeats):
+        fill(world, count, rng)
+        events = []
+        start = time.perf_counter()
+        world.update_eggs(events)
+        total += time.perf_counter() - start
+    return total / repeats * 1000
+
+
+def main(repeats):
+    check_masks()
+    print("eggs on player  rect ms/frame  mask ms/frame  added % of a frame")
+    for count in OVERLAPPING:
+        rect_ms = time_collisions(RectWorld, count, repeats)
+        mask_ms = time_collisions(World, count, repeats)
+        print(f"{count:>14} {rect_ms:>14.4f} {mask_ms:>14.4f} "
+              f"{(mask_ms - rect_ms) / FRAME_MS:>19.3%}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
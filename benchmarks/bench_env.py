@@ -0,0 +1,134 @@
+"""Steps per second of env.VectorEnv with different numbers of workers
+
+Run from the project folder with:
+    python -m benchmarks.bench_env [steps] [worker counts...]
+
+First checks a VectorEnv with worker processes gives exactly the same
+observations, rewards, episode ends and final observations as
+EggJumpEnvs stepped one by one in this process, and that a worker that
+raises or is killed makes step() raise WorkerError instead of waiting
+forever. Then steps NUM_ENVS envs with random actions
+`steps` times for 0 workers (all envs in this process), 1, 2, 4...
+up to the number of CPU cores (or the worker counts given), with
+feature observations and with pixel observations too, and prints the
+total env steps per second. Workers only help on a computer with more
+than one core.
+"""
+
+import os
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import numpy as np
+
+from env import VectorEnv, EggJumpEnv, WorkerError, ACTIONS
+
+NUM_ENVS = 64
+CHECK_ENVS = 6
+CHECK_STEPS = 3000
+PIXEL_STEPS_DIVIDER = 10  # pixel frames are much slower to make
+
+
+def get_actions(rng, count):
+    """random actions, mostly doing nothing so games last a while"""
+    return rng.choice(len(ACTIONS), count, p=[0.85, 0.05, 0.07, 0.03])
+
+
+def check():
+    """VectorEnv with workers matches single envs"""
+    rng = np.random.default_rng(0)
+    singles = [EggJumpEnv(seed=i) for i in range(CHECK_ENVS)]
+    expected = np.array([env.reset(seed=100 + i)[0].copy()
+                         for i, env in enumerate(singles)])
+    envs = VectorEnv(CHECK_ENVS, workers=2)
+    episodes = 0
+    try:
+        observations = envs.reset(seed=100)
+        assert np.array_equal(observations, expected)
+        for step in range(CHECK_STEPS):
+            actions = get_actions(rng, CHECK_ENVS)
+            observations, rewards, terminated, _, info = envs.step(actions)
+            for i, env in enumerate(singles):
+                observation, reward, done, _, _ = env.step(actions[i])
+                if done:
+                    assert np.array_equal(info["final_observation"][i],
+                                          observation), (step, i)
+                    observation, _ = env.reset()
+                    episodes += 1
+                assert terminated[i] == done, (step, i)
+                assert rewards[i] == reward, (step, i)
+                assert np.array_equal(observations[i], observation), (step, i)
+    finally:
+        envs.close()
+    print(f"{CHECK_ENVS} envs, {CHECK_STEPS} steps, {episodes} episodes: "
+          f"VectorEnv with workers matches EggJumpEnv")
+
+
+def check_worker_errors():
+    """a failed or killed worker raises WorkerError"""
+    envs = VectorEnv(4, workers=2, max_frames=10)
+    try:
+        envs.reset(seed=0)
+        for _ in range(10):
+            _, _, _, truncated, _ = envs.step(np.zeros(4))
+        assert truncated.all()
+        envs.reset(seed=0)  # clears truncated too
+        assert not envs.arrays["truncated"].any()
+        try:
+            envs.step(np.full(4, len(ACTIONS)))  # not an action
+        except WorkerError as error:
+            assert "IndexError" in str(error)
+        else:
+            raise AssertionError("a worker's exception was lost")
+        envs.processes[1].kill()
+        try:
+            envs.step(np.zeros(4))
+        except WorkerError as error:
+            assert "worker 1 stopped" in str(error)
+        else:
+            raise AssertionError("a killed worker wasn't noticed")
+    finally:
+        envs.close()
+    print("failed and killed workers raise WorkerError")
+
+
+def time_steps(workers, pixels, steps):
+    """env steps per second"""
+    rng = np.random.default_rng(1)
+    actions = [get_actions(rng, NUM_ENVS) for _ in range(steps)]
+    envs = VectorEnv(NUM_ENVS, workers, pixels=pixels)
+    try:
+        envs.reset(seed=0)
+        envs.step(actions[0])  # make sure every worker has started
+        start = time.perf_counter()
+        for step_actions in actions:
+            envs.step(step_actions)
+        elapsed = time.perf_counter() - start
+    finally:
+        envs.close()
+    return NUM_ENVS * steps / elapsed
+
+
+def main(steps, worker_counts):
+    check()
+    check_worker_errors()
+    cores = os.cpu_count()
+    if not worker_counts:
+        worker_counts = [0, 1]
+        while worker_counts[-1] * 2 <= cores:
+            worker_counts.append(worker_counts[-1] * 2)
+        if worker_counts[-1] != cores:
+            worker_counts.append(cores)
+    print(f"{NUM_ENVS} envs, {cores} CPU cores")
+    print("workers  features steps/s  pixels steps/s")
+    for workers in worker_counts:
+        features = time_steps(workers, False, steps)
+        pixels = time_steps(workers, True, steps // PIXEL_STEPS_DIVIDER)
+        print(f"{workers:>7} {features:>17,.0f} {pixels:>15,.0f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000,
+         [int(workers) for workers in sys.argv[2:]])
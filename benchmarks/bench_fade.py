@@ -0,0 +1,96 @@
+"""Fading eggs: precomputed fade frames vs changing the shared image alpha
+
+Run from the project folder with:
+    python -m benchmarks.bench_fade [frames]
+
+Draws phase 4 frames where every egg is one that slowly turns invisible,
+first the way the game used to (set_alpha() on the shared egg image
+before every blit) and then with render.get_egg_blits(), which picks one
+of the pre-rendered fade frames from sprites.py by the egg's x position.
+Also checks that drawing no longer changes the shared egg images.
+"""
+
+import os
+import sys
+import time
+import random
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+import render
+from sprites import build_atlas, get_sprite
+from world import WIDTH, HEIGHT, Egg, get_egg, get_obstacle_speed
+
+
+def old_draw_eggs(screen, eggs):
+    """how eggs used to be drawn"""
+    for egg in eggs:
+        egg_surf_temp = get_sprite("egg", egg.type)
+        if not egg.visible:
+            egg_surf_temp.set_alpha(255 * (egg.rect.x - 300) / WIDTH)
+        else:
+            egg_surf_temp.set_alpha(255)
+        screen.blit(egg_surf_temp, egg.rect)
+
+
+def draw_eggs(screen, eggs):
+    """how eggs are drawn now, one layer of the render queue"""
+    screen.blits(render.get_egg_blits(eggs), False)
+
+
+def get_fading_eggs(count, frame):
+    """`count` phase 4 eggs spread over the screen, all fading"""
+    random.seed(0)
+    eggs = []
+    for i in range(count):
+        egg = get_egg(300 + i * 800 // count, frame)
+        egg.rect.x = 300 + i * 800 // count  # keep them on screen
+        eggs.append(Egg(egg.rect, egg.type, False, False))
+    return eggs
+
+
+def time_frames(screen, background, eggs, draw_eggs, frames, speed):
+    """average milliseconds per frame, eggs move like in the game"""
+    start = time.perf_counter()
+    for _ in range(frames):
+        screen.blit(background, (0, 0))
+        for egg in eggs:
+            egg.rect.x -= speed
+            if egg.rect.x < 300:  # wrap around to keep fading
+                egg.rect.x += 800
+        draw_eggs(screen, eggs)
+    return (time.perf_counter() - start) / frames * 1000
+
+
+def main_benchmark(frames):
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    build_atlas()
+    background = render.get_background()
+    frame = 4000  # phase 4
+    speed = round(get_obstacle_speed(frame))
+
+    eggs = get_fading_eggs(50, frame)
+    draw_eggs(screen, eggs)
+    changed = [state for state in ("normal", "fried", "flying", "flying2")
+               if get_sprite("egg", state).get_alpha() not in (None, 255)]
+    if changed:
+        print(f"draw_eggs() changed the alpha of {changed}", file=sys.stderr)
+        sys.exit(1)
+
+    print("fading eggs  set_alpha ms  fade frames ms  speedup")
+    for count in (4, 50, 200):
+        eggs = get_fading_eggs(count, frame)
+        before = time_frames(screen, background, eggs, old_draw_eggs,
+                             frames, speed)
+        after = time_frames(screen, background, eggs, draw_eggs,
+                            frames, speed)
+        print(f"{count:>11} {before:>13.3f} {after:>15.3f} "
+              f"{before / after:>7.1f}x")
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
@@ -0,0 +1,237 @@
+"""Frame time benchmark suite
+
+Run from the project folder with:
+    python -m benchmarks.bench_frames [--renderer dirty] [--frames 600]
+
+Runs main.py's Game with the SDL dummy video driver (no display needed)
+through a catalog of named scenarios, feeding it scripted keys and
+clicks, and times every frame (Game.run_frame() and putting the frame
+on screen). Prints mean, median (p50) and p99 milliseconds per scenario
+and compares them with a stored baseline:
+
+    python -m benchmarks.bench_frames --save-baseline   # after a change
+    python -m benchmarks.bench_frames                   # compare
+
+A scenario is a regression if its mean or p50 is more than --tolerance
+slower than the baseline (and at least --min-slowdown milliseconds, so
+frames that take almost no time don't flag noise), the script then
+exits with status 1. Frame times depend on the computer, so save a
+baseline on the computer you compare on. --list shows the scenarios.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from collections import namedtuple, defaultdict
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+from main import Game
+from profiler import profiler
+from sprites import build_atlas
+from world import WIDTH, HEIGHT, Player_power_up
+
+BASELINE = os.path.join(os.path.dirname(__file__), "frame_baseline.json")
+WARMUP_FRAMES = 60  # not timed, fills caches and gets past the first frame
+
+# setup(game) puts the game in the scenario's state, get_input(game)
+# returns (events, keys) for each frame
+Scenario = namedtuple("Scenario", ["description", "setup", "get_input"])
+
+
+def no_input(game):
+    return [], defaultdict(bool)
+
+
+def get_bot_input(game):
+    """hold jump before ground eggs and down before flying eggs, refill
+    the shield so the scenario keeps playing"""
+    world = game.world
+    world.player_shield = 25
+    keys = defaultdict(bool)
+    for egg in world.eggs:
+        distance = egg.rect.left - world.player_rect.right
+        if 0 <= distance <= 40 + 4 * world.frame // 1000:
+            if egg.type in ("normal", "fried"):
+                keys[pygame.K_SPACE] = True
+            else:
+                keys[pygame.K_DOWN] = True
+    return [], keys
+
+
+def get_power_up_input(power_up):
+    """bot input with a power up that never runs out"""
+    def get_input(game):
+        game.world.cur_power_up = Player_power_up(power_up, 400)
+        return get_bot_input(game)
+    return get_input
+
+
+def set_state(game_state):
+    def setup(game):
+        game.game_state = game_state
+    return setup
+
+
+def start_at(frame, character=1):
+    """start a game as if it had already been played for `frame` frames"""
+    def setup(game):
+        game.start_game(character)
+        game.world.reset(character, seed=0)  # same eggs every run
+        game.world.frame = frame
+    return setup
+
+
+def die(game):
+    """play one frame with no HP left to get to the death screen"""
+    start_at(1200)(game)
+    game.world.player_hp = 0
+    game.run_frame(*no_input(game))
+    game.renderer.present()
+
+
+SCENARIOS = {
+    "idle_menu": Scenario("main menu, nothing pressed",
+                          set_state("main_menu"), no_input),
+    "help_menu": Scenario("help menu, nothing pressed",
+                          set_state("help_menu"), no_input),
+    "phase1": Scenario("playing, normal eggs", start_at(300),
+                       get_bot_input),
+    "phase2": Scenario("playing, normal and fried eggs", start_at(1200),
+                       get_bot_input),
+    "phase3": Scenario("playing, flying eggs", start_at(2100),
+                       get_bot_input),
+    "phase4": Scenario("playing 3 minutes in, fading eggs",
+                       start_at(3 * 60 * 60), get_bot_input),
+    "phase4_late": Scenario("playing 10 minutes in, fastest eggs",
+                            start_at(10 * 60 * 60), get_bot_input),
+    "small": Scenario("playing with the small power up",
+                      start_at(1200, character=3),
+                      get_power_up_input("small")),
+    "fly": Scenario("playing with the fly power up",
+                    start_at(1200, character=3),
+                    get_power_up_input("fly")),
+    "death": Scenario("death screen, nothing pressed", die, no_input),
+}
+
+
+def get_stats(times):
+    """mean, p50 and p99 of frame times in milliseconds"""
+    times = sorted(times)
+    count = len(times)
+    return {"mean": sum(times) / count,
+            "p50": times[(count - 1) // 2],
+            "p99": times[min(count - 1, int(count * 0.99))]}
+
+
+def run_scenario(screen, renderer, scenario, frames):
+    """time `frames` frames of a scenario in a new Game"""
+    screen.fill("black")
+    game = Game(screen, renderer)
+    scenario.setup(game)
+    times = []
+    for i in range(WARMUP_FRAMES + frames):
+        frame_events, keys = scenario.get_input(game)
+        start = time.perf_counter()
+        profiler.begin_frame()
+        game.run_frame(frame_events, keys)
+        game.renderer.present()
+        profiler.end_frame()
+        elapsed = time.perf_counter() - start
+        if i >= WARMUP_FRAMES:
+            times.append(elapsed * 1000)
+    return get_stats(times)
+
+
+def load_baseline(path):
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {}
+
+
+def is_slower(new, old, tolerance, min_slowdown):
+    return new > old * (1 + tolerance) and new - old > min_slowdown
+
+
+def print_results(results, baseline, tolerance, min_slowdown):
+    """print a table and return the names of regressed scenarios"""
+    regressed = []
+    print("scenario       mean ms   p50 ms   p99 ms   vs baseline (mean/p50)")
+    for name, stats in results.items():
+        line = (f"{name:<13} {stats['mean']:>8.3f} {stats['p50']:>8.3f} "
+                f"{stats['p99']:>8.3f}")
+        old = baseline.get(name)
+        if old is not None:
+            mean_change = stats["mean"] / old["mean"] - 1
+            p50_change = stats["p50"] / old["p50"] - 1
+            line += f"   {mean_change:>+7.0%} {p50_change:>+7.0%}"
+            if (is_slower(stats["mean"], old["mean"], tolerance,
+                          min_slowdown) or
+                    is_slower(stats["p50"], old["p50"], tolerance,
+                              min_slowdown)):
+                line += "  REGRESSION"
+                regressed.append(name)
+        print(line)
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--renderer", choices=["full", "dirty"],
+                        default="full")
+    parser.add_argument("--frames", type=int, default=600,
+                        help="timed frames per scenario")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS),
+                        default=list(SCENARIOS))
+    parser.add_argument("--baseline", default=BASELINE,
+                        help="baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="store these results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown before flagging a "
+                             "regression (0.25 = 25%%)")
+    parser.add_argument("--min-slowdown", type=float, default=0.05,
+                        help="milliseconds a scenario must slow down by "
+                             "to be flagged")
+    parser.add_argument("--list", action="store_true",
+                        help="list the scenarios and exit")
+    args = parser.parse_args()
+    if args.list:
+        for name, scenario in SCENARIOS.items():
+            print(f"{name:<13} {scenario.description}")
+        return
+
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    build_atlas()
+    results = {name: run_scenario(screen, args.renderer, SCENARIOS[name],
+                                  args.frames)
+               for name in args.scenarios}
+    pygame.quit()
+
+    baselines = load_baseline(args.baseline)
+    if args.save_baseline:
+        baselines.setdefault(args.renderer, {}).update(results)
+        with open(args.baseline, "w") as file:
+            json.dump(baselines, file, indent=2, sort_keys=True)
+        print_results(results, {}, args.tolerance, args.min_slowdown)
+        print(f"saved {args.renderer} baseline to {args.baseline}")
+        return
+
+    regressed = print_results(results, baselines.get(args.renderer, {}),
+                              args.tolerance, args.min_slowdown)
+    if regressed:
+        print(f"{len(regressed)} scenarios are more than "
+              f"{args.tolerance:.0%} slower than the baseline: "
+              f"{', '.join(regressed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
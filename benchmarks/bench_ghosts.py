@@ -0,0 +1,152 @@
+"""Frame time with 1, 100 and 1000 ghosts on screen
+
+Run from the project folder with:
+    python -m benchmarks.bench_ghosts [frames]
+
+Makes RUNS ghosts with the autoplayer and saves copies of them until
+there are 1000 ghost files. Checks GhostRace streams back exactly the
+frames that were written (in order, and going back to a new game) and
+that the one Surface.blits() batch draws the same pixels as a blit per
+ghost. Then draws `frames` playing frames with each number of ghosts,
+batched on the render queue's ghost layer and one blit at a time, and
+prints the frame time.
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+from collections import defaultdict
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+from autoplay import AutoPlayer
+from ghosts import GhostRace, GhostWriter, CHUNK, ENDED, get_state
+from main import Game, create_window
+from render import draw_world
+from sprites import build_atlas
+
+RUNS = 20  # different games, the rest of the ghosts are copies
+RUN_FRAMES = 1200  # longest a ghost's game lasts
+GHOST_COUNTS = [0, 1, 100, 1000]
+
+
+def draw_one_by_one(screen, race, frame):
+    """draw a GhostRace's ghosts with a screen.blit() for each"""
+    offset = race.seek(frame)
+    for i in range(len(race)):
+        state = race.states[0, i, offset]
+        if state != ENDED:
+            screen.blit(race.surfaces[state],
+                        (race.x[state], race.ys[0, i, offset]))
+
+
+def make_ghosts(folder, count):
+    """write RUNS ghosts and copies of them, returns the paths and each
+    run's (y, state) of every frame"""
+    player = AutoPlayer(0.0005)
+    game = Game(pygame.display.get_surface())
+    world = game.world
+    runs = []
+    paths = []
+    for run in range(RUNS):
+        world.reset(run % 3 + 1, seed=run)
+        path = os.path.join(folder, f"ghost{run:04}.eggh")
+        writer = GhostWriter(path, world.character)
+        frames = []
+        while True:
+            writer.write(world)
+            frames.append((world.player_rect.top, get_state(world)))
+            if world.dead or world.frame == RUN_FRAMES:
+                break
+            world.step(player.get_inputs(world))
+        writer.close()
+        runs.append(frames)
+        paths.append(path)
+    for copy in range(RUNS, count):
+        path = os.path.join(folder, f"ghost{copy:04}.eggh")
+        shutil.copyfile(paths[copy % RUNS], path)
+        paths.append(path)
+    return paths, runs
+
+
+def check_stream(paths, runs):
+    """GhostRace gives every ghost's frames in order, and again from
+    the start"""
+    race = GhostRace(paths)
+    longest = max(len(frames) for frames in runs)
+    for frame in list(range(longest + CHUNK)) + list(range(CHUNK * 2)):
+        offset = race.seek(frame)
+        for i in range(len(paths)):
+            frames = runs[i % RUNS]
+            expected = frames[frame] if frame < len(frames) else None
+            state = race.states[0, i, offset]
+            if state == ENDED:
+                assert expected is None, (frame, i)
+            else:
+                assert (race.ys[0, i, offset], state) == expected, (frame, i)
+    return longest
+
+
+def check_pixels(screen, paths):
+    """one blits() batch draws the same as a blit per ghost"""
+    for frame in range(0, RUN_FRAMES, 37):
+        screen.fill("purple")
+        screen.blits(GhostRace(paths).get_blits(frame)[0])
+        batched = pygame.image.tobytes(screen, "RGB")
+        screen.fill("purple")
+        draw_one_by_one(screen, GhostRace(paths), frame)
+        assert pygame.image.tobytes(screen, "RGB") == batched, frame
+
+
+def time_frames(screen, race, frames, one_by_one):
+    """(mean, p99) ms per frame of drawing a game with the race's
+    ghosts"""
+    game = Game(screen)
+    game.start_game(1)
+    world = game.world
+    times = []
+    for _ in range(frames):
+        game.step_world(1, [], defaultdict(bool))
+        start = time.perf_counter()
+        if one_by_one:
+            draw_world(screen, world)
+            draw_one_by_one(screen, race, world.frame)
+        else:
+            draw_world(screen, world, race)
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return sum(times) / frames * 1000, times[frames * 99 // 100] * 1000
+
+
+def main(frames):
+    pygame.init()
+    screen = create_window(False)
+    build_atlas()
+    with tempfile.TemporaryDirectory() as folder:
+        paths, runs = make_ghosts(folder, max(GHOST_COUNTS))
+        size = sum(os.path.getsize(path) for path in paths)
+        longest = check_stream(paths, runs)
+        check_pixels(screen, paths[:100])
+        print(f"{len(paths)} ghosts ({size / 1e6:.1f} MB, {RUNS} different "
+              f"games up to {longest} frames): streamed frames and batched "
+              f"pixels match")
+        print("ghosts  blits() ms avg  p99  one by one ms avg  p99  "
+              "frames kept in memory")
+        for count in GHOST_COUNTS:
+            race = GhostRace(paths[:count])
+            mean, p99 = time_frames(screen, race, frames, False)
+            slow_mean, slow_p99 = time_frames(screen, race, frames, True)
+            kept = race.ys.nbytes + race.states.nbytes
+            print(f"{count:>6} {mean:>15.3f} {p99:>5.2f} "
+                  f"{slow_mean:>18.3f} {slow_p99:>5.2f} "
+                  f"{kept / 1000:>18.0f} KB")
+            del race  # unmap the files before deleting them
+    print(f"a 60 FPS frame is {1000 / 60:.1f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 600)
@@ -0,0 +1,212 @@
+"""Leaderboard insert and load times
+
+Run from the project folder with:
+    python -m benchmarks.bench_leaderboard [max history]
+
+Checks leaderboard.py keeps the right top 10 for every board, survives
+a crash in the middle of compacting and a record cut off by a crash,
+reads the old leaderboard.txt and skips bad lines in it. Then times
+adding scores (in memory and saved to the log) against the old
+sort-the-list add_score(), and loading a log of 1,000 up to `max
+history` runs against reading the same number of scores from a text
+file the old way.
+"""
+
+import os
+import sys
+import time
+import random
+import tempfile
+
+import numpy as np
+
+import leaderboard
+from leaderboard import Leaderboard, BOARDS, RECORD, SIZE
+
+
+def old_add_score(scores, to_add):
+    """how scores used to be added"""
+    scores.append(to_add)
+    scores.sort(reverse=True)
+    scores.pop()
+
+
+def old_load_scores(path):
+    """how scores used to be loaded"""
+    scores = [0] * 10
+    with open(path) as file:
+        for score in file.readlines():
+            old_add_score(scores, int(score))
+    return scores
+
+
+def get_runs(count, seed=0):
+    """(characters, scores) of `count` random finished games"""
+    rng = np.random.default_rng(seed)
+    characters = rng.integers(1, 4, count)
+    scores = rng.geometric(1 / 300, count).astype(np.uint32)
+    return characters, scores
+
+
+def write_log(folder, characters, scores, first_seq=1):
+    records = np.zeros(len(scores), RECORD)
+    records["seq"] = np.arange(first_seq, first_seq + len(scores))
+    records["character"] = characters
+    records["score"] = scores
+    with open(os.path.join(folder, leaderboard.LOG_FILE), "ab") as file:
+        file.write(records.tobytes())
+
+
+def get_expected(characters, scores):
+    """top 10 of every board, the slow way"""
+    expected = {}
+    for board in BOARDS:
+        if board == "overall":
+            board_scores = scores
+        else:
+            board_scores = scores[characters == board]
+        expected[board] = sorted(board_scores.tolist(), reverse=True)[:SIZE]
+    return expected
+
+
+def check(folder):
+    """raise AssertionError if something is wrong"""
+    characters, scores = get_runs(5000)
+    board = Leaderboard.open(folder)
+    board.sync = False
+    for character, score in zip(characters.tolist(), scores.tolist()):
+        board.add(score, character)
+    expected = get_expected(characters, scores)
+    assert all(board.get_top(name) == expected[name] for name in BOARDS)
+    board.log.close()  # "crash" without compacting
+
+    # reopening gives the same boards
+    board = Leaderboard.open(folder)
+    assert all(board.get_top(name) == expected[name] for name in BOARDS)
+
+    # crash after writing the top file but before emptying the log
+    board.add(10 ** 6, 2)
+    expected["overall"] = [10 ** 6] + expected["overall"][:-1]
+    expected[2] = [10 ** 6] + expected[2][:-1]
+    board.log.truncate = lambda size: None  # emptying the log "fails"
+    board.compact()
+    board.log.close()
+    log_size = os.path.getsize(os.path.join(folder, leaderboard.LOG_FILE))
+    assert log_size > 0
+    board = Leaderboard.open(folder)
+    assert all(board.get_top(name) == expected[name] for name in BOARDS)
+
+    # a record cut off by a crash is ignored
+    board.log.write(b"\x01\x02\x03")
+    board.log.close()
+    board = Leaderboard.open(folder)
+    assert all(board.get_top(name) == expected[name] for name in BOARDS)
+
+    # and scores added after it are read back right
+    board.add(2 * 10 ** 6, 3)
+    expected["overall"] = [2 * 10 ** 6] + expected["overall"][:-1]
+    expected[3] = [2 * 10 ** 6] + expected[3][:-1]
+    board.log.close()
+    board = Leaderboard.open(folder)
+    assert all(board.get_top(name) == expected[name] for name in BOARDS)
+    board.close()
+
+    # the old leaderboard.txt only had overall scores
+    old_folder = os.path.join(folder, "old")
+    os.mkdir(old_folder)
+    with open(os.path.join(old_folder, leaderboard.TOP_FILE), "w") as file:
+        file.write("\n".join(map(str, [50, 40, 30, 0, 0, 0, 0, 0, 0, 0])))
+    board = Leaderboard.open(old_folder)
+    assert board.get_scores() == [50, 40, 30, 0, 0, 0, 0, 0, 0, 0]
+    board.close()
+
+    # bad lines in a hand edited top file are skipped
+    bad_folder = os.path.join(folder, "bad")
+    os.mkdir(bad_folder)
+    with open(os.path.join(bad_folder, leaderboard.TOP_FILE), "w") as file:
+        file.write("seq 3\noverall 70\n4 60\n1 abc\noverall\nseq x\n"
+                   "1 20\nten\n")
+    board = Leaderboard.open(bad_folder)
+    assert board.get_top() == [70] and board.get_top(1) == [20]
+    assert board.last_seq == 3
+    board.close()
+    print("leaderboard keeps the right top 10 and survives crashes")
+
+
+def time_inserts(folder, count):
+    characters, scores = get_runs(count, seed=1)
+    runs = list(zip(characters.tolist(), scores.tolist()))
+    print("insert                  us/score")
+
+    old = [0] * 10
+    start = time.perf_counter()
+    for character, score in runs:
+        old_add_score(old, score)
+    old_time = time.perf_counter() - start
+    print(f"old sorted list      {old_time / count * 1e6:>10.3f}")
+
+    board = Leaderboard()
+    start = time.perf_counter()
+    for character, score in runs:
+        board.add(score, character)
+    print(f"heaps, in memory     "
+          f"{(time.perf_counter() - start) / count * 1e6:>10.3f}")
+
+    for sync in (False, True):
+        board = Leaderboard.open(folder)
+        board.sync = sync
+        saved = runs if not sync else runs[:500]  # fsync is slow
+        start = time.perf_counter()
+        for character, score in saved:
+            board.add(score, character)
+        elapsed = time.perf_counter() - start
+        board.close()
+        name = "heaps + log, fsync" if sync else "heaps + log"
+        print(f"{name:<20} {elapsed / len(saved) * 1e6:>10.3f}")
+
+
+def time_loads(folder, max_history):
+    print("history   old text load ms   log load ms   compact ms")
+    history = 1000
+    while history <= max_history:
+        run_folder = os.path.join(folder, str(history))
+        os.mkdir(run_folder)
+        characters, scores = get_runs(history, seed=2)
+        write_log(run_folder, characters, scores)
+        old_path = os.path.join(run_folder, "old.txt")
+        with open(old_path, "w") as file:
+            file.write("\n".join(map(str, scores.tolist())))
+
+        start = time.perf_counter()
+        old_load_scores(old_path)
+        old_time = time.perf_counter() - start
+
+        board = Leaderboard()
+        board.top_path = os.path.join(run_folder, leaderboard.TOP_FILE)
+        board.log_path = os.path.join(run_folder, leaderboard.LOG_FILE)
+        start = time.perf_counter()
+        board.load_top()
+        board.load_log()
+        load_time = time.perf_counter() - start
+        assert board.get_top() == get_expected(characters, scores)["overall"]
+
+        start = time.perf_counter()
+        board.compact()
+        compact_time = time.perf_counter() - start
+        print(f"{history:>9,} {old_time * 1000:>16.1f} "
+              f"{load_time * 1000:>13.2f} {compact_time * 1000:>12.2f}")
+        history *= 10
+
+
+def main(max_history):
+    with tempfile.TemporaryDirectory() as folder:
+        check(folder)
+    with tempfile.TemporaryDirectory() as folder:
+        time_inserts(folder, 100_000)
+    with tempfile.TemporaryDirectory() as folder:
+        time_loads(folder, max_history)
+
+
+if __name__ == "__main__":
+    random.seed(0)
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
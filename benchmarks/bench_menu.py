@@ -0,0 +1,108 @@
+"""Idle main menu frames per second
+
+Run from the project folder with:
+    python -m benchmarks.bench_menu [frames]
+
+Compares the main menu the way the game used to run it (add the score,
+compose the whole menu and flip every frame) with the cached menu
+surface from render.get_main_menu(), drawn by the full and the dirty
+rectangle renderers. Also checks the cached menu has the same pixels as
+composing it from scratch and that it is only composed again when the
+scores change.
+"""
+
+import os
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+import main
+import render
+from render import FullRenderer, DirtyRectRenderer
+from sprites import build_atlas
+from world import WIDTH, HEIGHT
+
+
+def add_score(scores, to_add):
+    """how scores used to be added, sorting the whole list"""
+    scores.append(to_add)
+    scores.sort(reverse=True)
+    scores.pop()
+
+
+def check_cache(screen, scores):
+    """cached menu looks the same and is only rebuilt for new scores"""
+    screen.fill("black")
+    render.display_main_menu(screen, scores)
+    render.display_help_button(screen)
+    expected = pygame.image.tobytes(screen, "RGB")
+    render.get_main_menu.cache_clear()
+    main.draw_menu(screen, scores)
+    if pygame.image.tobytes(screen, "RGB") != expected:
+        print("cached menu differs from the composed menu", file=sys.stderr)
+        return False
+
+    main.draw_menu(screen, scores)
+    add_score(scores, 0)  # a run that didn't make the top 10
+    main.draw_menu(screen, scores)
+    built = render.get_main_menu.cache_info().misses
+    add_score(scores, 1000)  # new high score
+    main.draw_menu(screen, scores)
+    rebuilt = render.get_main_menu.cache_info().misses - built
+    if built != 1 or rebuilt != 1:
+        print(f"menu composed {built} times for the same scores and "
+              f"{rebuilt} times for new scores", file=sys.stderr)
+        return False
+    print("cached menu matches and is only composed when scores change")
+    return True
+
+
+def time_frames(menu_frame, frames):
+    """(frames per second, CPU milliseconds per frame)"""
+    menu_frame()  # warm up
+    start = time.perf_counter()
+    start_cpu = time.process_time()
+    for _ in range(frames):
+        menu_frame()
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - start_cpu
+    return frames / elapsed, cpu / frames * 1000
+
+
+def main_benchmark(frames):
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    build_atlas()
+    scores = [900, 850, 500, 420, 300, 120, 80, 40, 10, 0]
+    if not check_cache(screen, list(scores)):
+        sys.exit(1)
+
+    def old_frame():
+        add_score(scores, 0)
+        screen.fill("black")
+        render.display_main_menu(screen, scores)
+        render.display_help_button(screen)
+        pygame.display.flip()
+
+    def renderer_frame(renderer):
+        def menu_frame():
+            renderer.draw_static(("main_menu", tuple(scores)),
+                                 lambda surf: main.draw_menu(surf, scores))
+            renderer.present()
+        return menu_frame
+
+    print("menu                frames/sec  cpu ms/frame")
+    for name, menu_frame in (
+            ("composed every frame", old_frame),
+            ("cached, full", renderer_frame(FullRenderer(screen))),
+            ("cached, dirty", renderer_frame(DirtyRectRenderer(screen)))):
+        fps, cpu = time_frames(menu_frame, frames)
+        print(f"{name:<20} {fps:>10.0f} {cpu:>13.4f}")
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,198 @@
+"""The frame loop with an online leaderboard that is slow or down
+
+Run from the project folder with:
+    python -m benchmarks.bench_online [frames]
+
+Plays `frames` frames at 60 FPS with the AutoPlayer and an
+OnlineLeaderboard (online.py) talking to three leaderboard_server.py
+servers: a normal one, one that waits SLOW_DELAY seconds before every
+answer, and one that is down for the first half of the frames and only
+then started. A run is submitted every SUBMIT_EVERY frames (autoplayed
+scores aren't submitted by the game) and get_scores() is called every
+frame like the main menu does.
+
+First checks https:// URLs are refused and a path in the URL is kept
+in front of the server's paths. Then checks the client's calls from the
+game loop (poll, submit and get_scores) never take more than
+MAX_CALL_MS, that no frame takes more than MAX_FRAME_MS, and that every
+run gets to the server and the top 10 gets back to the game within
+DEADLINE seconds after the frames, even with the slow and down servers.
+Then prints the frame times, how many requests failed and how long a
+blocking request to the slow server takes for comparison.
+"""
+
+import os
+import sys
+import time
+import socket
+import urllib.request
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+from main import Game
+from online import OnlineLeaderboard
+from leaderboard_server import start_server
+from sprites import build_atlas
+from world import WIDTH, HEIGHT
+
+SLOW_DELAY = 1.5  # seconds the slow server waits before every answer
+SUBMIT_EVERY = 30  # frames between submitted runs
+FRAME_TIME = 1 / 60
+# a call can wait for the client thread to give back the GIL, at most
+# sys.getswitchinterval() (5 ms), a network call would wait much longer
+MAX_CALL_MS = 6.0
+MAX_FRAME_MS = 50.0
+DEADLINE = 15.0  # seconds for the runs left to get to the server
+
+
+def get_free_port():
+    """a port no server is listening on"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def timed(times, call, *args):
+    """call and add the ms it took to `times`"""
+    start = time.perf_counter()
+    result = call(*args)
+    times.append((time.perf_counter() - start) * 1000)
+    return result
+
+
+def play(screen, url, frames, on_half=None):
+    """Play `frames` frames against the server at `url`, returns the
+    (client call ms, frame ms, runs submitted, online leaderboard)"""
+    online = OnlineLeaderboard(url, batch_delay=0.2)
+    game = Game(screen, "full", autoplay=True, online=online)
+    game.start_game(1)
+    keys = pygame.key.get_pressed()
+    call_times = []
+    frame_times = []
+    submitted = 0
+    next_frame = time.perf_counter()
+    for frame in range(frames):
+        if frame == frames // 2 and on_half is not None:
+            on_half()
+        start = time.perf_counter()
+        if game.game_state != "playing":
+            game.start_game(1)
+        # run_frame() polls the client, time it apart too
+        timed(call_times, online.poll)
+        timed(call_times, online.get_scores)
+        if frame % SUBMIT_EVERY == 0:
+            timed(call_times, online.submit, frame, 1)
+            submitted += 1
+        game.run_frame([], keys)
+        game.renderer.present()
+        frame_times.append((time.perf_counter() - start) * 1000)
+        # wait for the next frame, the client thread runs meanwhile
+        next_frame += FRAME_TIME
+        time.sleep(max(0.0, next_frame - time.perf_counter()))
+    return call_times, frame_times, submitted, online
+
+
+def wait_for_server(online, server, submitted):
+    """seconds until the server has every run and the game has a top
+    10 with the last (and best) one, None if it takes more than
+    DEADLINE"""
+    best = (submitted - 1) * SUBMIT_EVERY
+    start = time.perf_counter()
+    while time.perf_counter() - start < DEADLINE:
+        online.poll()
+        scores = online.get_scores()
+        if (len(server.seen) == submitted and online.sent == submitted and
+                scores is not None and scores[0] == best):
+            return time.perf_counter() - start
+        time.sleep(FRAME_TIME)
+    return None
+
+
+def check_url(server):
+    """only http:// works, and a path in the URL is kept"""
+    try:
+        OnlineLeaderboard("https://127.0.0.1:443")
+    except ValueError:
+        pass
+    else:
+        return False
+    # the local server isn't under a path, so /egg-jump/top isn't found
+    online = OnlineLeaderboard(server.url + "/egg-jump/")
+    online.get_scores()
+    start = time.perf_counter()
+    while online.errors == 0 and time.perf_counter() - start < DEADLINE:
+        online.poll()
+        time.sleep(FRAME_TIME)
+    online.close()
+    return "/egg-jump/top" in str(online.last_error)
+
+
+def time_blocking_request(url):
+    """seconds a urllib request for the top 10 waits"""
+    start = time.perf_counter()
+    with urllib.request.urlopen(url + "/top") as answer:
+        answer.read()
+    return time.perf_counter() - start
+
+
+def main(frames):
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    build_atlas()
+    normal = start_server()
+    slow = start_server(delay=SLOW_DELAY)
+    down_port = get_free_port()
+    servers = {}
+
+    def start_down_server():
+        servers["down"] = start_server(down_port)
+
+    if not check_url(normal):
+        print("https:// URLs were allowed or the URL's path was lost",
+              file=sys.stderr)
+        sys.exit(1)
+    print("server  max call ms  frame ms avg  max  errors  "
+          "all runs in (s)")
+    ok = True
+    for name, url, on_half in (
+            ("normal", normal.url, None),
+            ("slow", slow.url, None),
+            ("down", f"http://127.0.0.1:{down_port}", start_down_server)):
+        call_times, frame_times, submitted, online = play(screen, url,
+                                                           frames, on_half)
+        server = {"normal": normal, "slow": slow}.get(name) or servers[name]
+        waited = wait_for_server(online, server, submitted)
+        online.close()
+        max_call = max(call_times)
+        max_frame = max(frame_times)
+        average = sum(frame_times) / len(frame_times)
+        waited_text = "too long" if waited is None else f"{waited:.2f}"
+        print(f"{name:<7} {max_call:>11.3f} {average:>13.3f} "
+              f"{max_frame:>5.1f} {online.errors:>7} {waited_text:>16}")
+        if max_call > MAX_CALL_MS or max_frame > MAX_FRAME_MS:
+            print(f"the {name} server stalled the frame loop",
+                  file=sys.stderr)
+            ok = False
+        if waited is None:
+            print(f"runs or the top 10 didn't get through with the {name} "
+                  f"server: {len(server.seen)}/{submitted} runs, last "
+                  f"error {online.last_error}", file=sys.stderr)
+            ok = False
+        if online.thread.is_alive():
+            print("the client thread didn't stop", file=sys.stderr)
+            ok = False
+    print(f"a blocking request to the slow server takes "
+          f"{time_blocking_request(slow.url) * 1000:.0f} ms")
+    for server in [normal, slow] + list(servers.values()):
+        server.shutdown()
+    pygame.quit()
+    if not ok:
+        sys.exit(1)
+    print(f"no client call took over {MAX_CALL_MS} ms and no frame over "
+          f"{MAX_FRAME_MS} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 300)
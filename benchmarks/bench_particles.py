@@ -0,0 +1,148 @@
+"""Thousands of particles at 60 FPS
+
+Run from the project folder with:
+    python -m benchmarks.bench_particles [frames]
+
+Checks the ParticleSystem in particles.py never has more than
+MAX_PARTICLES alive (bursts past the cap replace the particles closest
+to dying) and that emitting, updating and drawing them keeps no memory
+allocated. Then plays phase 1 frames while bursts keep about 1000, 2000,
+4000 and 8000 particles alive, and prints the milliseconds spent
+updating and drawing them, the whole frame, and drawing them with a
+screen.fill() per particle instead of the one surfarray pass.
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import numpy as np
+import pygame
+
+from particles import ParticleSystem, MAX_PARTICLES, SIZE, get_palette
+from render import draw_world
+from sprites import build_atlas
+from world import World, WIDTH, HEIGHT
+
+TARGETS = [1000, 2000, 4000, 8000]  # particles to keep alive
+LIFE = 60  # steps a burst's particles last, 45 on average
+BURSTS = 4  # bursts a frame, spread over the screen
+PALETTE = get_palette(["#FFF6E0", "#FFD23F", "#FF8C1A", "#8FFFF2"])
+FRAME_MS = 1000 / 60
+MAX_KEPT = 4096  # bytes, NumPy keeps a few small buffers around
+
+
+def emit_bursts(particles, frame, target):
+    """emit enough particles that about `target` stay alive"""
+    count = target * 4 // (3 * LIFE * BURSTS)
+    for burst in range(BURSTS):
+        x = (frame * 37 + burst * WIDTH // BURSTS) % WIDTH
+        particles.emit(x, 200, count, PALETTE, 4.0, LIFE)
+
+
+def draw_one_by_one(screen, particles):
+    """a screen.fill() for each particle"""
+    for i in np.flatnonzero(particles.life > 0):
+        screen.fill(particles.colors[i], (int(particles.x[i]),
+                                          int(particles.y[i]), SIZE, SIZE))
+
+
+def check_cap():
+    particles = ParticleSystem(seed=0)
+    for _ in range(3):
+        particles.emit(400, 200, MAX_PARTICLES, PALETTE, 4.0, LIFE)
+    assert len(particles) == MAX_PARTICLES
+    assert particles.recycled == 2 * MAX_PARTICLES
+    particles.emit(400, 200, MAX_PARTICLES * 2, PALETTE, 4.0, LIFE)
+    assert len(particles) == MAX_PARTICLES
+    for _ in range(LIFE):
+        particles.update()
+    assert len(particles) == 0
+
+
+def check_memory(screen, frames):
+    """bytes still allocated after `frames` frames"""
+    particles = ParticleSystem(seed=0)
+    arrays = [particles.x, particles.y, particles.life, particles.colors]
+    for frame in range(LIFE):  # warm up
+        particles.update()
+        emit_bursts(particles, frame, 8000)
+        particles.draw(screen)
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    for frame in range(frames):
+        particles.update()
+        emit_bursts(particles, frame, 8000)
+        particles.draw(screen)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    # leave out the first snapshot, kept by tracemalloc itself
+    ignore = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    after = after.filter_traces(ignore)
+    before = before.filter_traces(ignore)
+    assert arrays == [particles.x, particles.y, particles.life,
+                      particles.colors]  # the same arrays are kept
+    return sum(stat.size_diff for stat in after.compare_to(before, "lineno"))
+
+
+def time_frames(screen, target, frames):
+    """ms per frame of (updating and emitting, drawing the particles,
+    the whole frame, drawing them one by one) and the particles alive"""
+    world = World(character=1, seed=0)
+    particles = ParticleSystem(seed=0)
+    for frame in range(LIFE):  # get to the number of particles
+        particles.update()
+        emit_bursts(particles, frame, target)
+    update_ms = draw_ms = frame_ms = one_by_one_ms = 0.0
+    alive = 0
+    for frame in range(frames):
+        world.player_hp = 100
+        start = time.perf_counter()
+        world.step(0)
+        update_start = time.perf_counter()
+        particles.update()
+        emit_bursts(particles, frame, target)
+        draw_start = time.perf_counter()
+        draw_world(screen, world, None, particles)
+        end = time.perf_counter()
+        particles.draw(screen)
+        draw_ms += time.perf_counter() - end
+        update_ms += draw_start - update_start
+        frame_ms += end - start
+        one_by_one_start = time.perf_counter()
+        draw_one_by_one(screen, particles)
+        one_by_one_ms += time.perf_counter() - one_by_one_start
+        alive += len(particles)
+    return (update_ms / frames * 1000, draw_ms / frames * 1000,
+            frame_ms / frames * 1000, one_by_one_ms / frames * 1000,
+            alive // frames)
+
+
+def main(frames):
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    build_atlas()
+    check_cap()
+    kept = check_memory(screen, frames)
+    print(f"never more than {MAX_PARTICLES} particles, {kept} bytes "
+          f"kept allocated after {frames} frames of 8000 particles")
+    print("alive  update ms  draw ms  frame ms  fill() per particle ms")
+    ok = kept < MAX_KEPT
+    for target in TARGETS:
+        update_ms, draw_ms, frame_ms, one_by_one_ms, alive = time_frames(
+            screen, target, frames)
+        print(f"{alive:>5} {update_ms:>10.3f} {draw_ms:>8.3f} "
+              f"{frame_ms:>9.3f} {one_by_one_ms:>23.3f}")
+        ok &= frame_ms < FRAME_MS
+    if not ok:
+        print("particles kept memory or didn't fit in a 60 FPS frame",
+              file=sys.stderr)
+        sys.exit(1)
+    print(f"every frame fits in {FRAME_MS:.1f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 600)
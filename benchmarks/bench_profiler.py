@@ -0,0 +1,82 @@
+"""Overhead of the frame profiler
+
+Run from the project folder with:
+    python -m benchmarks.bench_profiler [frames]
+
+Measures what `with profiler.zone(name):` costs while the profiler is
+off and on, then times phase 2 frames of the real game (see
+bench_frames.py) with the profiler off, on, and on with its overlay.
+Finally saves the timings as CSV and Chrome trace JSON and checks both
+files can be read back.
+"""
+
+import os
+import sys
+import csv
+import json
+import time
+import tempfile
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+from profiler import profiler
+from sprites import build_atlas
+from world import WIDTH, HEIGHT
+from benchmarks.bench_frames import SCENARIOS, run_scenario
+
+
+def time_zone(count):
+    """nanoseconds per empty `with profiler.zone()`"""
+    zone = profiler.zone
+    start = time.perf_counter()
+    for _ in range(count):
+        with zone("bench"):
+            pass
+    return (time.perf_counter() - start) / count * 1e9
+
+
+def main(frames):
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    build_atlas()
+    scenario = SCENARIOS["phase2"]
+
+    off_ns = time_zone(1_000_000)
+    off = run_scenario(screen, "full", scenario, frames)
+    profiler.enable()
+    on_ns = time_zone(100_000)
+    profiler.show_overlay = False
+    on = run_scenario(screen, "full", scenario, frames)
+    profiler.show_overlay = True
+    overlay = run_scenario(screen, "full", scenario, frames)
+    profiler.disable()
+
+    print(f"empty zone: {off_ns:.0f} ns off, {on_ns:.0f} ns on")
+    print("profiler        mean ms   p50 ms   p99 ms")
+    for name, stats in (("off", off), ("on", on),
+                        ("on + overlay", overlay)):
+        print(f"{name:<13} {stats['mean']:>9.3f} {stats['p50']:>8.3f} "
+              f"{stats['p99']:>8.3f}")
+
+    with tempfile.TemporaryDirectory() as folder:
+        csv_path = os.path.join(folder, "profile.csv")
+        json_path = os.path.join(folder, "profile.json")
+        profiler.save_csv(csv_path)
+        profiler.save_chrome_trace(json_path)
+        with open(csv_path, newline="") as file:
+            rows = list(csv.DictReader(file))
+        with open(json_path) as file:
+            events = json.load(file)["traceEvents"]
+    zones = sorted({row["zone"] for row in rows})
+    print(f"exported {len(rows)} of {profiler.count} timings (the ring "
+          f"buffer keeps {profiler.capacity}), zones: {', '.join(zones)}")
+    if len(rows) != len(events) or not rows:
+        print("CSV and trace don't have the same timings", file=sys.stderr)
+        sys.exit(1)
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
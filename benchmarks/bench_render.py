@@ -0,0 +1,129 @@
+"""Compare the full and dirty rectangle renderers
+
+Run from the project folder with:
+    python -m benchmarks.bench_render [frames]
+
+First checks that DirtyRectRenderer leaves exactly the same pixels on
+screen as FullRenderer for every frame of a few games, particles
+included. Then, for the playing, main menu and help menu states,
+measures the average time to draw and present a frame and how many
+pixels each renderer sends to the display per frame. Menus that don't
+change should send nothing.
+"""
+
+import os
+import sys
+import time
+import random
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+import main
+from particles import ParticleSystem
+from render import FullRenderer, DirtyRectRenderer, submit_death_screen
+from sprites import build_atlas
+from world import World, WIDTH, HEIGHT, INPUT_JUMP, INPUT_DOWN
+
+
+def get_inputs(frame):
+    """jump for a while, then crawl for a while"""
+    if frame % 90 < 40:
+        return INPUT_JUMP
+    if frame % 90 > 70:
+        return INPUT_DOWN
+    return 0
+
+
+def check_same_pixels(screen, games, frames):
+    """draw the same games with both renderers on two copies of the
+    screen and compare them after every frame"""
+    full = FullRenderer(screen.copy())
+    dirty = DirtyRectRenderer(screen.copy())
+    scores = [900, 850, 500, 420, 300, 120, 80, 40, 10, 0]
+    checked = 0
+    for game in range(games):
+        random.seed(game)
+        world = World(character=game % 3 + 1)
+        particles = ParticleSystem(seed=game)
+        # start from the menu like the game does
+        for renderer in (full, dirty):
+            renderer.draw_static(("main_menu", tuple(scores)),
+                                 lambda surf: main.draw_menu(surf, scores))
+        for _ in range(frames):
+            if game % 2:  # keep some games alive longer to see power ups
+                world.player_shield = 25
+            particles.update()
+            particles.emit_events(world.step(get_inputs(world.frame)))
+            for renderer in (full, dirty):
+                renderer.draw_playing(world, None, particles)
+                if world.dead:
+                    renderer.draw_overlay(lambda queue:
+                                          submit_death_screen(queue, world))
+            if (pygame.image.tobytes(full.screen, "RGB") !=
+                    pygame.image.tobytes(dirty.screen, "RGB")):
+                print(f"game {game} frame {world.frame}: renderers drew "
+                      f"different pixels", file=sys.stderr)
+                return False
+            checked += 1
+            if world.dead:
+                break
+    print(f"checked {checked} frames: both renderers drew the same pixels")
+    return True
+
+
+def time_state(renderer, draw_frame, frames):
+    """(average milliseconds per frame, pixels pushed per frame)"""
+    draw_frame(renderer)  # first frame draws everything
+    renderer.present()
+    pixels = renderer.pixels_pushed
+    start = time.perf_counter()
+    for _ in range(frames):
+        draw_frame(renderer)
+        renderer.present()
+    elapsed = time.perf_counter() - start
+    return elapsed / frames * 1000, (renderer.pixels_pushed - pixels) / frames
+
+
+def main_benchmark(frames):
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    build_atlas()
+    if not check_same_pixels(screen, games=6, frames=3000):
+        sys.exit(1)
+
+    scores = [900, 850, 500, 420, 300, 120, 80, 40, 10, 0]
+    random.seed(0)
+    world = World(character=1)
+
+    def playing_frame(renderer):
+        world.step(get_inputs(world.frame))
+        if world.dead:
+            world.reset(character=1)
+        renderer.draw_playing(world)
+
+    def menu_frame(renderer):
+        renderer.draw_static(("main_menu", tuple(scores)),
+                             lambda surf: main.draw_menu(surf, scores))
+
+    def help_frame(renderer):
+        renderer.draw_static(("help_menu",), main.draw_help_menu)
+
+    print(f"screen has {WIDTH * HEIGHT} pixels")
+    print("state      renderer  ms/frame  pixels/frame")
+    for name, draw_frame in (("playing", playing_frame),
+                             ("main_menu", menu_frame),
+                             ("help_menu", help_frame)):
+        for renderer_name, renderer in (("full", FullRenderer),
+                                        ("dirty", DirtyRectRenderer)):
+            random.seed(0)
+            world.reset(character=1)
+            ms, pixels = time_state(renderer(screen), draw_frame, frames)
+            print(f"{name:<10} {renderer_name:<9} {ms:>8.3f} "
+                  f"{pixels:>13.0f}")
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
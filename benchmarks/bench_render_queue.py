@@ -0,0 +1,141 @@
+"""Draw calls and frame time of the render queue in phase 4
+
+Run from the project folder with:
+    python -m benchmarks.bench_render_queue [frames]
+
+Plays a game into phase 4 (the HP and shield are refilled so it keeps
+going) and draws `frames` frames three ways: the way the game used to
+(a blit, fill or draw.rect call for every object and HUD part as soon
+as it is worked out), with the RenderQueue (one Surface.blits() call
+per layer) and with the HeadlessRenderer (submits, draws nothing).
+Checks the first two draw the same pixels, then prints the drawing
+calls per frame (counted with cProfile) and the frame time.
+"""
+
+import os
+import sys
+import time
+import cProfile
+import pstats
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+from render import (FullRenderer, HeadlessRenderer, display_player_health,
+                    display_score, display_player_power_up, get_fade_level)
+from sprites import build_atlas, get_sprite, get_fade_frame
+from world import (World, WIDTH, HEIGHT, GROUND_Y, SMALL_SCALE,
+                   SPAWN_RULES)
+
+# calls that put pixels on a surface, as cProfile names them
+DRAW_CALLS = ["<method 'blit' of 'pygame.surface.Surface' objects>",
+              "<method 'blits' of 'pygame.surface.Surface' objects>",
+              "<method 'fill' of 'pygame.surface.Surface' objects>",
+              "<built-in method pygame.draw.rect>"]
+
+
+class OldRenderer:
+    """how playing frames used to be drawn"""
+
+    def __init__(self, screen):
+        self.screen = screen
+
+    def draw_playing(self, world):
+        screen = self.screen
+        screen.fill("purple")
+        screen.blit(get_sprite("level", "sky"), (0, 0))
+        screen.blit(get_sprite("level", "ground"), (0, GROUND_Y))
+        display_player_health(screen, world.player_hp, world.player_shield)
+        display_score(screen, world.score)
+        display_player_power_up(screen, world)
+        scale = SMALL_SCALE if world.player_is_small else 1
+        screen.blit(get_sprite("player", world.player_pose, scale),
+                    world.player_rect)
+        for egg in world.eggs:
+            if not egg.visible:
+                egg_surf = get_fade_frame(egg.type,
+                                          get_fade_level(egg.rect.x))
+            else:
+                egg_surf = get_sprite("egg", egg.type)
+            screen.blit(egg_surf, egg.rect)
+        for power_up in world.power_ups:
+            screen.blit(get_sprite("power_up", power_up.type),
+                        power_up.rect)
+
+
+def get_phase_4_world():
+    """a game that just got to phase 4, the same one every time"""
+    world = World(character=1, seed=0)
+    start = SPAWN_RULES.phases[-1].start
+    while world.frame < start:
+        world.player_hp = 100
+        world.player_shield = 25
+        world.step(0)
+    return world
+
+
+def play(renderer, frames, on_frame=None):
+    """draw `frames` phase 4 frames, returns the ms each took"""
+    world = get_phase_4_world()
+    times = []
+    for _ in range(frames):
+        world.player_hp = 100
+        world.player_shield = 25
+        world.step(0)
+        start = time.perf_counter()
+        renderer.draw_playing(world)
+        times.append(time.perf_counter() - start)
+        if on_frame is not None:
+            on_frame()
+    return [elapsed * 1000 for elapsed in times]
+
+
+def check_same_pixels(screen, frames):
+    old = OldRenderer(screen.copy())
+    new = FullRenderer(screen.copy())
+    images = []
+    play(old, frames, lambda: images.append(
+        pygame.image.tobytes(old.screen, "RGB")))
+    checked = []
+    play(new, frames, lambda: checked.append(
+        pygame.image.tobytes(new.screen, "RGB") == images[len(checked)]))
+    return all(checked)
+
+
+def count_calls(renderer, frames):
+    """drawing calls per frame"""
+    profile = cProfile.Profile()
+    profile.enable()
+    play(renderer, frames)
+    profile.disable()
+    counts = {name: calls for (_, _, name), (calls, *_)
+              in pstats.Stats(profile).stats.items()}
+    return sum(counts.get(name, 0) for name in DRAW_CALLS) / frames
+
+
+def main(frames):
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    build_atlas()
+    if not check_same_pixels(screen, frames):
+        print("the render queue drew different pixels", file=sys.stderr)
+        sys.exit(1)
+    print(f"{frames} phase 4 frames: the render queue draws the same "
+          f"pixels as drawing every object straight away")
+    world = get_phase_4_world()
+    print(f"{len(world.eggs)} eggs and {len(world.power_ups)} power ups on "
+          f"screen at the start")
+    print("renderer      draw calls/frame  ms avg  ms p99")
+    for name, renderer in (("old", OldRenderer(screen)),
+                           ("render queue", FullRenderer(screen)),
+                           ("headless", HeadlessRenderer(screen))):
+        calls = count_calls(renderer, frames)
+        times = sorted(play(renderer, frames))
+        print(f"{name:<13} {calls:>16.1f} {sum(times) / frames:>7.3f} "
+              f"{times[frames * 99 // 100]:>7.3f}")
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
@@ -0,0 +1,109 @@
+"""Record, load and verify replays
+
+Run from the project folder with:
+    python -m benchmarks.bench_replay [games]
+
+Records `games` games played by a simple bot with replay.ReplayWriter,
+then reports the replay size per frame and how fast they load and verify
+compared to real time (60 frames per second). Also checks that a replay
+played with a different seed or a missing frame is caught and that a
+replay without an end (the game didn't finish writing it) can still be
+played.
+"""
+
+import os
+import sys
+import time
+import random
+import tempfile
+
+from replay import (ReplayWriter, read_replay, play_replay, verify_replay,
+                    get_state_digest)
+from world import World
+from benchmarks.bench_batch_world import get_inputs
+
+
+def record_games(folder, games):
+    """play and record games, returns the replay paths"""
+    paths = []
+    world = World()
+    for game in range(games):
+        world.reset(character=game % 3 + 1, seed=game)
+        path = os.path.join(folder, f"game_{game}.eggr")
+        writer = ReplayWriter(path, world.seed, world.character)
+        inputs_rng = random.Random(-game)
+        while not world.dead:
+            inputs = get_inputs(world, inputs_rng)
+            writer.write(inputs)
+            world.step(inputs)
+        writer.close(world)
+        paths.append(path)
+    return paths
+
+
+def check_changed(path):
+    """a replay with a different seed or a missing frame must not
+    verify"""
+    replay = read_replay(path)
+    for changed in (replay._replace(seed=replay.seed + 1),
+                    replay._replace(inputs=replay.inputs[:-1])):
+        world = play_replay(changed)
+        if get_state_digest(world) == replay.digest:
+            return False
+    return True
+
+
+def check_no_end(path, folder):
+    """cut off the end of a replay and play what is left"""
+    with open(path, "rb") as file:
+        data = file.read()
+    cut_path = os.path.join(folder, "cut.eggr")
+    with open(cut_path, "wb") as file:
+        file.write(data[:len(data) * 2 // 3])
+    replay = read_replay(cut_path)
+    play_replay(replay)
+    return replay.digest is None and replay.frames > 0
+
+
+def main(games):
+    with tempfile.TemporaryDirectory() as folder:
+        start = time.perf_counter()
+        paths = record_games(folder, games)
+        record_time = time.perf_counter() - start
+
+        size = sum(os.path.getsize(path) for path in paths)
+        start = time.perf_counter()
+        replays = [read_replay(path) for path in paths]
+        load_time = time.perf_counter() - start
+        frames = sum(replay.frames for replay in replays)
+
+        start = time.perf_counter()
+        world = World()
+        ok = sum(verify_replay(path, world) for path in paths)
+        verify_time = time.perf_counter() - start
+
+        if not check_changed(paths[1]):
+            print("a changed replay still verified",
+                  file=sys.stderr)
+            sys.exit(1)
+        if not check_no_end(paths[1], folder):
+            print("a replay without an end couldn't be played",
+                  file=sys.stderr)
+            sys.exit(1)
+
+    print(f"{games} games, {frames} frames "
+          f"({frames / 60 / 60:.1f} minutes of play)")
+    print(f"recording: {record_time:.2f}s (includes playing the games)")
+    print(f"size: {size} bytes, {size / frames:.3f} bytes/frame, "
+          f"{size / games:.0f} bytes/replay")
+    print(f"loading: {load_time * 1000:.1f} ms, "
+          f"{frames / load_time:,.0f} frames/sec")
+    print(f"verifying: {ok}/{games} match in {verify_time:.2f}s, "
+          f"{frames / verify_time / 60:,.0f}x real time")
+    print("changed replays detected, replay without an end plays")
+    if ok != games:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
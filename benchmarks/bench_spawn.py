@@ -0,0 +1,203 @@
+"""Spawn rules from spawn_rules.json vs the old hand-written rules
+
+Run from the project folder with:
+    python -m benchmarks.bench_spawn [samples]
+
+The alias method and the geometric power up wait use different random
+numbers than the old if/elif rules and the randint(0, 1000) roll every
+frame, so games with the same seed are different, but they should
+spawn the same things just as often. This draws `samples` eggs in every
+phase both ways and checks the egg type and invisible shares, the
+average gap and how long power ups take to spawn match, then times
+get_egg(), get_obstacle_speed() and the power up spawn check.
+"""
+
+import sys
+import time
+import random
+from collections import Counter
+from math import log2
+
+from world import (MIN_EGG_DIST, GROUND_Y, SPAWN_RULES, get_egg,
+                   get_obstacle_speed, get_power_up_wait, get_egg_lift,
+                   new_egg, egg_pool)
+
+TOLERANCE = 0.01  # largest difference allowed in a share (1%)
+GAP_TOLERANCE = 2  # largest difference allowed in the average gap (px)
+
+
+def old_get_phase(frame):
+    if frame < 900:
+        return 1
+    elif frame < 1800:
+        return 2
+    elif frame < 2700:
+        return 3
+    else:
+        return 4
+
+
+def old_get_obstacle_speed(frame):
+    slowest = 5.5
+    fastest = 8
+    if frame < 2700:
+        return frame * (fastest - slowest) / 2700 + slowest
+    else:
+        return fastest + 5*log2(frame/2700)
+
+
+def old_get_egg(prev_loc, frame, rng):
+    """the old rules, returns (type, left, visible) without making an
+    Egg"""
+    randint = rng.randint
+    phase = old_get_phase(frame)
+    visible = True
+    if phase == 1:
+        type_egg = 1
+    elif phase == 2:
+        type_egg = 1 if randint(0, 1) == 0 else 4
+    else:
+        type_egg = randint(1, 10)
+        if phase == 4:
+            visible = randint(0, 1)
+    if type_egg <= 3:
+        return ("normal", max(MIN_EGG_DIST + prev_loc + randint(0, 150),
+                              randint(800, 1100)), visible)
+    elif type_egg <= 6:
+        low = -55 if phase == 4 else -35
+        return ("fried", max(MIN_EGG_DIST + prev_loc + randint(low, 120),
+                             randint(800, 950)), visible)
+    elif type_egg <= 8:
+        return ("flying", max(MIN_EGG_DIST + prev_loc + randint(30, 150),
+                              randint(800, 1000)), visible)
+    else:
+        return ("flying2", max(MIN_EGG_DIST + prev_loc + randint(30, 150),
+                               randint(800, 1000)), visible)
+
+
+def new_get_egg(prev_loc, frame, rng):
+    egg = get_egg(prev_loc, frame, rng)
+    egg_pool.append(egg)  # give it back, only the numbers are needed
+    return egg.type, egg.rect.left, egg.visible
+
+
+def get_spawn_stats(get, frame, samples, rng):
+    """(type shares, invisible share, average left - prev_loc)"""
+    types = Counter()
+    invisible = 0
+    total_gap = 0
+    for _ in range(samples):
+        egg_type, left, visible = get(0, frame, rng)
+        types[egg_type] += 1
+        invisible += not visible
+        total_gap += left
+    shares = {egg_type: count / samples for egg_type, count in types.items()}
+    return shares, invisible / samples, total_gap / samples
+
+
+def check_eggs(samples):
+    ok = True
+    print("phase  egg        old share  new share")
+    for phase in SPAWN_RULES.phases:
+        frame = phase.start + 1
+        old = get_spawn_stats(old_get_egg, frame, samples, random.Random(1))
+        new = get_spawn_stats(new_get_egg, frame, samples, random.Random(2))
+        for egg_type in sorted(set(old[0]) | set(new[0])):
+            old_share = old[0].get(egg_type, 0)
+            new_share = new[0].get(egg_type, 0)
+            ok &= abs(old_share - new_share) <= TOLERANCE
+            print(f"{phase.number:>5}  {egg_type:<9} {old_share:>10.3f} "
+                  f"{new_share:>10.3f}")
+        print(f"{phase.number:>5}  invisible {old[1]:>10.3f} {new[1]:>10.3f}")
+        print(f"{phase.number:>5}  left px   {old[2]:>10.1f} {new[2]:>10.1f}")
+        ok &= abs(old[1] - new[1]) <= TOLERANCE
+        ok &= abs(old[2] - new[2]) <= GAP_TOLERANCE
+    return ok
+
+
+def check_power_ups(samples):
+    """frames between power ups, rolling every frame vs one wait"""
+    rng = random.Random(3)
+    old_waits = []
+    for _ in range(samples // 10):
+        wait = 0
+        while rng.randint(0, 1000) != 0:
+            wait += 1
+        old_waits.append(wait)
+    new_waits = [get_power_up_wait(rng.random())
+                 for _ in range(samples // 10)]
+    old_mean = sum(old_waits) / len(old_waits)
+    new_mean = sum(new_waits) / len(new_waits)
+    old_soon = sum(wait < 100 for wait in old_waits) / len(old_waits)
+    new_soon = sum(wait < 100 for wait in new_waits) / len(new_waits)
+    chance = SPAWN_RULES.power_up_chance
+    print(f"power up wait: old mean {old_mean:.0f} frames, new mean "
+          f"{new_mean:.0f} (expected {(1 - chance) / chance:.0f}"
+          f"), under 100 frames: old {old_soon:.3f}, new {new_soon:.3f}")
+    return (abs(old_mean - new_mean) / old_mean <= 0.05 and
+            abs(old_soon - new_soon) <= TOLERANCE)
+
+
+def time_calls(name, old, new, calls=200_000):
+    times = []
+    for function in (old, new):
+        start = time.perf_counter()
+        function(calls)
+        times.append((time.perf_counter() - start) / calls * 1e9)
+    print(f"{name:<24} {times[0]:>8.0f} {times[1]:>8.0f} "
+          f"{times[0] / times[1]:>8.1f}x")
+
+
+def time_all():
+    rng = random.Random(4)
+    frame = 3000  # phase 4, the speed uses log2()
+
+    def old_eggs(calls):
+        for _ in range(calls):
+            egg_type, left, visible = old_get_egg(0, frame, rng)
+            egg_pool.append(new_egg(egg_type, left,
+                                    GROUND_Y - get_egg_lift[egg_type],
+                                    visible))
+
+    def new_eggs(calls):
+        for _ in range(calls):
+            egg_pool.append(get_egg(0, frame, rng))
+
+    def old_speed(calls):
+        for _ in range(calls):
+            old_get_obstacle_speed(frame)
+
+    def new_speed(calls):
+        for _ in range(calls):
+            get_obstacle_speed(frame)
+
+    def old_power_up(calls):
+        for _ in range(calls):
+            if rng.randint(0, 1000) == 0:
+                pass
+
+    def new_power_up(calls):
+        next_power_up = 0
+        for step in range(calls):
+            if step >= next_power_up:
+                next_power_up = step + 1 + get_power_up_wait(rng.random())
+
+    print("ns per call               old      new  speedup")
+    time_calls("get_egg()", old_eggs, new_eggs)
+    time_calls("get_obstacle_speed()", old_speed, new_speed)
+    time_calls("power up check/frame", old_power_up, new_power_up)
+
+
+def main(samples):
+    eggs_ok = check_eggs(samples)
+    power_ups_ok = check_power_ups(samples)
+    time_all()
+    if not (eggs_ok and power_ups_ok):
+        print("the spawn rules changed how often things spawn",
+              file=sys.stderr)
+        sys.exit(1)
+    print("spawn_rules.json spawns the same things as often as before")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
@@ -0,0 +1,103 @@
+"""Check that drawing frames doesn't scale any images
+
+Run from the project folder with:
+    python -m benchmarks.bench_sprites [frames]
+
+Counts every pygame.transform call while building the sprite atlas and
+while drawing playing frames (with the "small" power up active, so the
+player and HUD icon use scaled sprites) and main menu frames. After the
+atlas is built the count must stay at 0. Also compares frame time to
+building the scaled sprites every frame like the game used to.
+"""
+
+import os
+import sys
+import time
+import random
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+import render
+import sprites
+from sprites import build_atlas
+from world import World, WIDTH, HEIGHT, INPUT_JUMP, Player_power_up
+
+transform_calls = 0
+
+
+def count_calls(function):
+    """wrap a pygame.transform function to count how often it's used"""
+    def counted(*args, **kwargs):
+        global transform_calls
+        transform_calls += 1
+        return function(*args, **kwargs)
+    return counted
+
+
+def instrument_transform():
+    for name in dir(pygame.transform):
+        function = getattr(pygame.transform, name)
+        if callable(function) and not name.startswith("_"):
+            setattr(pygame.transform, name, count_calls(function))
+
+
+def time_frames(draw_frame, frames):
+    """(average milliseconds per frame, transform calls made)"""
+    calls = transform_calls
+    start = time.perf_counter()
+    for _ in range(frames):
+        draw_frame()
+    elapsed = time.perf_counter() - start
+    return elapsed / frames * 1000, transform_calls - calls
+
+
+def main_benchmark(frames):
+    instrument_transform()
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    build_atlas()
+    print(f"building atlas: {len(sprites.atlas)} sprites, "
+          f"{transform_calls} transform calls")
+
+    random.seed(0)
+    world = World(character=1)
+    scores = [900, 850, 500, 420, 300, 120, 80, 40, 10, 0]
+
+    def playing_frame():
+        # stay small and alive so the scaled sprites are always drawn
+        world.cur_power_up = Player_power_up("small", 1000)
+        world.player_hp = 100
+        world.step(INPUT_JUMP if world.frame % 40 < 20 else 0)
+        render.draw_world(screen, world)
+
+    def menu_frame():
+        screen.fill("black")
+        render.display_main_menu(screen, scores)
+        render.display_help_button(screen)
+
+    def rebuild_scaled():
+        # what the game did every frame before the atlas existed
+        scale = sprites.SMALL_SCALE
+        sprites.make_variant("player", world.player_pose, scale)
+        sprites.make_variant("power_up", "small", sprites.POWER_UP_ICON_SIZE)
+        sprites.make_variant("player_inverted", "jump",
+                             sprites.MENU_CHARACTER_SIZE)
+
+    failed = False
+    print("state     ms/frame  transform calls")
+    for name, draw_frame in (("playing", playing_frame),
+                             ("menu", menu_frame)):
+        ms, calls = time_frames(draw_frame, frames)
+        print(f"{name:<9} {ms:>8.3f} {calls:>16}")
+        failed = failed or calls > 0
+    ms, calls = time_frames(rebuild_scaled, frames)
+    print(f"per-frame scaling that the atlas replaces: {ms:.3f} ms/frame")
+    pygame.quit()
+    if failed:
+        sys.exit("transform calls were made while drawing frames")
+
+
+if __name__ == "__main__":
+    main_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
@@ -0,0 +1,148 @@
+"""Cold start time with and without the sprite bundle
+
+Run from the project folder with:
+    python -m benchmarks.bench_startup [runs]
+
+Checks the sprites loaded from the bundle (bundle.py) have exactly the
+same pixels as the ones built from the PNGs and that a bundle cut short
+isn't used, then starts the game in a new Python process `runs` times
+each way, taking turns, and measures the time from launching the
+process to the first main menu frame being drawn, and how long
+build_atlas() and the first frame took inside it. Starting Python and
+importing pygame take most of the time and vary by tens of ms, so it
+prints medians and compares each bundle start with the PNG start next
+to it. Fails if the bundle doesn't get from build_atlas() to the first
+frame sooner (the part of the start the bundle changes, the bundle's
+pixels are first touched while drawing so that is counted too).
+"""
+
+import os
+import sys
+import time
+import subprocess
+from statistics import median
+from collections import defaultdict
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+import bundle
+import sprites
+from sprites import build_atlas, get_bundle_surfaces
+
+MODES = ("png", "bundle")
+
+
+def start_game(mode):
+    """what main() does up to the first frame, run in the new process"""
+    from leaderboard import Leaderboard
+    from main import Game, create_window
+
+    pygame.init()
+    screen = create_window(False)
+    atlas_start = time.perf_counter()
+    build_atlas(use_bundle=mode == "bundle")
+    atlas_time = time.perf_counter() - atlas_start
+    screen.fill("black")
+    game = Game(screen, "full", leaderboard=Leaderboard())
+    game.run_frame([], defaultdict(bool))
+    game.renderer.present()
+    # the bundle's pixels are first touched while drawing, count it too
+    print("ready", time.perf_counter() - atlas_start, atlas_time,
+          flush=True)
+
+
+def time_start(mode):
+    """seconds from launching the process to the first frame, from
+    build_atlas() to the first frame, and spent in build_atlas()"""
+    start = time.perf_counter()
+    child = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.bench_startup", "--child", mode],
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    for line in child.stdout:
+        if line.startswith("ready"):
+            startup = time.perf_counter() - start
+            load_time, atlas_time = map(float, line.split()[1:])
+            break
+    else:
+        raise RuntimeError(f"the {mode} start didn't draw a frame")
+    child.wait()
+    return startup, load_time, atlas_time
+
+
+def check_cut_short():
+    """a bundle missing its end isn't loaded"""
+    with open(sprites.BUNDLE_FILE, "rb") as file:
+        data = file.read()
+    cut_path = sprites.BUNDLE_FILE + ".cut"
+    try:
+        for size in (len(data) - 1, len(data) // 2, 30, 10):
+            with open(cut_path, "wb") as file:
+                file.write(data[:size])
+            if bundle.load_bundle(cut_path,
+                                  sprites.get_source_hash()) is not None:
+                return False
+    finally:
+        os.remove(cut_path)
+    return True
+
+
+def check_pixels():
+    """the bundle gives the same pixels as building from the PNGs"""
+    pygame.init()
+    pygame.display.set_mode((1, 1))
+    build_atlas(use_bundle=False)
+    built = {key: pygame.image.tobytes(surf, "RGBA")
+             for key, surf in get_bundle_surfaces().items()}
+    build_atlas()  # saves the bundle if it's missing or out of date
+    build_atlas()  # loads it
+    loaded = get_bundle_surfaces()
+    different = [key for key, pixels in built.items()
+                 if key not in loaded or
+                 pygame.image.tobytes(loaded[key], "RGBA") != pixels]
+    print(f"{len(built)} sprites, {len(different)} different in the bundle "
+          f"({os.path.getsize(sprites.BUNDLE_FILE) / 1e6:.1f} MB)")
+    cut_short_ok = check_cut_short()
+    pygame.quit()
+    if not cut_short_ok:
+        print("a bundle cut short was loaded", file=sys.stderr)
+    return not different and cut_short_ok
+
+
+def main(runs):
+    if not check_pixels():
+        print("the bundle has different pixels than the PNGs",
+              file=sys.stderr)
+        sys.exit(1)
+    times = {mode: [] for mode in MODES}
+    for mode in MODES:
+        time_start(mode)  # warm up the disk cache
+    for run in range(runs):
+        # take turns, and swap who goes first, so a slow moment of the
+        # computer hits both modes
+        for mode in MODES if run % 2 == 0 else MODES[::-1]:
+            times[mode].append(time_start(mode))
+    print("mode     start ms  atlas + frame ms  build_atlas ms")
+    for mode in MODES:
+        print(f"{mode:<8} {median(t[0] for t in times[mode]) * 1000:>8.1f} "
+              f"{median(t[1] for t in times[mode]) * 1000:>17.1f} "
+              f"{median(t[2] for t in times[mode]) * 1000:>15.1f}")
+    pairs = list(zip(times["png"], times["bundle"]))
+    saved = median((png[0] - bundle_start[0]) * 1000
+                   for png, bundle_start in pairs)
+    load_saved = median((png[1] - bundle_start[1]) * 1000
+                        for png, bundle_start in pairs)
+    print(f"the bundle gets from build_atlas() to the first frame "
+          f"{load_saved:.1f} ms sooner and starts the game {saved:.1f} ms "
+          f"sooner (medians of {runs} pairs)")
+    if load_saved <= 0:
+        print("the bundle doesn't start the game sooner", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--child"]:
+        start_game(sys.argv[2])
+    else:
+        main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
@@ -0,0 +1,69 @@
+"""Per-frame drawing time with and without the font/text cache
+
+Run from the project folder with:
+    python -m benchmarks.bench_text [frames]
+
+Draws playing and main menu frames into a hidden window (SDL dummy
+video driver). "uncached" clears fonts.py's caches before every frame,
+which is the same work the game did before the cache existed: loading
+every font and rendering every piece of text each frame.
+"""
+
+import os
+import sys
+import time
+import random
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+import fonts
+import render
+from sprites import build_atlas
+from world import World, WIDTH, HEIGHT, INPUT_JUMP
+
+
+def time_frames(draw_frame, frames, cached):
+    """average milliseconds per call of draw_frame()"""
+    fonts.clear_cache()
+    draw_frame()  # load fonts once so both runs start warm
+    start = time.perf_counter()
+    for _ in range(frames):
+        if not cached:
+            fonts.clear_cache()
+        draw_frame()
+    return (time.perf_counter() - start) / frames * 1000
+
+
+def main_benchmark(frames):
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    build_atlas()
+    random.seed(0)
+    world = World(character=1)
+    scores = [900, 850, 500, 420, 300, 120, 80, 40, 10, 0]
+
+    def playing_frame():
+        world.step(INPUT_JUMP)
+        if world.dead:
+            world.reset(character=1)
+        render.draw_world(screen, world)
+
+    def menu_frame():
+        screen.fill("black")
+        render.display_main_menu(screen, scores)
+        render.display_help_button(screen)
+
+    print("state     uncached ms  cached ms  speedup")
+    for name, draw_frame in (("playing", playing_frame),
+                             ("menu", menu_frame)):
+        before = time_frames(draw_frame, frames, cached=False)
+        after = time_frames(draw_frame, frames, cached=True)
+        print(f"{name:<9} {before:>11.3f} {after:>10.3f} "
+              f"{before / after:>7.1f}x")
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
@@ -0,0 +1,132 @@
+"""Check the fixed timestep keeps the game the same at any frame rate
+
+Run from the project folder with:
+    python -m benchmarks.bench_timestep [games]
+
+Plays the same scripted games through main.py's Game at a simulated
+30, 60 and 144 frames per second (no real waiting, each frame just
+tells the FixedTimestep that 1/fps seconds passed) and checks every
+game ends with the same score and that the same number of games were
+lost. The script only decides which keys to hold on even World steps,
+so 2 steps per frame (30 FPS) see the same keys as 1 step per frame.
+
+Then simulates a computer too slow to keep up and shows the catch-up
+limit: at most MAX_STEPS steps per frame, the rest of the time is
+dropped so the game slows down instead of freezing.
+"""
+
+import os
+import sys
+import time
+import random
+from collections import defaultdict
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+from main import Game
+from sprites import build_atlas
+from timestep import FixedTimestep, MAX_STEPS, STEP
+from world import WIDTH, HEIGHT
+
+CHARACTER_BUTTONS = {1: (220, 240), 2: (370, 240), 3: (515, 240)}
+
+
+def get_script_keys(world):
+    """hold jump before ground eggs and down before flying eggs"""
+    keys = defaultdict(bool)
+    for egg in world.eggs:
+        distance = egg.rect.left - world.player_rect.right
+        if 0 <= distance <= 40 + 4 * world.frame // 1000:
+            if egg.type in ("normal", "fried"):
+                keys[pygame.K_SPACE] = True
+            else:
+                keys[pygame.K_DOWN] = True
+    return keys
+
+
+def get_script_input(game):
+    """events and keys for this frame"""
+    world = game.world
+    events = []
+    keys = defaultdict(bool)
+    if game.game_state == "main_menu":  # pick the next character
+        character = game.games_started % 3 + 1
+        events.append(pygame.event.Event(
+            pygame.MOUSEBUTTONDOWN, button=1,
+            pos=CHARACTER_BUTTONS[character]))
+    elif game.game_state == "dead":  # back to the menu
+        events.append(pygame.event.Event(pygame.KEYDOWN,
+                                         key=pygame.K_SPACE))
+    else:
+        if world.frame % 2 == 0:
+            game.script_keys = get_script_keys(world)
+        keys = game.script_keys
+        if world.frame % 200 == 100:  # drop down from a jump sometimes
+            events.append(pygame.event.Event(pygame.KEYDOWN,
+                                             key=pygame.K_DOWN))
+    return events, keys
+
+
+def play(screen, fps, games):
+    """play `games` scripted games at `fps`, returns (final scores,
+    deaths, frames drawn)"""
+    random.seed(0)  # same game seeds at every frame rate
+    game = Game(screen, "full")
+    game.games_started = 0
+    timestep = FixedTimestep()
+    final_scores = []
+    deaths = 0
+    frames = 0
+    while len(final_scores) < games:
+        state = game.game_state
+        events, keys = get_script_input(game)
+        steps, alpha = game.get_steps_and_alpha(timestep, 1 / fps)
+        game.run_frame(events, keys, steps, alpha)
+        frames += 1
+        if state == "main_menu" and game.game_state == "playing":
+            game.games_started += 1
+        if state == "playing" and game.game_state == "dead":
+            deaths += 1
+            final_scores.append(game.world.score)
+    return final_scores, deaths, frames
+
+
+def check_frame_rates(screen, games):
+    results = {}
+    for fps in (30, 60, 144):
+        start = time.perf_counter()
+        results[fps] = play(screen, fps, games)
+        elapsed = time.perf_counter() - start
+        scores, deaths, frames = results[fps]
+        print(f"{fps:>3} FPS: {deaths} deaths, {frames} frames drawn, "
+              f"scores {scores} ({elapsed:.1f}s)")
+    if not (results[30][:2] == results[60][:2] == results[144][:2]):
+        print("the frame rate changed the game", file=sys.stderr)
+        return False
+    print("same scores and deaths at 30, 60 and 144 FPS")
+    return True
+
+
+def check_catch_up():
+    """frames that take 200ms only run MAX_STEPS steps"""
+    timestep = FixedTimestep()
+    steps = [timestep.advance(0.2) for _ in range(10)]
+    game_time = sum(steps) * STEP
+    print(f"10 frames of 200 ms ran {steps} steps: {game_time:.2f}s of "
+          f"game time in 2s, {timestep.dropped:.2f}s dropped")
+    return max(steps) <= MAX_STEPS
+
+
+def main(games):
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    build_atlas()
+    if not check_frame_rates(screen, games) or not check_catch_up():
+        sys.exit(1)
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 6)
@@ -0,0 +1,222 @@
+"""Egg and power up updates: ordered Track vs scanning every entity
+
+Run from the project folder with:
+    python -m benchmarks.bench_track [games]
+
+First plays `games` games with World (eggs and power ups on a
+world.Track, only the ones in the player's column are checked for
+collisions) and with the old update code (walk every entity, pop from
+the middle of a list, colliderect against every egg) and checks every
+frame is the same. Then fills the screen with hundreds of eggs and
+power ups and times update_eggs() + update_power_ups() both ways.
+"""
+
+import sys
+import time
+import random
+from collections import namedtuple
+
+from world import (World, Egg, Event, Player_power_up, Power_up,
+                   GROUND_Y, INPUT_JUMP, INPUT_DOWN, INPUT_DROP,
+                   get_egg, get_obstacle_speed, get_egg_size,
+                   get_power_up_size, get_rect, get_player_mask,
+                   get_egg_mask)
+
+Stress = namedtuple("Stress", ["eggs", "power_ups"])
+STRESS = [Stress(4, 0), Stress(50, 10), Stress(200, 50), Stress(500, 100),
+          Stress(1000, 250)]
+STRESS_FRAMES = 60  # frames timed after filling the screen
+
+
+class EntityList(list):
+    """how eggs and power ups used to be stored"""
+    add = list.append
+
+
+class OldWorld(World):
+    """World with the egg and power up code from before Track"""
+
+    def reset(self, character=1, seed=None):
+        super().reset(character, seed)
+        self.eggs = EntityList(self.eggs)
+        self.power_ups = EntityList()
+
+    def update_eggs(self, events):
+        eggs = self.eggs
+        for i in reversed(range(len(eggs))):
+            egg = eggs[i]
+            egg.rect.x -= get_obstacle_speed(self.frame)
+            if egg.rect.right <= 0:  # replace egg with a new one
+                eggs.pop(i)
+                eggs.append(get_egg(eggs[-1].rect.right, self.frame,
+                                    self.rng))
+                continue
+            if not egg.rect.colliderect(self.player_rect) or egg.destroyed:
+                continue
+            # pixel masks came later, checked the same way as World
+            if not get_player_mask[(self.player_pose,
+                                    self.player_is_small)].overlap(
+                    get_egg_mask[egg.type],
+                    (egg.rect.x - self.player_rect.x,
+                     egg.rect.y - self.player_rect.y)):
+                continue
+            eggs[i] = Egg(egg.rect, egg.type, True, egg.visible)
+            if egg.type in ("normal", "flying", "flying2"):
+                if self.player_shield > 0:
+                    self.player_shield = 0
+                    events.append(Event("shield_break", egg.type, egg.rect))
+                else:
+                    self.player_hp = 0
+                    events.append(Event("damage", egg.type, egg.rect))
+            elif egg.type == "fried":
+                if self.player_shield > 0:
+                    self.player_shield = max(0, self.player_shield - 20)
+                    events.append(Event("shield_break", egg.type, egg.rect))
+                else:
+                    self.player_hp -= 20
+                    events.append(Event("damage", egg.type, egg.rect))
+
+    def update_power_ups(self, events):
+        power_ups = self.power_ups
+        for i in reversed(range(len(power_ups))):
+            power_up_obj = power_ups[i]
+            power_up_obj.rect.x -= get_obstacle_speed(self.frame)
+            if power_up_obj.rect.right <= 0:
+                power_ups.pop(i)
+                continue
+            if power_up_obj.rect.colliderect(self.player_rect):
+                self.cur_power_up = Player_power_up(power_up_obj.type,
+                                                    power_up_obj.value)
+                power_ups.pop(i)
+                events.append(Event("pick_up", power_up_obj.type,
+                                    power_up_obj.rect))
+
+    def get_power_up(self):
+        location = 800
+        for egg in self.eggs:
+            egg_l = egg.rect.left
+            egg_r = egg.rect.right
+            if (egg_l <= location <= egg_r or
+                    location <= egg_l <= location + 40):
+                location = egg.rect.right + 20
+        choices = ["health", "shield", "fly", "small"]
+        if self.player_hp > 99 or self.character == 3:
+            choices.remove("health")
+        if self.character == 3:
+            choices.remove("shield")
+        chosen = self.rng.choice(choices)
+        value = self.get_max_power_up_val[chosen]
+        return Power_up(get_rect(get_power_up_size[chosen],
+                                 bottomleft=(location, GROUND_Y)),
+                        chosen, value)
+
+
+def get_state(world):
+    # power ups used to be kept in spawn order, a Track keeps them in
+    # order of their left edge, which is the same unless one spawned
+    # behind another
+    power_ups = sorted((tuple(p.rect), p.type, p.value)
+                       for p in world.power_ups)
+    return (world.frame, world.player_hp, world.player_shield,
+            tuple(world.player_rect),
+            (world.cur_power_up.type, world.cur_power_up.value),
+            [(tuple(egg.rect), egg.type, egg.destroyed, egg.visible)
+             for egg in world.eggs],
+            power_ups, world.rng.getstate())
+
+
+def get_inputs(world, rng):
+    """simple player with some random mistakes"""
+    inputs = 0
+    for egg in world.eggs:
+        distance = egg.rect.left - world.player_rect.right
+        if 0 <= distance <= 40 + 4 * world.frame // 1000:
+            if egg.type in ("normal", "fried"):
+                inputs |= INPUT_JUMP
+            else:
+                inputs |= INPUT_DOWN
+    if rng.random() < 0.05:
+        inputs ^= rng.choice([INPUT_JUMP, INPUT_DOWN, INPUT_DROP])
+    return inputs
+
+
+def check(games, max_frames=20_000):
+    """play the same games both ways and compare every frame"""
+    frames = 0
+    for game in range(games):
+        character = game % 3 + 1
+        world = World(character, seed=game)
+        old = OldWorld(character, seed=game)
+        inputs_rng = random.Random(-game)
+        for _ in range(max_frames):
+            inputs = get_inputs(world, inputs_rng)
+            events = world.step(inputs)
+            old_events = old.step(inputs)
+            assert get_state(world) == get_state(old), (game, world.frame)
+            assert ([event[:2] for event in events] ==
+                    [event[:2] for event in old_events]), (game, world.frame)
+            frames += 1
+            if world.dead:
+                break
+            if world.player_shield == 0 and game % 2:
+                # keep some games going to the later phases
+                world.player_shield = old.player_shield = 25
+    print(f"{games} games, {frames} frames: Track matches the old code")
+
+
+def fill(world, stress, rng):
+    """`stress.eggs` eggs and `stress.power_ups` power ups spread over
+    the screen (and a bit past it so they keep coming)"""
+    types = list(get_egg_size)
+    eggs = []
+    for _ in range(stress.eggs):
+        egg_type = rng.choice(types)
+        eggs.append(Egg(get_rect(get_egg_size[egg_type],
+                                 bottomleft=(rng.randint(0, 1600),
+                                             GROUND_Y)),
+                        egg_type, False, True))
+    power_ups = []
+    for _ in range(stress.power_ups):
+        power_up_type = rng.choice(list(get_power_up_size))
+        power_ups.append(Power_up(
+            get_rect(get_power_up_size[power_up_type],
+                     bottomleft=(rng.randint(0, 1600), GROUND_Y)),
+            power_up_type, 1))
+    eggs.sort(key=lambda egg: egg.rect.left)
+    for egg in eggs:
+        world.eggs.add(egg)
+    for power_up in power_ups:
+        world.power_ups.add(power_up)
+
+
+def time_stress(world_class, stress, repeats=20):
+    """milliseconds per frame of the egg and power up updates"""
+    total = 0
+    for repeat in range(repeats):
+        world = world_class(1, seed=repeat)
+        world.eggs.clear()
+        world.power_ups.clear()
+        fill(world, stress, random.Random(repeat))
+        world.player_hp = 10 ** 9  # survive being hit by everything
+        events = []
+        start = time.perf_counter()
+        for _ in range(STRESS_FRAMES):
+            world.update_eggs(events)
+            world.update_power_ups(events)
+            world.frame += 1
+        total += time.perf_counter() - start
+    return total / (repeats * STRESS_FRAMES) * 1000
+
+
+def main(games):
+    check(games)
+    print("eggs  power ups   old ms/frame  track ms/frame  speedup")
+    for stress in STRESS:
+        before = time_stress(OldWorld, stress)
+        after = time_stress(World, stress)
+        print(f"{stress.eggs:>4} {stress.power_ups:>10} {before:>14.4f} "
+              f"{after:>15.4f} {before / after:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 60)
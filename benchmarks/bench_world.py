@@ -0,0 +1,44 @@
+"""Benchmark for the headless World core
+
+Run from the project folder with:
+    python -m benchmarks.bench_world [frames]
+
+Steps the game without a window as fast as possible and prints how many
+frames per second the simulation can do. Games are restarted whenever
+the player dies, cycling through the 3 characters.
+"""
+
+import sys
+import time
+import random
+
+from world import World, INPUT_JUMP, INPUT_DOWN
+
+
+def run(frames):
+    """step `frames` frames and return (steps per second, games played)"""
+    random.seed(0)  # same eggs every run so results are comparable
+    world = World(character=1)
+    games = 1
+    start = time.perf_counter()
+    for i in range(frames):
+        # jump for a while then crawl for a while so all poses are used
+        inputs = INPUT_JUMP if i % 60 < 30 else INPUT_DOWN
+        world.step(inputs)
+        if world.dead:
+            games += 1
+            world.reset(character=games % 3 + 1)
+    elapsed = time.perf_counter() - start
+    return frames / elapsed, games
+
+
+def main():
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    steps_per_sec, games = run(frames)
+    print(f"{frames} frames, {games} games")
+    print(f"headless steps/sec: {steps_per_sec:,.0f} "
+          f"({steps_per_sec / 60:,.0f}x real time)")
+
+
+if __name__ == "__main__":
+    main()
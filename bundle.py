@@ -0,0 +1,127 @@
+"""Pre-converted sprite bundle
+
+build_atlas() in sprites.py decodes every PNG in graphics/, converts it
+to the display's pixel format and builds the scaled versions and fade
+frames. That gives the same pixels every time the game starts, so they
+are saved in one bundle file and loaded from it the next time: the file
+is read into memory with one read and every sprite becomes a Surface
+that uses the pixels where they are, no PNG is decoded. (Mapping the
+file with mmap only moves reading it to page faults on the first
+frame.) A bundle cut short is built again from the PNGs.
+
+The bundle starts with a hash of everything it was built from (the PNG
+files and the list of variants), if any of them change the hash doesn't
+match and the bundle is built again.
+
+    header   "EGGA", version, source hash, index length   (25 bytes)
+    index    JSON list of [key, width, height, opaque, offset]
+    pixels   every sprite's pixels as BGRA rows, 4 bytes per pixel
+
+Build the bundle ahead of time with:
+    python sprites.py
+"""
+
+import os
+import json
+import struct
+import hashlib
+
+import pygame
+
+MAGIC = b"EGGA"
+VERSION = 1
+HEADER = struct.Struct("<4sB16sI")  # magic, version, source hash, index size
+PIXEL_FORMAT = "BGRA"  # same bytes as a convert_alpha() surface
+
+
+def get_source_hash(files, extra):
+    """16 byte hash of the contents of `files` and repr(extra)"""
+    source_hash = hashlib.blake2b(digest_size=16)
+    source_hash.update(repr((VERSION, extra)).encode())
+    for path in files:
+        source_hash.update(path.encode())
+        with open(path, "rb") as file:
+            source_hash.update(file.read())
+    return source_hash.digest()
+
+
+def key_from_json(key):
+    """JSON turns tuples into lists, turn them back"""
+    return tuple(tuple(part) if isinstance(part, list) else part
+                 for part in key)
+
+
+def save_bundle(path, source_hash, surfaces):
+    """write `surfaces` (key -> Surface, keys are tuples of strings,
+    numbers and tuples) to a bundle, through a temporary file so a
+    crash can't leave half a bundle"""
+    index = []
+    pixels = []
+    offset = 0
+    for key, surf in surfaces.items():
+        width, height = surf.get_size()
+        opaque = not surf.get_flags() & pygame.SRCALPHA
+        index.append([key, width, height, opaque, offset])
+        data = pygame.image.tobytes(surf, PIXEL_FORMAT)
+        pixels.append(data)
+        offset += len(data)
+    index = json.dumps(index).encode()
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, source_hash, len(index)))
+        file.write(index)
+        for data in pixels:
+            file.write(data)
+    os.replace(temp_path, path)
+
+
+def load_bundle(path, source_hash):
+    """key -> Surface of every sprite in the bundle, or None if there is
+    no bundle, it was built from different sources or it is cut short.
+    Must be called after the display is created, like convert()"""
+    try:
+        file = open(path, "rb")
+    except FileNotFoundError:
+        return None
+    with file:
+        header = file.read(HEADER.size)
+        if len(header) < HEADER.size:
+            return None
+        magic, version, bundle_hash, index_size = HEADER.unpack(header)
+        if (magic != MAGIC or version != VERSION or
+                bundle_hash != source_hash):
+            return None
+        # the rest of the file in one read, into a bytearray the
+        # surfaces can use (and keep alive) without copying it
+        data = bytearray(os.fstat(file.fileno()).st_size - HEADER.size)
+        if file.readinto(data) != len(data) or index_size > len(data):
+            return None
+    try:
+        index = json.loads(data[:index_size])
+    except ValueError:
+        return None
+    pixels = memoryview(data)[index_size:]
+    # a bundle cut short (a full disk, a crash while copying it) is
+    # built again from the PNGs
+    if any(offset + width * height * 4 > len(pixels)
+           for key, width, height, opaque, offset in index):
+        return None
+
+    # sprites with transparency can use the bundle's pixels as they
+    # are if the display uses the same format, which it almost always
+    # does, otherwise they are converted like before
+    probe = pygame.Surface((1, 1), pygame.SRCALPHA).convert_alpha()
+    same_format = probe.get_masks() == pygame.image.frombuffer(
+        bytearray(4), (1, 1), PIXEL_FORMAT).get_masks()
+
+    surfaces = {}
+    for key, width, height, opaque, offset in index:
+        size = width * height * 4
+        surf = pygame.image.frombuffer(pixels[offset:offset + size],
+                                       (width, height), PIXEL_FORMAT)
+        if opaque:  # blitting without alpha is faster
+            surf = surf.convert()
+        elif not same_format:
+            surf = surf.convert_alpha()
+        surfaces[key_from_json(key)] = surf
+    return surfaces
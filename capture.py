@@ -0,0 +1,202 @@
+"""Record what is on screen without slowing down the game
+
+CaptureWriter.grab() is called once per frame after the frame is
+finished. It copies the screen's pixels through the surface's buffer
+interface with NumPy into one of a few preallocated buffers (no
+Surface is made) and queues it for a writer thread, then returns. The
+writer thread XORs each frame with the one before it (kept in its
+buffer until the next frame is written), so pixels that didn't change
+become 0, and only compresses the rows between the first and last one
+that changed with zlib before streaming them to the file. If all the
+buffers are waiting to be written (the disk is slow) the frame is
+dropped and counted instead of making the game wait.
+
+    header   "EGGC", version, width, height, red/green/blue masks
+    records  frame number, key frame flag, first row, rows, size,
+             zlib compressed XOR of those rows with the last frame
+             written (key frames, every KEY_FRAME_INTERVAL frames, are
+             the whole frame itself)
+
+Numpy, zlib and file writes let other threads run while they work, and
+most frames only change a band of rows (the player and the eggs), so
+the writer thread does little work per frame and doesn't hold up the
+game loop either. On one CPU core it still competes with the game
+loop, grab() can wait a millisecond or two for it.
+
+Record with:
+    python main.py --capture captures
+and turn a capture into PNGs with:
+    python capture.py captures/FILE.eggc FOLDER
+"""
+
+import os
+import sys
+import zlib
+import queue
+import struct
+import threading
+
+import numpy as np
+import pygame
+
+MAGIC = b"EGGC"
+VERSION = 2
+HEADER = struct.Struct("<4sBHHIII")  # magic, version, size, RGB masks
+# frame number, key frame, first row, rows, compressed size
+RECORD = struct.Struct("<I?HHI")
+BUFFERS = 8  # frames that can wait to be written, one is the last frame
+KEY_FRAME_INTERVAL = 300  # frames written between key frames
+COMPRESS_LEVEL = 1  # fastest, the XOR is mostly zeros anyway
+WRITER_NICE = 19  # lowest priority, for the writer thread
+
+
+class CaptureWriter:
+    """Streams the frames passed to grab() to `path` from a background
+    thread, call close() when done. Frames that come while `buffers`
+    frames are already waiting are dropped, self.dropped counts them"""
+
+    def __init__(self, path, screen, buffers=BUFFERS):
+        width, height = screen.get_size()
+        if screen.get_bytesize() != 4 or screen.get_pitch() != width * 4:
+            raise ValueError("can only capture 32 bit screens")
+        self.size = width * height * 4
+        self.height = height
+        self.file = open(path, "wb")
+        red, green, blue, _ = screen.get_masks()
+        self.file.write(HEADER.pack(MAGIC, VERSION, width, height,
+                                    red, green, blue))
+        self.frames = 0  # frames passed to grab()
+        self.dropped = 0
+        self.written = 0
+        self.bytes_written = HEADER.size
+        # buffers not in use, and frames waiting for the writer thread
+        self.free = queue.SimpleQueue()
+        for _ in range(buffers):
+            self.free.put(bytearray(self.size))
+        self.waiting = queue.SimpleQueue()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def grab(self, screen):
+        """queue the screen's current pixels to be written, or drop them
+        if every buffer is waiting to be written"""
+        frame = self.frames
+        self.frames += 1
+        try:
+            buffer = self.free.get_nowait()
+        except queue.Empty:
+            self.dropped += 1
+            return
+        view = screen.get_view("1")  # locks the screen until deleted
+        # one NumPy copy, it doesn't hold the GIL while it copies
+        np.copyto(np.frombuffer(buffer, np.uint8),
+                  np.frombuffer(view, np.uint8))
+        del view
+        self.waiting.put((frame, buffer))
+
+    def write_record(self, frame, key, top, rows, data):
+        self.file.write(RECORD.pack(frame, key, top, rows, len(data)))
+        self.file.write(data)
+        self.bytes_written += RECORD.size + len(data)
+
+    def run(self):
+        """writer thread: XOR, compress and write frames until close()"""
+        if hasattr(os, "setpriority"):
+            # let the game loop have the CPU first, the writer catches
+            # up while it waits for the next frame
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(),
+                           WRITER_NICE)
+        last = None  # buffer of the last frame written
+        # 8 bytes at a time, the rows are a whole number of them
+        xor = np.zeros(self.size // 8, dtype=np.uint64)
+        xor_rows = xor.reshape(self.height, -1)
+        while True:
+            item = self.waiting.get()
+            if item is None:
+                break
+            frame, buffer = item
+            pixels = np.frombuffer(buffer, dtype=np.uint64)
+            key = self.written % KEY_FRAME_INTERVAL == 0
+            if key:  # the whole frame itself
+                top, rows = 0, self.height
+                changed = pixels
+            else:
+                np.bitwise_xor(pixels, np.frombuffer(last, np.uint64),
+                               out=xor)
+                # only the rows from the first to the last one changed
+                changed_rows = np.flatnonzero(xor_rows.any(axis=1))
+                if len(changed_rows):
+                    top = int(changed_rows[0])
+                    rows = int(changed_rows[-1]) + 1 - top
+                else:
+                    top, rows = 0, 0
+                changed = xor_rows[top:top + rows]
+            data = zlib.compress(changed, COMPRESS_LEVEL)
+            if last is not None:
+                self.free.put(last)  # done with it, grab() can reuse it
+            last = buffer
+            self.write_record(frame, key, top, rows, data)
+            self.written += 1
+
+    def close(self):
+        """write the frames still waiting and close the file"""
+        self.waiting.put(None)
+        self.thread.join()
+        self.file.close()
+
+
+def read_capture(path):
+    """Generator of (frame number, RGB bytes) of every frame written to
+    a capture, and its (width, height) first"""
+    with open(path, "rb") as file:
+        magic, version, width, height, *masks = HEADER.unpack(
+            file.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} capture")
+        yield width, height
+        size = width * height * 4
+        # which bits of each pixel are red, green and blue
+        shifts = [(mask & -mask).bit_length() - 1 for mask in masks]
+        last = np.zeros(size, dtype=np.uint8)
+        rgb = np.zeros((width * height, 3), dtype=np.uint8)
+        while True:
+            header = file.read(RECORD.size)
+            if len(header) < RECORD.size:  # end of a capture, or a crash
+                break
+            frame, key, top, rows, length = RECORD.unpack(header)
+            data = file.read(length)
+            if len(data) < length:
+                break
+            if key:
+                last[:] = 0
+            changed = last[top * width * 4:(top + rows) * width * 4]
+            np.bitwise_xor(np.frombuffer(zlib.decompress(data), np.uint8),
+                           changed, out=changed)
+            pixels = last.view(np.uint32)
+            for channel, shift in enumerate(shifts):
+                rgb[:, channel] = pixels >> shift
+            yield frame, rgb.tobytes()
+
+
+def main(path, folder):
+    os.makedirs(folder, exist_ok=True)
+    frames = read_capture(path)
+    size = next(frames)
+    count = 0
+    last_frame = -1
+    missing = 0
+    for frame, rgb in frames:
+        image = pygame.image.frombuffer(rgb, size, "RGB")
+        pygame.image.save(image, os.path.join(folder, f"{frame:06}.png"))
+        missing += frame - last_frame - 1
+        last_frame = frame
+        count += 1
+    print(f"saved {count} frames to {folder}, {missing} were dropped "
+          f"while recording")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("usage: python capture.py FILE.eggc FOLDER")
+        sys.exit(1)
+    main(sys.argv[1], sys.argv[2])
@@ -0,0 +1,410 @@
+"""Gym-style environments for training agents on Egg Jump
+
+EggJumpEnv wraps one World with the usual reset()/step() methods (same
+return values as gymnasium, without needing it installed). Actions are
+ACTIONS indexes, the reward is how much the score (frame // 4) went up
+and the episode ends when player_hp <= 0.
+
+Observations are a small feature vector (FEATURES) of the player and
+the nearest eggs and power up, and with `pixels` also a downscaled copy
+of the frame the game would draw.
+
+VectorEnv runs many EggJumpEnvs in worker processes. Actions,
+observations, rewards and pixels are kept in one block of shared memory
+that the workers read and write directly, the only thing sent through
+the pipes is a one byte command and the reply. Envs are reset
+automatically when their episode ends, like gymnasium's vector envs,
+the observation the episode ended on is kept in
+info["final_observation"]. An exception in a worker, or a worker that
+dies, raises WorkerError from step() or reset() instead of waiting
+forever for its reply.
+
+    envs = VectorEnv(64, workers=4)
+    observations = envs.reset(seed=0)
+    observations, rewards, terminated, truncated, info = \
+        envs.step(actions)
+    envs.close()
+
+`python -m benchmarks.bench_env` measures steps per second for
+different numbers of workers.
+"""
+
+import os
+import random
+import traceback
+import multiprocessing
+from multiprocessing import shared_memory
+
+import numpy as np
+import pygame
+
+from render import draw_world, get_fade_level
+from sprites import FADE_LEVELS
+from world import (World, WIDTH, HEIGHT, GROUND_Y, INPUT_JUMP, INPUT_DOWN,
+                   INPUT_DROP, get_obstacle_speed)
+
+# what each action does, index 3 presses [down_arrow] (drops from a jump)
+ACTIONS = [0, INPUT_JUMP, INPUT_DOWN, INPUT_DROP | INPUT_DOWN]
+NEAREST_EGGS = 3  # eggs in the feature vector, closest first
+POWER_UP_TYPES = ["health", "shield", "fly", "small"]
+PIXEL_SIZE = (100, 50)  # (width, height) of pixel observations
+
+# names of the observation's features, positions are divided by the
+# screen size and speeds by SPEED_SCALE so they are about 0 to 1
+SPEED_SCALE = 20
+FEATURES = (["player_bottom", "fall_speed", "on_ground", "is_small", "hp",
+             "shield", "obstacle_speed"] +
+            [f"has_{name}" for name in POWER_UP_TYPES] +
+            ["power_up_left"] +
+            [f"egg{i}_{name}" for i in range(NEAREST_EGGS)
+             for name in ("x", "width", "top", "bottom", "alpha")] +
+            ["power_up_x", "power_up_top", "power_up_type"])
+# an egg that isn't there is far away and invisible
+NO_EGG = [1.0, 0.0, 0.0, 0.0, 0.0]
+NO_POWER_UP = [1.0, 0.0, 0.0]
+
+
+class WorkerError(Exception):
+    """a VectorEnv worker process failed or stopped"""
+
+
+def init_pixels():
+    """pixel observations need the sprite atlas, which needs a window
+    (a hidden one, or none at all with SDL_VIDEODRIVER=dummy)"""
+    import sprites
+    if not sprites.atlas:
+        pygame.init()
+        if pygame.display.get_surface() is None:
+            pygame.display.set_mode((1, 1), pygame.HIDDEN)
+        sprites.build_atlas()
+
+
+class EggJumpEnv:
+    """One game of Egg Jump with a gym-style interface.
+
+    `character` is 1, 2 or 3, or None for a random one each episode.
+    Episodes are cut off (truncated) after `max_frames` if it is set.
+    Observations are written to `features` and `pixels` if they are
+    given (VectorEnv passes rows of its shared memory), otherwise to
+    arrays of the env's own"""
+
+    def __init__(self, character=1, pixels=False, max_frames=None,
+                 seed=None, features=None, pixel_buffer=None):
+        self.character = character
+        self.max_frames = max_frames
+        self.seeds = random.Random(seed)  # seeds of each episode's World
+        self.world = World()
+        if features is None:
+            features = np.zeros(len(FEATURES), dtype=np.float32)
+        self.features = features
+        self.pixels = None
+        if pixels:
+            init_pixels()
+            if pixel_buffer is None:
+                pixel_buffer = np.zeros((PIXEL_SIZE[1], PIXEL_SIZE[0], 3),
+                                        dtype=np.uint8)
+            self.pixels = pixel_buffer
+            self.frame_surf = pygame.Surface((WIDTH, HEIGHT))
+            self.small_surf = pygame.Surface(PIXEL_SIZE)
+
+    def get_observation(self):
+        """update the observation arrays from the World"""
+        world = self.world
+        player = world.player_rect
+        power_up = world.cur_power_up
+        values = [player.bottom / HEIGHT,
+                  world.players_fall_speed / SPEED_SCALE,
+                  float(player.bottom >= GROUND_Y),
+                  float(world.player_is_small),
+                  world.player_hp / 100,
+                  world.player_shield / 25,
+                  get_obstacle_speed(world.frame) / SPEED_SCALE]
+        values += [float(power_up.type == name) for name in POWER_UP_TYPES]
+        values.append(power_up.value / world.get_max_power_up_val[
+            power_up.type] if power_up.type else 0.0)
+
+        # eggs that can still hit the player, closest first
+        eggs = 0
+        for egg in world.eggs:
+            if egg.rect.right <= player.left or egg.destroyed:
+                continue
+            if egg.visible:
+                alpha = 1.0
+            else:  # as visible as it is drawn
+                alpha = get_fade_level(egg.rect.x) / (FADE_LEVELS - 1)
+            values += [(egg.rect.left - player.right) / WIDTH,
+                       egg.rect.width / WIDTH,
+                       egg.rect.top / HEIGHT,
+                       egg.rect.bottom / HEIGHT,
+                       alpha]
+            eggs += 1
+            if eggs == NEAREST_EGGS:
+                break
+        values += NO_EGG * (NEAREST_EGGS - eggs)
+
+        for power_up_obj in world.power_ups:
+            if power_up_obj.rect.right > player.left:
+                values += [(power_up_obj.rect.left - player.right) / WIDTH,
+                           power_up_obj.rect.top / HEIGHT,
+                           (POWER_UP_TYPES.index(power_up_obj.type) + 1) /
+                           len(POWER_UP_TYPES)]
+                break
+        else:
+            values += NO_POWER_UP
+        self.features[:] = values
+
+        if self.pixels is not None:
+            draw_world(self.frame_surf, world)
+            pygame.transform.smoothscale(self.frame_surf, PIXEL_SIZE,
+                                         self.small_surf)
+            self.pixels[:] = pygame.surfarray.pixels3d(
+                self.small_surf).swapaxes(0, 1)
+        if self.pixels is None:
+            return self.features
+        return {"features": self.features, "pixels": self.pixels}
+
+    def reset(self, seed=None):
+        """start a new episode, returns (observation, info)"""
+        if seed is not None:
+            self.seeds.seed(seed)
+        character = self.character
+        if character is None:
+            character = self.seeds.randint(1, 3)
+        self.world.reset(character, self.seeds.getrandbits(32))
+        return self.get_observation(), {"seed": self.world.seed}
+
+    def step(self, action):
+        """play one frame, returns (observation, reward, terminated,
+        truncated, info)"""
+        world = self.world
+        score = world.score
+        world.step(ACTIONS[action])
+        terminated = world.dead
+        truncated = (not terminated and self.max_frames is not None and
+                     world.frame >= self.max_frames)
+        return (self.get_observation(), world.score - score, terminated,
+                truncated, {"score": world.score})
+
+
+def get_layout(num_envs, pixels):
+    """[(name, dtype, shape, offset)] of the arrays in VectorEnv's shared
+    memory, and its size in bytes"""
+    arrays = [("actions", np.int8, (num_envs,)),
+              ("features", np.float32, (num_envs, len(FEATURES))),
+              ("rewards", np.float32, (num_envs,)),
+              ("terminated", np.bool_, (num_envs,)),
+              ("truncated", np.bool_, (num_envs,)),
+              ("scores", np.int32, (num_envs,)),  # score when it ended
+              # observation an episode ended on, before the reset
+              ("final_features", np.float32, (num_envs, len(FEATURES)))]
+    if pixels:
+        arrays.append(("pixels", np.uint8,
+                       (num_envs, PIXEL_SIZE[1], PIXEL_SIZE[0], 3)))
+        arrays.append(("final_pixels", np.uint8,
+                       (num_envs, PIXEL_SIZE[1], PIXEL_SIZE[0], 3)))
+    layout = []
+    offset = 0
+    for name, dtype, shape in arrays:
+        layout.append((name, dtype, shape, offset))
+        size = np.dtype(dtype).itemsize * int(np.prod(shape))
+        offset += (size + 63) // 64 * 64  # keep every array aligned
+    return layout, offset
+
+
+def get_arrays(buffer, layout):
+    """name -> numpy array using `buffer`"""
+    return {name: np.ndarray(shape, dtype, buffer, offset)
+            for name, dtype, shape, offset in layout}
+
+
+class EnvGroup:
+    """The envs one worker (or VectorEnv itself, without workers) runs,
+    envs first to first + count of the arrays"""
+
+    def __init__(self, arrays, first, count, character, pixels,
+                 max_frames, seed):
+        self.arrays = arrays
+        self.first = first
+        self.pixels = pixels
+        self.envs = [
+            EggJumpEnv(character, pixels, max_frames, seed + first + i,
+                       arrays["features"][first + i],
+                       arrays["pixels"][first + i] if pixels else None)
+            for i in range(count)]
+
+    def reset(self, seed=None):
+        for i, env in enumerate(self.envs, self.first):
+            env.reset(None if seed is None else seed + i)
+        envs = slice(self.first, self.first + len(self.envs))
+        self.arrays["terminated"][envs] = False
+        self.arrays["truncated"][envs] = False
+
+    def step(self):
+        arrays = self.arrays
+        actions = arrays["actions"].tolist()
+        rewards = arrays["rewards"]
+        terminated = arrays["terminated"]
+        truncated = arrays["truncated"]
+        scores = arrays["scores"]
+        for i, env in enumerate(self.envs, self.first):
+            _, reward, done, cut_off, info = env.step(actions[i])
+            rewards[i] = reward
+            terminated[i] = done
+            truncated[i] = cut_off
+            if done or cut_off:  # start the next episode
+                scores[i] = info["score"]
+                # keep the last observation, reset() writes over it
+                arrays["final_features"][i] = arrays["features"][i]
+                if self.pixels:
+                    arrays["final_pixels"][i] = arrays["pixels"][i]
+                env.reset()
+
+
+def run_worker(memory_name, layout, first, count, character, pixels,
+               max_frames, seed, connection):
+    """Worker process: runs commands from VectorEnv until "close".
+    Replies b"" when a command is done, or b"e" and the traceback if it
+    raised"""
+    # workers share VectorEnv's resource tracker, which frees the memory
+    # if VectorEnv never gets to
+    memory = shared_memory.SharedMemory(memory_name)
+    group = EnvGroup(get_arrays(memory.buf, layout), first, count,
+                     character, pixels, max_frames, seed)
+    while True:
+        command = connection.recv_bytes()
+        if command[:1] not in (b"s", b"r"):
+            break
+        try:
+            if command == b"s":
+                group.step()
+            elif command == b"r":
+                group.reset()
+            else:  # reset with a seed
+                group.reset(int(command[1:]))
+        except Exception:
+            connection.send_bytes(b"e" + traceback.format_exc().encode())
+            continue
+        connection.send_bytes(b"")
+    del group  # the arrays use the memory
+    memory.close()
+
+
+class VectorEnv:
+    """`num_envs` EggJumpEnvs split between `workers` processes (0 runs
+    them in this process). step() and reset() return arrays that use
+    the shared memory, copy them to keep them after the next step"""
+
+    def __init__(self, num_envs, workers=None, character=1, pixels=False,
+                 max_frames=None, seed=0):
+        if workers is None:
+            workers = os.cpu_count()
+        workers = min(workers, num_envs)
+        self.num_envs = num_envs
+        self.pixels = pixels
+        layout, size = get_layout(num_envs, pixels)
+        self.memory = shared_memory.SharedMemory(create=True, size=size)
+        self.arrays = get_arrays(self.memory.buf, layout)
+        self.group = None
+        self.connections = []
+        self.processes = []
+        if workers == 0:
+            self.group = EnvGroup(self.arrays, 0, num_envs, character,
+                                  pixels, max_frames, seed)
+            return
+        context = multiprocessing.get_context("spawn")
+        for worker in range(workers):
+            first = num_envs * worker // workers
+            count = num_envs * (worker + 1) // workers - first
+            connection, worker_connection = context.Pipe()
+            process = context.Process(
+                target=run_worker, daemon=True,
+                args=(self.memory.name, layout, first, count, character,
+                      pixels, max_frames, seed, worker_connection))
+            process.start()
+            # only the worker keeps its end, so the pipe breaks (and
+            # recv_bytes() raises EOFError) if the worker dies
+            worker_connection.close()
+            self.connections.append(connection)
+            self.processes.append(process)
+
+    def send(self, command):
+        """Run a command in every worker and wait for all of them,
+        raises WorkerError if any of them failed or stopped"""
+        errors = []
+        sent = []
+        for worker, connection in enumerate(self.connections):
+            try:
+                connection.send_bytes(command)
+                sent.append(worker)
+            except OSError:  # the pipe is broken, the worker is gone
+                errors.append(self.get_stopped_error(worker))
+        for worker in sent:
+            try:
+                reply = self.connections[worker].recv_bytes()
+            except (EOFError, OSError):  # closed or reset, it's gone
+                errors.append(self.get_stopped_error(worker))
+                continue
+            if reply:
+                errors.append(f"worker {worker} failed:\n"
+                              f"{reply[1:].decode()}")
+        if errors:
+            raise WorkerError("\n".join(errors))
+
+    def get_stopped_error(self, worker):
+        process = self.processes[worker]
+        process.join(1)
+        return f"worker {worker} stopped (exit code {process.exitcode})"
+
+    def get_observations(self, prefix=""):
+        if self.pixels:
+            return {"features": self.arrays[prefix + "features"],
+                    "pixels": self.arrays[prefix + "pixels"]}
+        return self.arrays[prefix + "features"]
+
+    def reset(self, seed=None):
+        """start a new episode in every env, env i gets seed + i"""
+        if self.group is not None:
+            self.group.reset(seed)
+        elif seed is None:
+            self.send(b"r")
+        else:
+            self.send(b"r%d" % seed)
+        return self.get_observations()
+
+    def step(self, actions):
+        """play one frame in every env with ACTIONS indexes `actions`,
+        returns (observations, rewards, terminated, truncated, info).
+        info["scores"][i] is the final score of env i's last episode and
+        info["final_observation"][i] the observation it ended on (before
+        the automatic reset), for the envs whose episode ended this step"""
+        arrays = self.arrays
+        arrays["actions"][:] = actions
+        if self.group is not None:
+            self.group.step()
+        else:
+            self.send(b"s")
+        return (self.get_observations(), arrays["rewards"],
+                arrays["terminated"], arrays["truncated"],
+                {"scores": arrays["scores"],
+                 "final_observation": self.get_observations("final_")})
+
+    def close(self):
+        """stop the workers and free the shared memory"""
+        if self.memory is None:
+            return
+        for connection in self.connections:
+            try:
+                connection.send_bytes(b"c")
+            except OSError:  # the worker already stopped
+                pass
+            connection.close()
+        for process in self.processes:
+            process.join()
+        self.group = None
+        self.arrays = None
+        try:
+            self.memory.close()
+        except BufferError:  # arrays returned by step() still use it,
+            pass  # it is freed when they are
+        self.memory.unlink()
+        self.memory = None
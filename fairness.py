@@ -0,0 +1,458 @@
+"""Monte Carlo fairness analyzer for the egg spawn rules
+
+get_egg() is supposed to keep eggs far enough apart that it is always
+possible to win. This tool checks that claim:
+
+1. For every pair of egg types, player size (normal, or shrunk by the
+   "small" power up which also jumps higher) and obstacle speed, a
+   search over every possible jump/crawl/drop timing finds the smallest
+   gap between the two eggs that can be cleared without getting hit.
+   The search uses the same player physics as world.World. Because
+   pygame.Rect rounds positions, eggs move a whole number of pixels
+   (the "step", round(speed)) each frame, so the search is done for
+   every step and every alignment of the eggs with the player.
+2. Millions of spawn sequences are generated with the real spawn rules
+   (batch_world.get_eggs) on a process pool, and every gap that is
+   smaller than the smallest clearable gap is counted as unwinnable.
+3. For each character the unavoidable hits are applied to their
+   starting HP and shield to see when the spawn rules alone kill them.
+
+Only neighbouring eggs are checked together, so patterns where three
+or more eggs are needed to trap the player are not found.
+
+The search uses the player's and eggs' rects, not the pixel masks
+World checks after them, so a gap it calls clearable always is.
+
+Run from the project folder, for example:
+    python fairness.py --sequences 10000000
+"""
+
+import argparse
+import os
+import time
+from math import ceil, copysign, floor
+from multiprocessing import Pool
+
+import numpy as np
+
+from world import (GROUND_Y, GRAVITY, SMALL_SCALE, SPAWN_RULES,
+                   get_player_size, get_obstacle_speed)
+from batch_world import (FRIED, EGG_TYPES, EGG_WIDTH, EGG_HEIGHT, EGG_TOP,
+                         START_HP, START_SHIELD, get_eggs, get_phase)
+from batch_world import get_obstacle_speed as get_obstacle_speeds
+
+MAX_GAP = 2000  # gaps at least this big are assumed to be clearable
+FORMS = ["normal", "small"]  # player sizes, "small" is the power up
+FRAME_BIN = 300  # histogram bin size for frames (5 seconds)
+GAP_BIN = 25  # histogram bin size for gaps in pixels
+# (first frame, end frame) of each phase but the last, from the spawn rules
+PHASE_FRAMES = {phase.number: (phase.start, next_phase.start)
+                for phase, next_phase in zip(SPAWN_RULES.phases,
+                                             SPAWN_RULES.phases[1:])}
+LAST_PHASE_START = SPAWN_RULES.phases[-1].start
+PHASES = [phase.number for phase in SPAWN_RULES.phases]
+PHASE_SLOTS = max(PHASES) + 1  # results by phase are indexed by number
+
+
+def round_half_away(value):
+    """pygame.Rect rounds floats half away from zero when assigned"""
+    return int(copysign(floor(abs(value) + 0.5), value))
+
+
+def get_hitboxes(form):
+    """(left, width, height) of the player's hitbox when standing or
+    jumping and when crawling, same positions as World.update_player_pose"""
+    scale = SMALL_SCALE if form == "small" else 1
+    walk_width, walk_height = get_player_size["walk"]
+    crawl_width, crawl_height = get_player_size["crawl"]
+    return ((25, int(walk_width * scale), int(walk_height * scale)),
+            (15, int(crawl_width * scale), int(crawl_height * scale)))
+
+
+def get_blocked_heights(hitbox, egg_left, egg_type):
+    """The player bottoms (as a range) that collide with an egg this
+    frame for a hitbox, or None if they don't overlap horizontally.
+    Same test as pygame.Rect.colliderect()"""
+    left, width, height = hitbox
+    egg_width = int(EGG_WIDTH[egg_type])
+    if not (egg_left < left + width and left < egg_left + egg_width):
+        return None
+    egg_top = int(EGG_TOP[egg_type])
+    # egg_top < bottom and bottom - height < egg_bottom
+    return range(egg_top + 1, egg_top + int(EGG_HEIGHT[egg_type]) + height)
+
+
+def can_clear(first, second, gap, step, alignment, form):
+    """Search every way to play while eggs `first` and `second` (egg
+    type numbers) with `gap` pixels between them pass the player moving
+    `step` pixels a frame, and return True if one of them doesn't get
+    hit. `alignment` (0 to step - 1) shifts where the eggs are on each
+    frame.
+
+    The player state is (bottom, fall speed), only states that haven't
+    been hit are kept each frame, so the search ends when the eggs have
+    passed (cleared) or no states are left (unwinnable)"""
+    jump_start_speed = -20 if form == "small" else -17
+    drop_start_speed = -jump_start_speed * 0.75
+    walk_box, crawl_box = get_hitboxes(form)
+    # start far enough away that the longest jump can still be timed
+    left = crawl_box[0] + crawl_box[1] + step * 45 + alignment
+    second_offset = int(EGG_WIDTH[first]) + gap
+    end = crawl_box[0] - second_offset - int(EGG_WIDTH[second])
+    states = {(GROUND_Y, 0)}  # standing on the ground
+    while left > end:
+        left -= step
+        # heights that get hit when standing/jumping and crawling
+        blocked = []
+        for hitbox in (walk_box, crawl_box):
+            heights = set()
+            for egg_left, egg_type in ((left, first),
+                                       (left + second_offset, second)):
+                egg_heights = get_blocked_heights(hitbox, egg_left,
+                                                  egg_type)
+                if egg_heights is not None:
+                    heights.update(egg_heights)
+            blocked.append(heights)
+        walk_blocked, crawl_blocked = blocked
+
+        next_states = set()
+        for bottom, fall_speed in states:
+            if bottom >= GROUND_Y:
+                # walk, crawl or jump
+                if GROUND_Y not in walk_blocked:
+                    next_states.add((GROUND_Y, 0))
+                if GROUND_Y not in crawl_blocked:
+                    next_states.add((GROUND_Y, 0))
+                speeds = [jump_start_speed]
+            else:
+                # keep falling or press down to drop
+                speeds = [fall_speed, max(fall_speed, drop_start_speed)]
+            for new_speed in speeds:
+                new_speed += GRAVITY
+                new_bottom = min(GROUND_Y,
+                                 round_half_away(bottom + new_speed))
+                if new_bottom == GROUND_Y:
+                    # holding down makes the player crawl as soon as
+                    # they land, falling speed doesn't matter on the
+                    # ground
+                    if (GROUND_Y not in walk_blocked or
+                            GROUND_Y not in crawl_blocked):
+                        next_states.add((GROUND_Y, 0))
+                elif new_bottom not in walk_blocked:
+                    next_states.add((new_bottom, new_speed))
+        if not next_states:
+            return False
+        states = next_states
+    return True
+
+
+def get_min_gap(first, second, step, alignment, form):
+    """Smallest gap that can be cleared between two eggs, MAX_GAP if
+    none can. Doubles the gap until it can be cleared, then binary
+    searches"""
+    if can_clear(first, second, 0, step, alignment, form):
+        return 0
+    low, high = 0, 16
+    while not can_clear(first, second, high, step, alignment, form):
+        low = high
+        high *= 2
+        if high >= MAX_GAP:
+            return MAX_GAP
+    while high - low > 1:
+        middle = (low + high) // 2
+        if can_clear(first, second, middle, step, alignment, form):
+            high = middle
+        else:
+            low = middle
+    return high
+
+
+def get_min_gaps(job):
+    """get_min_gap() for every alignment of a step, run on the pool"""
+    first, second, step, form = job
+    return job, [get_min_gap(first, second, step, alignment, form)
+                 for alignment in range(step)]
+
+
+def get_steps(speeds):
+    """pixels eggs move per frame at these speeds (pygame.Rect rounds
+    the new position, which is the same as rounding the speed)"""
+    return np.floor(speeds + 0.5).astype(np.int64)
+
+
+def build_min_gap_table(pool, max_frame):
+    """min_gap[form, first, second, step, alignment] from
+    get_min_gap()"""
+    slowest = int(get_steps(np.array(get_obstacle_speed(0))))
+    fastest = int(get_steps(np.array(get_obstacle_speed(max_frame + 600))))
+    table = np.zeros((len(FORMS), 4, 4, fastest + 1, fastest),
+                     dtype=np.int64)
+    # slowest first, they take longest
+    jobs = [(first, second, step, form)
+            for step in range(slowest, fastest + 1)
+            for form in FORMS
+            for first in range(4)
+            for second in range(4)]
+    for (first, second, step, form), gaps in pool.imap_unordered(
+            get_min_gaps, jobs):
+        table[FORMS.index(form), first, second, step, :step] = gaps
+    return table
+
+
+def new_results(max_frame):
+    """empty results, add_results() combines the ones from workers"""
+    frame_bins = max_frame // FRAME_BIN + 3
+    gap_bins = MAX_GAP // GAP_BIN + 1
+    return {
+        "sequences": np.zeros(PHASE_SLOTS, dtype=np.int64),  # by phase
+        "pairs": np.zeros(PHASE_SLOTS, dtype=np.int64),
+        "unwinnable": np.zeros((len(FORMS), PHASE_SLOTS, 4, 4),
+                               dtype=np.int64),
+        "gaps": np.zeros((PHASE_SLOTS, gap_bins), dtype=np.int64),
+        "unwinnable_gaps": np.zeros((len(FORMS), PHASE_SLOTS, gap_bins),
+                                    dtype=np.int64),
+        "unwinnable_frames": np.zeros((len(FORMS), frame_bins),
+                                      dtype=np.int64),
+        "first_unwinnable": np.full(len(FORMS), np.iinfo(np.int64).max),
+        "deaths": np.zeros((len(FORMS), 4), dtype=np.int64),  # by char
+        "death_frames": np.zeros((len(FORMS), 4, frame_bins),
+                                 dtype=np.int64),
+        "first_death": np.full((len(FORMS), 4), np.iinfo(np.int64).max),
+    }
+
+
+def add_results(total, results):
+    for key, value in results.items():
+        if key.startswith("first_"):
+            total[key] = np.minimum(total[key], value)
+        else:
+            total[key] += value
+
+
+def get_unavoidable_deaths(hit_type, hit_frame, character):
+    """Frame each sequence's character dies from the unavoidable hits
+    alone (-1 if they survive). Normal and flying eggs break the shield
+    or kill, fried eggs take 20 from the shield or HP, like
+    World.update_eggs()"""
+    count, pairs = hit_type.shape
+    hp = np.full(count, float(START_HP[character]))
+    shield = np.full(count, float(START_SHIELD[character]))
+    death_frame = np.full(count, -1)
+    for pair in range(pairs):
+        egg_type = hit_type[:, pair]
+        hit = egg_type >= 0
+        fried = egg_type == FRIED
+        has_shield = shield > 0
+        new_shield = np.where(fried, np.maximum(0, shield - 20), 0)
+        new_hp = np.where(fried, hp - 20, 0)
+        shield = np.where(hit & has_shield, new_shield, shield)
+        hp = np.where(hit & ~has_shield, new_hp, hp)
+        died = (hp <= 0) & (death_frame < 0)
+        death_frame[died] = hit_frame[died, pair]
+    return death_frame
+
+
+def run_chunk(job):
+    """Generate `count` spawn sequences starting in `phase` and count the
+    unwinnable gaps in them"""
+    seed, phase, count, length, max_frame, min_gap = job
+    rng = np.random.default_rng(seed)
+    results = new_results(max_frame)
+    start, end = PHASE_FRAMES.get(phase, (LAST_PHASE_START, max_frame))
+    frames = rng.integers(start, end, size=count).astype(np.float64)
+    results["sequences"][phase] += count
+
+    # 4 eggs on screen like World.reset()
+    lefts, types = [], []
+    prev_loc = np.full(count, 800)
+    for _ in range(4):
+        left, egg_type, _ = get_eggs(rng, prev_loc,
+                                     frames.astype(np.int64))
+        lefts.append(left)
+        types.append(egg_type)
+        prev_loc = left + EGG_WIDTH[egg_type]
+
+    gap_bins = MAX_GAP // GAP_BIN
+    hit_types = np.full((len(FORMS), count, length), -1)
+    hit_frames = np.zeros((count, length), dtype=np.int64)
+    for pair in range(length):
+        # move forward to when the oldest egg leaves the screen, it is
+        # removed somewhere in the last frame's movement
+        speed = get_obstacle_speeds(frames)
+        distance = (lefts[0] + EGG_WIDTH[types[0]] +
+                    rng.random(count) * speed)
+        frames += distance / speed
+        lefts = [left - distance.astype(np.int64) for left in lefts[1:]]
+        types = types[1:]
+        prev_type = types[-1]
+        prev_right = lefts[-1] + EGG_WIDTH[prev_type]
+        left, egg_type, _ = get_eggs(rng, prev_right,
+                                     frames.astype(np.int64))
+        lefts.append(left)
+        types.append(egg_type)
+
+        # the gap is the same when the eggs reach the player, but the
+        # speed will have gone up
+        gap = left - prev_right
+        arrival = frames + (left - 25) / speed
+        spawn_phase = get_phase(frames.astype(np.int64))
+        step = np.minimum(get_steps(get_obstacle_speeds(arrival)),
+                          min_gap.shape[3] - 1)
+        alignment = rng.integers(0, step)
+        results["pairs"] += np.bincount(spawn_phase,
+                                          minlength=PHASE_SLOTS)
+        np.add.at(results["gaps"], (spawn_phase,
+                                    np.minimum(gap // GAP_BIN, gap_bins)), 1)
+        hit_frames[:, pair] = arrival
+        for form in range(len(FORMS)):
+            unwinnable = gap < min_gap[form, prev_type, egg_type, step,
+                                       alignment]
+            if not unwinnable.any():
+                continue
+            pick = np.flatnonzero(unwinnable)
+            np.add.at(results["unwinnable"][form],
+                      (spawn_phase[pick], prev_type[pick], egg_type[pick]),
+                      1)
+            np.add.at(results["unwinnable_gaps"][form],
+                      (spawn_phase[pick],
+                       np.minimum(gap[pick] // GAP_BIN, gap_bins)), 1)
+            frame_bin = np.minimum(arrival[pick].astype(np.int64)
+                                   // FRAME_BIN,
+                                   results["unwinnable_frames"].shape[-1] - 1)
+            np.add.at(results["unwinnable_frames"][form], frame_bin, 1)
+            results["first_unwinnable"][form] = min(
+                results["first_unwinnable"][form],
+                int(arrival[pick].min()))
+            # one of the two eggs has to hit, the fried one hurts less
+            hit_types[form, pick, pair] = np.where(
+                prev_type[pick] == FRIED, FRIED, egg_type[pick])
+
+    for form in range(len(FORMS)):
+        for character in (1, 2, 3):
+            death_frame = get_unavoidable_deaths(hit_types[form],
+                                                 hit_frames, character)
+            died = death_frame >= 0
+            results["deaths"][form, character] += died.sum()
+            if died.any():
+                frame_bin = np.minimum(
+                    death_frame[died] // FRAME_BIN,
+                    results["death_frames"].shape[-1] - 1)
+                np.add.at(results["death_frames"][form, character],
+                          frame_bin, 1)
+                results["first_death"][form, character] = min(
+                    results["first_death"][form, character],
+                    int(death_frame[died].min()))
+    return results
+
+
+def print_histogram(counts, bin_size, unit, width=50):
+    """print non-empty bins of a histogram as bars of #"""
+    if counts.sum() == 0:
+        print("    (none)")
+        return
+    biggest = counts.max()
+    for index in np.flatnonzero(counts):
+        bar = "#" * max(1, round(width * counts[index] / biggest))
+        start = index * bin_size
+        print(f"    {start:>6}-{start + bin_size - 1:<6}{unit} "
+              f"{counts[index]:>10} {bar}")
+
+
+def print_report(results, min_gap, max_frame):
+    slowest = int(get_steps(np.array(get_obstacle_speed(0))))
+    print("\nSmallest clearable gap (px) between two eggs with the worst "
+          "alignment, at the slowest / fastest step checked")
+    for form_index, form in enumerate(FORMS):
+        print(f"  {form} player:")
+        worst = min_gap[form_index].max(axis=3)
+        for first in range(4):
+            row = "  ".join(
+                f"{EGG_TYPES[second]:>7} {worst[first, second, slowest]:>4}"
+                f"/{worst[first, second, -1]:<4}"
+                for second in range(4))
+            print(f"    after {EGG_TYPES[first]:<7}: {row}")
+
+    print("\nGaps between spawned eggs by phase (px)")
+    for phase in PHASES:
+        pairs = results["pairs"][phase]
+        print(f"  phase {phase}: {pairs} gaps from "
+              f"{results['sequences'][phase]} sequences")
+        print_histogram(results["gaps"][phase], GAP_BIN, "px")
+
+    never = np.iinfo(np.int64).max
+    for form_index, form in enumerate(FORMS):
+        print(f"\nUnwinnable gaps, {form} player")
+        for phase in PHASES:
+            pairs = max(1, results["pairs"][phase])
+            unwinnable = results["unwinnable"][form_index, phase]
+            print(f"  phase {phase}: {unwinnable.sum()} "
+                  f"({100 * unwinnable.sum() / pairs:.4f}% of gaps)")
+            for first, second in zip(*np.nonzero(unwinnable)):
+                print(f"    {EGG_TYPES[first]:>7} then "
+                      f"{EGG_TYPES[second]:<7} "
+                      f"{unwinnable[first, second]:>10}")
+            print_histogram(results["unwinnable_gaps"][form_index, phase],
+                            GAP_BIN, "px")
+        first = results["first_unwinnable"][form_index]
+        print("  first frame with an unwinnable gap: "
+              f"{'never' if first == never else first}")
+        print("  frames where unwinnable gaps reach the player:")
+        print_histogram(results["unwinnable_frames"][form_index],
+                        FRAME_BIN, "f ")
+
+        for character in (1, 2, 3):
+            sequences = max(1, results["sequences"].sum())
+            deaths = results["deaths"][form_index, character]
+            first = results["first_death"][form_index, character]
+            print(f"  character {character}: {deaths} sequences "
+                  f"({100 * deaths / sequences:.4f}%) kill the player with "
+                  f"unavoidable hits, first at frame "
+                  f"{'never' if first == never else first}")
+            print_histogram(results["death_frames"][form_index, character],
+                            FRAME_BIN, "f ")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Check the egg spawn rules for unwinnable gaps")
+    parser.add_argument("--sequences", type=int, default=1_000_000,
+                        help="spawn sequences per phase")
+    parser.add_argument("--length", type=int, default=16,
+                        help="eggs spawned per sequence")
+    parser.add_argument("--max-frame", type=int, default=4 * 2700,
+                        help="last phase sequences start before this "
+                             "frame")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="worker processes")
+    parser.add_argument("--chunk", type=int, default=50_000,
+                        help="sequences per job given to a worker")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    with Pool(args.workers) as pool:
+        min_gap = build_min_gap_table(pool, args.max_frame)
+        table_time = time.perf_counter() - start
+
+        jobs = []
+        seeds = np.random.SeedSequence(args.seed).spawn(
+            len(PHASES) * ceil(args.sequences / args.chunk))
+        for phase in PHASES:
+            for first in range(0, args.sequences, args.chunk):
+                count = min(args.chunk, args.sequences - first)
+                jobs.append((seeds[len(jobs)], phase, count, args.length,
+                             args.max_frame, min_gap))
+        results = new_results(args.max_frame)
+        for chunk_results in pool.imap_unordered(run_chunk, jobs):
+            add_results(results, chunk_results)
+    total_time = time.perf_counter() - start
+
+    print_report(results, min_gap, args.max_frame)
+    sequences = results["sequences"].sum()
+    print(f"\n{sequences} sequences on {args.workers} workers in "
+          f"{total_time:.1f}s (gap search {table_time:.1f}s, "
+          f"{sequences / (total_time - table_time):,.0f} sequences/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""Font and rendered text cache
+
+Loading a font from disk (or looking up a system font) and rendering
+text are both slow, and the game used to do them every frame. get_font()
+loads each font once and render_text() keeps recently rendered text
+surfaces, so text is only rendered again when it changes (for example
+the score only changes every 4 frames).
+"""
+
+from functools import lru_cache
+
+import pygame
+
+# fonts that were already loaded, keyed by (name, size, bold)
+loaded_fonts = {}
+
+
+def get_font(name, size, bold=False):
+    """Get a font, loading it the first time it is used.
+    `name` is either a font file (.ttf/.otf) or a system font name"""
+    key = (name, size, bold)
+    font = loaded_fonts.get(key)
+    if font is None:
+        if name.endswith((".ttf", ".otf")):
+            font = pygame.font.Font(name, size)
+            font.bold = bold
+        else:
+            font = pygame.font.SysFont(name, size, bold=bold)
+        loaded_fonts[key] = font
+    return font
+
+
+@lru_cache(maxsize=256)
+def render_text(name, size, text, antialias, color, bold=False):
+    """Same as get_font(name, size, bold).render(text, antialias, color)
+    but remembers the result, don't draw on the returned surface"""
+    return get_font(name, size, bold).render(text, antialias, color)
+
+
+def clear_cache():
+    """forget all loaded fonts and rendered text"""
+    loaded_fonts.clear()
+    render_text.cache_clear()
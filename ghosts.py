@@ -0,0 +1,216 @@
+"""Race against ghosts of earlier runs
+
+A ghost file keeps where the player was and what they looked like on
+every frame of a game, 3 bytes a frame:
+
+    header   "EGGH", version, character                (6 bytes)
+    frames   player's top y (int16) and state (uint8), the state is
+             the index of World.player_pose in PLAYER_POSES times 2,
+             plus 1 if the player was small
+
+Frame i is the player when World.frame was i. The player's x only
+depends on their pose (see World.update_player_pose()) so it isn't
+stored.
+
+GhostRace doesn't load the files. Each one is memory mapped, and the
+frames about to be drawn are copied CHUNK frames at a time into two
+small (ghosts, CHUNK) arrays: the chunk being drawn, and the next one
+that is filled a few ghosts per frame so no frame has to read all of
+them. All the ghosts go on one layer of the render queue, drawn with
+one Surface.blits() call, with the ghost sprites from sprites.py,
+already tinted and see-through, so hundreds of ghosts cost about as
+much as a few normal sprites.
+
+Ghosts are saved next to the replays with:
+    python main.py --record replays
+made from older replays with:
+    python ghosts.py replays/*.eggr
+and raced with:
+    python main.py --ghosts replays
+"""
+
+import os
+import sys
+import struct
+
+import numpy as np
+import pygame
+
+from render import LAYER_GHOSTS
+from replay import read_replay
+from sprites import PLAYER_POSES, get_sprite
+from world import SMALL_SCALE, World
+
+MAGIC = b"EGGH"
+VERSION = 1
+HEADER = struct.Struct("<4sBB")  # magic, version, character
+FRAME = struct.Struct("<hB")  # player's top y, state
+FRAME_DTYPE = np.dtype([("y", "<i2"), ("state", "u1")])  # same as FRAME
+CHUNK = 256  # frames copied from the files at a time
+ENDED = 255  # state of a ghost whose game is over
+
+# player's x for each pose, from World.update_player_pose()
+get_pose_x = {"walk": 25, "walk2": 25, "jump": 25,
+              "crawl": 15, "crawl2": 15, "fly": 15}
+
+
+def get_state(world):
+    """ghost state of the World's player"""
+    return PLAYER_POSES.index(world.player_pose) * 2 + world.player_is_small
+
+
+class GhostWriter:
+    """Writes a ghost while the game is played, call write() with the
+    World after it is reset and after every step, then close()"""
+
+    def __init__(self, path, character):
+        self.file = open(path, "wb")
+        self.file.write(HEADER.pack(MAGIC, VERSION, character))
+        self.frames = 0
+
+    def write(self, world):
+        """add the player of the World's current frame"""
+        self.file.write(FRAME.pack(world.player_rect.top, get_state(world)))
+        self.frames += 1
+
+    def close(self):
+        self.file.close()
+
+
+def open_ghost(path):
+    """Memory map a ghost's frames without reading them, returns None
+    if the ghost has no frames"""
+    with open(path, "rb") as file:
+        magic, version, _ = HEADER.unpack(file.read(HEADER.size))
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a version {VERSION} ghost")
+    # a game that crashed can end in the middle of a frame
+    frames = (os.path.getsize(path) - HEADER.size) // FRAME.size
+    if frames == 0:
+        return None
+    return np.memmap(path, FRAME_DTYPE, "r", HEADER.size, (frames,))
+
+
+def get_ghost_sprites():
+    """(surfaces, x, widths, heights) for each ghost state"""
+    surfaces = []
+    for pose in PLAYER_POSES:
+        for scale in (1, SMALL_SCALE):
+            surfaces.append(get_sprite("ghost", pose, scale))
+    x = np.array([get_pose_x[pose] for pose in PLAYER_POSES
+                  for _ in range(2)])
+    widths = np.array([surf.get_width() for surf in surfaces])
+    heights = np.array([surf.get_height() for surf in surfaces])
+    return surfaces, x, widths, heights
+
+
+class GhostRace:
+    """Ghosts of the games in `paths`, submit() draws them for a
+    frame. Frames are usually drawn in order, going back (a new game)
+    or skipping ahead works too but reads a whole chunk at once"""
+
+    def __init__(self, paths):
+        self.ghosts = [ghost for ghost in map(open_ghost, paths)
+                       if ghost is not None]
+        count = len(self.ghosts)
+        # ys[0]/states[0] is the chunk being drawn, [1] the next one
+        self.ys = np.zeros((2, count, CHUNK), dtype=np.int16)
+        self.states = np.full((2, count, CHUNK), ENDED, dtype=np.uint8)
+        self.chunk = None  # chunk number in ys[0]/states[0]
+        self.filled = 0  # ghosts of the next chunk filled so far
+        # sprites, x and size of each state
+        self.surfaces, self.x, self.widths, self.heights = \
+            get_ghost_sprites()
+
+    def __len__(self):
+        return len(self.ghosts)
+
+    def fill(self, block, chunk, first, last):
+        """copy ghosts first to last - 1 of `chunk` into block 0 or 1"""
+        start = chunk * CHUNK
+        for i in range(first, last):
+            frames = self.ghosts[i][start:start + CHUNK]
+            self.ys[block, i, :len(frames)] = frames["y"]
+            self.states[block, i, :len(frames)] = frames["state"]
+            self.states[block, i, len(frames):] = ENDED
+
+    def seek(self, frame):
+        """get `frame`'s chunk into block 0 and fill part of the next"""
+        chunk, offset = divmod(frame, CHUNK)
+        count = len(self.ghosts)
+        if chunk != self.chunk:
+            if self.chunk is not None and chunk == self.chunk + 1:
+                # finish the next chunk and make it the current one
+                self.fill(1, chunk, self.filled, count)
+                # swap the blocks, the old one is filled with the next
+                self.ys = self.ys[::-1]
+                self.states = self.states[::-1]
+            else:
+                self.fill(0, chunk, 0, count)
+            self.chunk = chunk
+            self.filled = 0
+        # fill the next chunk a few ghosts at a time
+        target = (offset + 1) * count // CHUNK
+        if target > self.filled:
+            self.fill(1, chunk + 1, self.filled, target)
+            self.filled = target
+        return offset
+
+    def get_blits(self, frame):
+        """(Surface.blits() items, area they cover) of the ghosts that
+        are still playing on `frame`, the area is None if there are
+        none"""
+        if not self.ghosts:
+            return [], None
+        offset = self.seek(frame)
+        states = self.states[0, :, offset]
+        playing = states != ENDED
+        states = states[playing]
+        if not len(states):
+            return [], None
+        ys = self.ys[0, :, offset][playing]
+        xs = self.x[states]
+        surfaces = self.surfaces
+        blits = [(surfaces[state], (x, y)) for state, x, y in
+                 zip(states.tolist(), xs.tolist(), ys.tolist())]
+        left, top = int(xs.min()), int(ys.min())
+        return blits, pygame.Rect(
+            left, top, int((xs + self.widths[states]).max()) - left,
+            int((ys + self.heights[states]).max()) - top)
+
+    def submit(self, queue, frame):
+        """add the ghosts of `frame` to a render.RenderQueue, returns
+        the area they cover or None"""
+        blits, rect = self.get_blits(frame)
+        queue.extend(LAYER_GHOSTS, blits)
+        return rect
+
+
+def make_ghost(replay_path, path, world=None):
+    """play a replay headless and save its ghost, returns its frames"""
+    replay = read_replay(replay_path)
+    if world is None:
+        world = World()
+    world.reset(replay.character, replay.seed)
+    writer = GhostWriter(path, replay.character)
+    writer.write(world)
+    for inputs in replay.inputs:
+        world.step(inputs)
+        writer.write(world)
+    writer.close()
+    return writer.frames
+
+
+def main(paths):
+    world = World()
+    for replay_path in paths:
+        path = os.path.splitext(replay_path)[0] + ".eggh"
+        frames = make_ghost(replay_path, path, world)
+        print(f"{path}: {frames} frames")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("usage: python ghosts.py REPLAY.eggr ...")
+        sys.exit(1)
+    main(sys.argv[1:])
@@ -0,0 +1,177 @@
+"""Leaderboards for Egg Jump
+
+Keeps the top 10 scores overall and for each character (1, 2 and 3).
+Each board is a min-heap of at most 10 scores. With only 10 scores
+this isn't faster than sorting a list (adding a score updates two
+boards and takes about half a microsecond either way), but a score
+that doesn't make a board is only compared with its smallest score.
+
+Scores are saved the moment a game ends, by appending a 16 byte record
+(sequence number, character, score) to scores.log, so a crash can't
+lose them. Once the log gets long it is compacted: the boards are
+written to leaderboard.txt (through a temporary file and os.replace(),
+so the file is always either the old or the new version) along with
+the sequence number of the last score they include, then the log is
+emptied. Records with a sequence number the top file already includes
+are skipped when loading, so a crash between the two steps doesn't
+count scores twice, and a record cut off by a crash is ignored and
+cut off the log, so the records added after it line up.
+
+Loading reads the whole log with NumPy, so startup stays fast even if
+the log holds millions of runs.
+"""
+
+import os
+import heapq
+
+import numpy as np
+
+SIZE = 10  # scores kept per board
+BOARDS = ["overall", 1, 2, 3]
+TOP_FILE = "leaderboard.txt"
+LOG_FILE = "scores.log"
+COMPACT_RECORDS = 1024  # compact once the log has this many records
+RECORD = np.dtype([("seq", "<u8"), ("character", "<u4"), ("score", "<u4")])
+
+
+class Leaderboard:
+    """Top scores for every board. Leaderboard() only keeps scores in
+    memory, Leaderboard.open() loads and saves them in a folder"""
+
+    def __init__(self, size=SIZE):
+        self.size = size
+        self.boards = {board: [] for board in BOARDS}  # min-heaps
+        self.last_seq = 0  # sequence number of the last score added
+        self.top_path = None
+        self.log_path = None
+        self.log = None  # log file opened for appending
+        self.log_records = 0  # records in the log file
+        self.sync = True  # fsync() each score, so it survives a crash
+
+    def push(self, board, score):
+        """add a score to one board if it makes the top"""
+        heap = self.boards[board]
+        if len(heap) < self.size:
+            heapq.heappush(heap, score)
+        elif score > heap[0]:
+            heapq.heapreplace(heap, score)
+
+    def add(self, score, character):
+        """add the score of a finished game, and save it if the
+        leaderboard was opened from files"""
+        self.last_seq += 1
+        self.push("overall", score)
+        self.push(character, score)
+        if self.log is not None:
+            record = np.array([(self.last_seq, character, score)], RECORD)
+            self.log.write(record.tobytes())
+            self.log.flush()
+            if self.sync:
+                os.fsync(self.log.fileno())
+            self.log_records += 1
+            if self.log_records >= COMPACT_RECORDS:
+                self.compact()
+
+    def get_top(self, board="overall"):
+        """the board's scores, highest first"""
+        return sorted(self.boards[board], reverse=True)
+
+    def get_scores(self, board="overall"):
+        """the board's scores highest first, padded with 0 to the
+        board's size like the menu shows them"""
+        top = self.get_top(board)
+        return top + [0] * (self.size - len(top))
+
+    @classmethod
+    def open(cls, folder=".", size=SIZE):
+        """load the leaderboard saved in `folder` and keep saving to it"""
+        leaderboard = cls(size)
+        leaderboard.top_path = os.path.join(folder, TOP_FILE)
+        leaderboard.log_path = os.path.join(folder, LOG_FILE)
+        leaderboard.load_top()
+        leaderboard.load_log()
+        leaderboard.log = open(leaderboard.log_path, "ab")
+        # drop a record cut off by a crash, the next records would be
+        # read at the wrong offset after it
+        leaderboard.log.truncate(leaderboard.log_records * RECORD.itemsize)
+        if leaderboard.log_records >= COMPACT_RECORDS:
+            leaderboard.compact()  # so the next start is fast
+        return leaderboard
+
+    def load_top(self):
+        """read the top file, lines are "board score" and "seq N".
+        A line with only a score is from the old leaderboard.txt, which
+        only had the overall board. Bad lines (edited by hand or cut
+        off by a crash) are skipped"""
+        try:
+            with open(self.top_path) as file:
+                lines = file.read().split("\n")
+        except FileNotFoundError:  # first time playing
+            return
+        for line in lines:
+            words = line.split()
+            if not words or words[0].startswith("#"):
+                continue
+            try:
+                if len(words) == 1:
+                    self.push("overall", int(words[0]))
+                elif words[0] == "seq":
+                    self.last_seq = int(words[1])
+                elif words[0] == "overall":
+                    self.push("overall", int(words[1]))
+                else:
+                    self.push(int(words[0]), int(words[1]))
+            except (ValueError, KeyError, IndexError):
+                continue  # not a board, or not a number
+
+    def load_log(self):
+        """add the log's scores that aren't in the top file yet"""
+        try:
+            with open(self.log_path, "rb") as file:
+                data = file.read()
+        except FileNotFoundError:
+            return
+        # a record cut off by a crash is ignored
+        records = np.frombuffer(data, RECORD,
+                                count=len(data) // RECORD.itemsize)
+        self.log_records = len(records)
+        records = records[records["seq"] > self.last_seq]
+        if len(records) == 0:
+            return
+        self.last_seq = int(records["seq"].max())
+        for board in BOARDS:
+            if board == "overall":
+                scores = records["score"]
+            else:
+                scores = records["score"][records["character"] == board]
+            # only the best `size` scores of the log can make the board
+            if len(scores) > self.size:
+                scores = np.partition(scores, -self.size)[-self.size:]
+            for score in scores.tolist():
+                self.push(board, score)
+
+    def compact(self):
+        """write the boards to the top file and empty the log"""
+        lines = ["# Egg Jump leaderboard: board score",
+                 f"seq {self.last_seq}"]
+        for board in BOARDS:
+            lines += [f"{board} {score}" for score in self.get_top(board)]
+        temp_path = self.top_path + ".tmp"
+        with open(temp_path, "w") as file:
+            file.write("\n".join(lines) + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, self.top_path)  # atomic
+        # every score in the log is in the top file now
+        if self.log is not None:
+            self.log.truncate(0)
+        else:
+            open(self.log_path, "wb").close()
+        self.log_records = 0
+
+    def close(self):
+        """compact and stop saving"""
+        if self.log is not None:
+            self.compact()
+            self.log.close()
+            self.log = None
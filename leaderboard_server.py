@@ -0,0 +1,128 @@
+"""Local stand-in for the online leaderboard
+
+A small HTTP server that online.py can talk to, for trying it out and
+for benchmarks/bench_online.py. It keeps the scores in a Leaderboard
+(in memory, or saved in --folder):
+
+    POST /scores   {"runs": [{"id": "...", "score": 120, "character": 1}]}
+                   adds the runs, a run whose id was already added
+                   (a batch sent again after its answer was lost) isn't
+                   counted twice, answers {"added": number added}
+    GET /top       answers {"scores": [...]}, the overall top 10,
+                   highest first
+
+--delay makes every answer wait that many seconds, like a slow server.
+
+Run it and play against it with:
+    python leaderboard_server.py --port 8765
+    python main.py --online http://localhost:8765
+"""
+
+import json
+import time
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from leaderboard import Leaderboard, BOARDS
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    """answers one request, on its own thread"""
+
+    def send_json(self, status, data):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        time.sleep(server.delay)
+        if self.path != "/top":
+            self.send_json(404, {"error": "not found"})
+            return
+        with server.lock:
+            scores = server.leaderboard.get_top()
+        self.send_json(200, {"scores": scores})
+
+    def do_POST(self):
+        server = self.server
+        time.sleep(server.delay)
+        if self.path != "/scores":
+            self.send_json(404, {"error": "not found"})
+            return
+        try:
+            length = int(self.headers["Content-Length"])
+            runs = [(str(run["id"]), int(run["score"]), int(run["character"]))
+                    for run in json.loads(self.rfile.read(length))["runs"]]
+        except (ValueError, KeyError, TypeError):
+            self.send_json(400, {"error": "bad runs"})
+            return
+        if any(character not in BOARDS for _, _, character in runs):
+            self.send_json(400, {"error": "bad character"})
+            return
+        added = 0
+        with server.lock:
+            for run_id, score, character in runs:
+                if run_id in server.seen:
+                    continue
+                server.seen.add(run_id)
+                server.leaderboard.add(score, character)
+                added += 1
+        self.send_json(200, {"added": added})
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+
+class LeaderboardServer(ThreadingHTTPServer):
+    """the server, serve_forever() runs it"""
+    daemon_threads = True
+
+    def __init__(self, address, delay=0.0, folder=None, quiet=False):
+        super().__init__(address, RequestHandler)
+        self.delay = delay
+        self.quiet = quiet
+        if folder is None:
+            self.leaderboard = Leaderboard()
+        else:
+            self.leaderboard = Leaderboard.open(folder)
+        self.seen = set()  # ids of the runs added
+        self.lock = threading.Lock()  # requests are answered on threads
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def start_server(port=0, delay=0.0, host="127.0.0.1"):
+    """run a quiet in-memory server on a background thread, port 0
+    picks a free one. Stop it with server.shutdown()"""
+    server = LeaderboardServer((host, port), delay, quiet=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="local Egg Jump leaderboard server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=0.0,
+                        help="seconds every answer waits")
+    parser.add_argument("--folder",
+                        help="save the scores in FOLDER instead of memory")
+    args = parser.parse_args()
+    server = LeaderboardServer((args.host, args.port), args.delay,
+                               args.folder)
+    print(f"leaderboard server on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    server.leaderboard.close()
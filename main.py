@@ -2,766 +2,416 @@
 
 A game similar to the famous Chrome Dino Game, built using pygame.
 Made by intern: @bassemfarid and Ivan Li
+
+The game rules live in world.py, this file only reads the keyboard,
+draws the current state of the World and runs the menus.
 """
 
-import sys
 import pygame
 
+import os
 import time
-from random import randint
-import random
-from collections import namedtuple
-from math import ceil, log2
-
-
-# def run_debug():
-#     """
-#     Create coordinate grid for easy drawing and check frame rate
-#     """
-#     # 1. Draw grid
-#     grid_surface = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
-#     for i in range(0, WIDTH, 100):  # big vertical lines
-#         line = pygame.Rect(i, 0, 2, HEIGHT)
-#         pygame.draw.rect(grid_surface, "red", line)
-#     for i in range(0, HEIGHT, 100):  # big horizontal lines
-#         line = pygame.Rect(0, i, WIDTH, 2)
-#         pygame.draw.rect(grid_surface, "red", line)
-#     for i in range(0, WIDTH, 20):  # small vertical lines
-#         line = pygame.Rect(i, 0, 1, HEIGHT)
-#         pygame.draw.rect(grid_surface, "grey", line)
-#     for i in range(0, HEIGHT, 20):  # small horizontal lines
-#         line = pygame.Rect(0, i, WIDTH, 1)
-#         pygame.draw.rect(grid_surface, "grey", line)
-#     screen.blit(grid_surface, (0, 0))  # display all grid lines
-#
-#     # 2. Check FPS every 5 seconds
-#     if frame % 300 == 0 and game_state == "playing":
-#         t = time.time() - start_time
-#         fps = frame / t
-#         print(f"Frame: {frame}, Time: {t:.2f} , FPS: {fps:.2f}")
-#         if fps < 55:
-#             print("LOW FPS WARNING", file=sys.stderr)
-#
-#     # 3. right click to get coordinates
-#     for event in frame_events:
-#         if event.type == pygame.MOUSEBUTTONDOWN and event.button == 3:
-#             print(f"Mouse coordinates: {event.pos}")
-
-
-def add_score(scores, to_add):
-    """add a score to the list of top 10 scores and keep scores
-    sorted"""
-    scores.append(to_add)
-    scores.sort(reverse=True)  # sort to remove smallest score
-    scores.pop()
-
-
-def display_scores(scores):
-    """Displays the top 10 scores on the game menu"""
-    x_pos = 620  # top-left corner of scores display
-    y_pos = 20
-    spacing = 32
-
-    # display leaderboard title
-    font = pygame.font.SysFont('Comic sans', 24, bold=True)
-    title_text = font.render("Top 10 Scores", True, "white")
-    screen.blit(title_text, (x_pos, y_pos))
-
-    # display top 10 scores
-    font = pygame.font.SysFont('Comic sans', 24)
-    for index, score in enumerate(scores):
-        y_pos += spacing  # space out scores evenly
-        score_text = font.render(f"{index + 1}. {score}", True, "white")
-        screen.blit(score_text, (x_pos, y_pos))
-
-
-def display_main_menu():
-    """Display the main menu with game title, leaderboard,
-    and character selection"""
-
-    # display character selection options
-    screen.blit(main_menu_surf, (0, 0))
-
-    # display leaderboard with top 10 scores
-    display_scores(scores)
-
-    # write the game's title on the screen
-    game_name = 'EGG JUMP'
-    title_font = pygame.font.Font("font/MainluxLight-DOAJx.otf", 110)
-    text_surf = title_font.render(game_name, True, "#FFF6F6")
-    text_rect = text_surf.get_rect(center=(307, 80))
-    screen.blit(text_surf, text_rect)
-
-    # display jumping character, with color inverted
-    character_surf = pygame.transform.scale(player_surf_jump, (90, 150))
-    inv = pygame.Surface(character_surf.get_size())
-    inv.fill("white")
-    inv.blit(character_surf, (0, 0), None, pygame.BLEND_RGBA_SUB)
-    inv_rect = inv.get_rect(topleft=(40, 140))
-    screen.blit(inv, inv_rect)
-
-
-def display_player_health(hp, shield):
-    """display the current player HP and shield"""
-    hp = ceil(hp)
-    shield = ceil(shield)
-    x, y = 20, 20
-    scaling = 2.1
-    width, height = 100, 40
-    border_width = 2
-
-    width *= scaling
-
-    # draw hp bar and create black border
-    bar_width = hp * scaling
-    pygame.draw.rect(screen, "green", (x, y, bar_width, height))
-    pygame.draw.rect(screen, "black", (x, y, width, height), border_width)
-
-    # write hp as text
-    font = pygame.font.SysFont('Comic sans', 19, bold=True)
-    hp_text = font.render(f"{hp}/100", True, "black")
-    text_rect = hp_text.get_rect(center=(x + width // 2, y + height // 2))
-    screen.blit(hp_text, text_rect)
-
-    if shield > 0:  # draw shield bar to the left of HP bar
-        x += width
-        width, height = 25, 40
-
-        width -= border_width  # adjust borders
-        width *= scaling
-
-        # draw shield bar and create black border
-        bar_width = width - (25 - shield) * scaling
-        pygame.draw.rect(screen, "#8FFFF2", (x, y, bar_width, height))
-        pygame.draw.rect(screen, "black", (x, y, width, height), border_width)
-
-        # write shield as text
-        font = pygame.font.SysFont('Comic sans', 19, bold=True)
-        hp_text = font.render(f"{shield}", True, "black")
-        text_rect = hp_text.get_rect(center=(x + width / 2, y + height / 2))
-        screen.blit(hp_text, text_rect)
-
-
-def display_player_power_up():
-    """Displays the player's current power up and how much time
-    there is remaining if you currently have one active"""
-    if cur_power_up == no_power_up:
-        return
-    x, y = 560, 20
-    width, height = 140, 40
-    border_width = 2
-
-    # draw the power up icon, scale it down to fit in the bar
-    icon_surf = get_power_up_surf[cur_power_up.type]
-    icon_surf = pygame.transform.scale(icon_surf, (height, height))
-    icon_rect = icon_surf.get_rect(topleft=(x - height, y))
-    screen.blit(icon_surf, icon_rect)
-
-    # fill in the bar to represent how much time the power up has left
-    max_val = get_max_power_up_val[cur_power_up.type]
-    power_up_color = get_power_up_color[cur_power_up.type]
-    bar_width = width * (cur_power_up.value / max_val)
-    pygame.draw.rect(screen, power_up_color, (x, y, bar_width, height))
-
-    # draw borders
-    pygame.draw.rect(screen, "black", (x, y, width, height), border_width)
-
-
-def handle_egg_objects():
-    """Does the following actions on each egg objects:
-    1. move towards player and display it
-    2. check for collision with player and change player HP if needed"""
-    global player_hp, player_shield
-    for i in reversed(range(len(eggs))):
-        egg = eggs[i]
-
-        # move egg
-        egg.rect.x -= get_obstacle_speed(frame)
-        if egg.rect.right <= 0:  # replace egg with a new one
-            eggs.pop(i)
-            eggs.append(get_egg(eggs[-1].rect.right, frame))
-            continue
-
-        # display egg
-        egg_surf_temp = get_egg_surf[egg.type]
-        # this type of eggs gradually turns invisible
-        if not egg.visible:
-            egg_surf_temp.set_alpha(255 * (egg.rect.x - 300) / WIDTH)
-        else:
-            egg_surf_temp.set_alpha(255)
-        screen.blit(egg_surf_temp, egg.rect)
-
-        # handle player-egg collision
-        # no collisions or egg has already hit player once
-        if not egg.rect.colliderect(player_rect) or egg.destroyed:
-            continue
-        # make sure the same egg doesn't deal damage again
-        eggs[i] = Egg(egg.rect, egg.type, True,
-                      egg.visible)
-
-        # normal egg: instant kill or break shield
-        if (egg.type == "normal" or
-                egg.type == "flying" or
-                egg.type == "flying2"):
-            if player_shield > 0:
-                player_shield = 0
-            else:
-                player_hp = 0
-        # fried egg: take 20 damage
-        elif egg.type == "fried":
-            if player_shield > 0:
-                player_shield = max(0, player_shield - 20)
+import argparse
+
+from autoplay import AutoPlayer
+from capture import CaptureWriter
+from ghosts import GhostRace, GhostWriter
+from leaderboard import Leaderboard
+from online import OnlineLeaderboard, parse_url
+from particles import ParticleSystem
+from profiler import profiler
+from render import (FullRenderer, DirtyRectRenderer, HeadlessRenderer,
+                    submit_death_screen, get_help_button_rect,
+                    get_main_menu)
+from replay import ReplayWriter, read_replay
+from sprites import build_atlas, get_sprite
+from timestep import FixedTimestep, get_positions, interpolated
+from world import WIDTH, HEIGHT, INPUT_JUMP, INPUT_DOWN, INPUT_DROP, World
+
+# how each frame reaches the display, see render.py
+get_renderer = {"full": FullRenderer,
+                "dirty": DirtyRectRenderer,
+                "headless": HeadlessRenderer}
+
+
+def get_inputs(keys, frame_events):
+    """Turn the keyboard state into World.step() input bits"""
+    inputs = 0
+    # [space] or [up_arrow] to jump, you can hold down keys
+    if keys[pygame.K_SPACE] or keys[pygame.K_UP]:
+        inputs |= INPUT_JUMP
+    # [down_arrow] to crawl while held
+    if keys[pygame.K_DOWN]:
+        inputs |= INPUT_DOWN
+    # [down_arrow] to drop down from a jump or flying
+    if any(event.type == pygame.KEYDOWN and event.key == pygame.K_DOWN
+           for event in frame_events):
+        inputs |= INPUT_DROP
+    return inputs
+
+
+def draw_menu(screen, scores, title="Top 10 Scores"):
+    """main menu with the help button, only composed again when the
+    scores change"""
+    screen.blit(get_main_menu(tuple(scores), title), (0, 0))
+
+
+def draw_help_menu(screen):
+    """help menu picture"""
+    screen.blit(get_sprite("level", "help_menu"), (0, 0))
+
+
+class Game:
+    """Everything the game needs between frames: the menus' state, the
+    World being played, the leaderboard and the renderer.
+    run_frame() does one frame of the main loop, main() calls it once
+    per frame with the number of World steps a FixedTimestep says to
+    run, the benchmarks call it with scripted input"""
+
+    def __init__(self, screen, renderer="full", record=None, replay=None,
+                 leaderboard=None, autoplay=False, ghosts=None, online=None):
+        """`record` is a folder to save a replay and a ghost of every
+        game in, `replay` is a replay file to watch instead of playing.
+        Every game races the ghosts in the `ghosts` folder. Scores
+        go to `leaderboard`, by default one that isn't saved. With
+        `autoplay` the AutoPlayer plays instead of the keyboard and
+        its scores aren't added. Scores are also sent to the `online`
+        OnlineLeaderboard, and the menu shows its top 10"""
+        self.screen = screen
+        self.renderer = get_renderer[renderer](screen)
+        self.button = get_help_button_rect()
+        if leaderboard is None:
+            leaderboard = Leaderboard()
+        self.leaderboard = leaderboard
+        self.online = online
+        self.record = record
+        self.ghosts = ghosts
+
+        # default game state variables
+        self.game_state = "main_menu"  # the current state of the game
+        self.world = World()
+        self.start_time = time.time()
+        self.recorder = None  # ReplayWriter of the current game
+        self.ghost_writer = None  # GhostWriter of the current game
+        self.race = None  # GhostRace drawn behind the player
+        self.replay = None  # Replay being watched
+        self.positions = None  # get_positions() before the last step
+        self.pending_events = []  # events of frames without a step
+        self.autoplayer = AutoPlayer() if autoplay else None
+        self.particles = ParticleSystem()  # egg hits and power up pickups
+
+        # parts of World.step() the profiler times while it's on
+        profiler.watch(self.world, "update_player_pose", "player_pose")
+        profiler.watch(self.world, "update_eggs", "eggs")
+        profiler.watch(self.world, "update_power_ups", "power_ups")
+
+        # watch a replay, its inputs are used instead of the keyboard
+        if replay is not None:
+            self.replay = read_replay(replay)
+            self.world.reset(self.replay.character, self.replay.seed)
+            self.game_state = "playing"
+            self.start_race()
+
+    def start_race(self):
+        """load the ghosts to race, before this game's ghost is made"""
+        if self.ghosts is None:
+            return
+        paths = [os.path.join(self.ghosts, name)
+                 for name in sorted(os.listdir(self.ghosts))
+                 if name.endswith(".eggh")]
+        self.race = GhostRace(paths)
+
+    def get_steps_and_alpha(self, timestep, elapsed):
+        """(steps, alpha) for run_frame() after `elapsed` seconds, only
+        game time passes while playing"""
+        if self.game_state != "playing":
+            timestep.accumulator = 0.0
+            return 0, 1.0
+        return timestep.advance(elapsed), timestep.alpha
+
+    def add_score(self, score, character):
+        """save the score of a finished game, and send it online"""
+        self.leaderboard.add(score, character)
+        if self.online is not None:
+            self.online.submit(score, character)
+
+    def get_menu_scores(self):
+        """(title, scores) for the main menu, the online top 10 once
+        it was fetched"""
+        if self.online is not None:
+            scores = self.online.get_scores()
+            if scores is not None:
+                return "Global Top 10", scores
+        return "Top 10 Scores", self.leaderboard.get_scores()
+
+    def start_game(self, character):
+        """start playing with the chosen character"""
+        world = self.world
+        world.reset(character=character)
+        self.positions = None
+        self.pending_events = []
+        self.particles.clear()
+        self.game_state = "playing"
+        self.start_time = time.time()
+        self.replay = None  # done watching, play for real
+        self.start_race()
+        if self.record is not None:
+            name = os.path.join(self.record, time.strftime("%Y%m%d-%H%M%S"))
+            self.recorder = ReplayWriter(name + ".eggr", world.seed,
+                                         world.character)
+            self.ghost_writer = GhostWriter(name + ".eggh", world.character)
+            self.ghost_writer.write(world)
+
+    def step_world(self, steps, frame_events, keys):
+        """run up to `steps` World steps, the frame's events only count
+        for the first one (events of frames without a step are kept for
+        the next step). Stops early if the game ends"""
+        world = self.world
+        frame_events = self.pending_events + frame_events
+        self.pending_events = []
+        if steps == 0:
+            self.pending_events = frame_events
+        for _ in range(steps):
+            if self.replay is not None:
+                inputs = self.replay.inputs[world.frame]
+            elif self.autoplayer is not None:
+                inputs = self.autoplayer.get_inputs(world)
             else:
-                player_hp -= 20
-
-
-def handle_power_up_objects():
-    """move power up spawns towards player and check if
-    the player picked up any"""
-    global cur_power_up
-    for i in reversed(range(len(power_ups))):
-        power_up_obj = power_ups[i]
-        # move power up towards player
-        power_up_obj.rect.x -= get_obstacle_speed(frame)
-        if power_up_obj.rect.right <= 0:  # out of map, remove it
-            power_ups.pop(i)
-            continue
-
-        # display power up
-        power_up_surf_temp = get_power_up_surf[power_up_obj.type]
-        screen.blit(power_up_surf_temp, power_up_obj.rect)
-
-        # check for collisions and update player's power up if needed
-        if power_ups[i].rect.colliderect(player_rect):
-            cur_power_up = Player_power_up(power_ups[i].type,
-                                           power_ups[i].value)
-            power_ups.pop(i)  # don't pick up power-up twice
-
-
-def handle_player_state():
-    """Handle the player's current action and display it on screen,
-    Shrink the character rect if player is currently small"""
-    global player_rect
-    if player_is_small:
-        # player is flying
-        if cur_power_up.type == "fly":
-            scaled_surf = pygame.transform.scale_by(player_surf_fly,
-                                                    0.6)
-            player_rect = scaled_surf.get_rect(
-                topleft=(15, 80))
-            screen.blit(scaled_surf, player_rect)
-        # player is crawling
-        elif keys[pygame.K_DOWN] and player_rect.bottom == GROUND_Y:
-            if frame % 20 < 10:  # animate based on frame
-                scaled_surf = pygame.transform.scale_by(player_surf_crawl,
-                                                        0.6)
-                player_rect = scaled_surf.get_rect(
-                    bottomleft=(15, player_rect.bottom))
-                screen.blit(scaled_surf, player_rect)
-            else:
-                scaled_surf = pygame.transform.scale_by(player_surf_crawl_2,
-                                                        0.6)
-                player_rect = scaled_surf.get_rect(
-                    bottomleft=(15, player_rect.bottom))
-                screen.blit(scaled_surf, player_rect)
-        # player is walking or jumping
-        else:
-            if player_rect.bottom != GROUND_Y:  # use jump animation
-                scaled_surf = pygame.transform.scale_by(player_surf_jump,
-                                                        0.6)
-                player_rect = scaled_surf.get_rect(
-                    bottomleft=(25, player_rect.bottom))
-                screen.blit(scaled_surf, player_rect)
-            else:  # on the ground, determine animation based on frame
-                if frame % 20 < 10:
-                    scaled_surf = pygame.transform.scale_by(player_surf_walk,
-                                                            0.6)
-                    player_rect = scaled_surf.get_rect(
-                        bottomleft=(25, player_rect.bottom))
-                    screen.blit(scaled_surf, player_rect)
-                else:
-                    scaled_surf = pygame.transform.scale_by(player_surf_walk2,
-                                                            0.6)
-                    player_rect = scaled_surf.get_rect(
-                        bottomleft=(25, player_rect.bottom))
-                    screen.blit(scaled_surf, player_rect)
-    # player is normal-sized
-    else:
-        # player is flying
-        if cur_power_up.type == "fly":
-            player_rect = player_surf_fly.get_rect(topleft=(15, 80))
-            screen.blit(player_surf_fly, player_rect)
-        # player is crawling
-        elif keys[pygame.K_DOWN] and player_rect.bottom == GROUND_Y:
-            if frame % 20 < 10:  # animate based on frame
-                player_rect = player_surf_crawl.get_rect(
-                    bottomleft=(15, player_rect.bottom))
-                screen.blit(player_surf_crawl, player_rect)
-            else:
-                player_rect = player_surf_crawl_2.get_rect(
-                    bottomleft=(15, player_rect.bottom))
-                screen.blit(player_surf_crawl_2, player_rect)
-        # player is walking or jumping
-        else:
-            if player_rect.bottom != GROUND_Y:  # use jump animation
-                player_rect = player_surf_jump.get_rect(
-                    bottomleft=(25, player_rect.bottom))
-                screen.blit(player_surf_jump, player_rect)
-            else:  # on the ground, determine animation based on frame
-                if frame % 20 < 10:
-                    player_rect = player_surf_walk.get_rect(
-                        bottomleft=(25, player_rect.bottom))
-                    screen.blit(player_surf_walk, player_rect)
-                else:
-                    player_rect = player_surf_walk2.get_rect(
-                        bottomleft=(25, player_rect.bottom))
-                    screen.blit(player_surf_walk2, player_rect)
-
-
-def get_egg(prev_loc, frame):
-    """Returns an Egg object based on current phase and previous egg
-    location,
-    Makes sure that 2 eggs are not too close together, so it is always
-    possible to win"""
-    phase = get_phase(frame)
-
-    # phase 1: only spawn normal eggs
-    if phase == 1:
-        # ensure eggs aren't too close to each other and have some
-        # variation
-        left = max(MIN_EGG_DIST + prev_loc + randint(0, 150),
-                   randint(800, 1100))
-        return Egg(egg_surf.get_rect(bottomleft=(left, GROUND_Y)),
-                   "normal", False, True)
-
-    # phase 2: spawn normal and fried eggs with equal probability
-    elif phase == 2:
-        if randint(0, 1) == 0:  # spawn normal egg
-            left = max(MIN_EGG_DIST + prev_loc + randint(0, 150),
-                       randint(800, 1100))
-            return Egg(egg_surf.get_rect(bottomleft=(left, GROUND_Y)),
-                       "normal", False, True)
-        else:  # spawn fried egg, these can be closer together
-            left = max(MIN_EGG_DIST + prev_loc + randint(-35, 120),
-                       randint(800, 950))
-            return Egg(egg_surf_fried.get_rect(bottomleft=(left, GROUND_Y)),
-                       "fried", False, True)
-
-    # phase 3: spawn eggs with 30/30/20/20 chance respectively
-    elif phase == 3:
-        type_egg = randint(1, 10)
-        if type_egg <= 3:  # spawn normal egg
-            left = max(MIN_EGG_DIST + prev_loc + randint(0, 150),
-                       randint(800, 1100))
-            return Egg(egg_surf.get_rect(bottomleft=(left, GROUND_Y)),
-                       "normal", False, True)
-        elif type_egg <= 6:  # spawn fried egg, these can be closer
-            left = max(MIN_EGG_DIST + prev_loc + randint(-35, 120),
-                       randint(800, 950))
-            return Egg(egg_surf_fried.get_rect(bottomleft=(left, GROUND_Y)),
-                       "fried", False, True)
-        elif type_egg <= 8:  # spawn flying egg, jump or duck
-            left = max(MIN_EGG_DIST + prev_loc + randint(30, 150),
-                       randint(800, 1000))
-            return Egg(egg_surf_fly.get_rect(bottomleft=(left, GROUND_Y - 35)),
-                       "flying", False, True)
-        else:  # spawn flying egg, must duck
-            left = max(MIN_EGG_DIST + prev_loc + randint(30, 150),
-                       randint(800, 1000))
-            return Egg(
-                egg_surf_fly2.get_rect(bottomleft=(left, GROUND_Y - 35)),
-                "flying2", False, True)
-
-    # phase 4: spawn eggs with 30/30/20/20 chance respectively
-    # there is a 50% chance the egg will slowly become invisible
-    # (it can still kill you)
-    else:
-        type_egg = randint(1, 10)
-        visible = randint(0, 1)
-        if type_egg <= 3:  # spawn normal egg
-            left = max(MIN_EGG_DIST + prev_loc + randint(0, 150),
-                       randint(800, 1100))
-            return Egg(egg_surf.get_rect(bottomleft=(left, GROUND_Y)),
-                       "normal", False, visible)
-        elif type_egg <= 6:  # spawn fried egg, these can be closer
-            left = max(MIN_EGG_DIST + prev_loc + randint(-55, 120),
-                       randint(800, 950))
-            return Egg(egg_surf_fried.get_rect(bottomleft=(left, GROUND_Y)),
-                       "fried", False, visible)
-        elif type_egg <= 8:  # spawn flying egg, jump or duck
-            left = max(MIN_EGG_DIST + prev_loc + randint(30, 150),
-                       randint(800, 1000))
-            return Egg(egg_surf_fly.get_rect(bottomleft=(left, GROUND_Y - 35)),
-                       "flying", False, visible)
-        else:  # spawn flying egg, must duck
-            left = max(MIN_EGG_DIST + prev_loc + randint(30, 150),
-                       randint(800, 1000))
-            return Egg(
-                egg_surf_fly2.get_rect(bottomleft=(left, GROUND_Y - 35)),
-                "flying2", False, visible)
-
-
-def get_power_up():
-    """Spawns a power up object with equal probability"""
-    # make sure it doesn't fully overlap with eggs
-    location = 800
-    for i in range(len(eggs)):
-        egg_l = eggs[i].rect.left
-        egg_r = eggs[i].rect.right
-        if egg_l <= location <= egg_r or location <= egg_l <= location + 40:
-            location = eggs[i].rect.right + 20
-
-    # randomly decide what power up you get
-    choices = ["health", "shield", "fly", "small"]
-    # don't spawn power ups that are currently useless
-    # also apply character power up restrictions
-    if player_hp > 99 or character == 3:
-        choices.remove("health")
-    if character == 3:
-        choices.remove("shield")
-    chosen = random.choice(choices)
-
-    # create Power_up object
-    coordinates = (location, GROUND_Y)
-    surf = get_power_up_surf[chosen]
-    value = get_max_power_up_val[chosen]
-    return Power_up(surf.get_rect(bottomleft=coordinates), chosen, value)
-
-
-def get_phase(frame):
-    """Gets the current game phase based on the current frame"""
-    if frame < 900:
-        return 1
-    elif frame < 1800:
-        return 2
-    elif frame < 2700:
-        return 3
-    else:
-        return 4
-
-
-def get_obstacle_speed(frame):
-    """Get the speed at which obstacles move left, depending on the
-    frame"""
-    slowest = 5.5
-    fastest = 8
-    if frame < 2700:  # start with linear increase
-        return frame * (fastest - slowest) / 2700 + slowest
-    else:  # then use logarithmic increase
-        return fastest + 5*log2(frame/2700)
-
-
-# DEVELOPER_MODE = False
-
-# Initialize Pygame and create a window
-pygame.init()
-WIDTH = 800
-HEIGHT = 400
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption('Egg Jump')
-clock = pygame.time.Clock()
-running = True  # Pygame main loop, kills the pygame when False
-
-# constants
-MIN_EGG_DIST = 120  # minimum distance between eggs
-GROUND_Y = 300  # The Y-coordinate of the ground level
-
-# load scores from leaderboard
-with open("leaderboard.txt", "r") as leaderboard:
-    scores = [0] * 10
-    for score in leaderboard.readlines():  # add top scores
-        add_score(scores, int(score))
-
-# Load level assets
-sky_surf = pygame.image.load("graphics/level/sky.png").convert()
-ground_surf = pygame.image.load("graphics/level/ground.png").convert()
-
-# Load menu assets
-help_menu_surf = pygame.image.load("graphics/help_menu.png").convert()
-main_menu_surf = pygame.image.load("graphics/main_menu.png").convert()
-
-# Load player assets
-player_surf_walk = pygame.image.load(
-    "graphics/player/player_walk_1.png").convert_alpha()
-player_surf_walk2 = pygame.image.load(
-    "graphics/player/player_walk_2.png").convert_alpha()
-player_surf_jump = pygame.image.load(
-    "graphics/player/player_jump.png").convert_alpha()
-player_surf_crawl = pygame.image.load(
-    "graphics/player/player_crawl_1.png").convert_alpha()
-player_surf_crawl_2 = pygame.image.load(
-    "graphics/player/player_crawl_2.png").convert_alpha()
-player_surf_fly = pygame.image.load(
-    "graphics/player/player_fly.png").convert_alpha()
-player_rect = player_surf_walk.get_rect(bottomleft=(25, GROUND_Y))
-
-# Load egg/obstacle assets
-egg_surf = pygame.image.load(
-    "graphics/egg/egg_normal.png").convert_alpha()
-egg_surf_fried = pygame.image.load(
-    "graphics/egg/egg_fried.png").convert_alpha()
-egg_surf_fly = pygame.image.load(
-    "graphics/egg/egg_flying.png").convert_alpha()
-egg_surf_fly2 = pygame.image.load(
-    "graphics/egg/egg_flying_2.png").convert_alpha()
-get_egg_surf = {"normal": egg_surf,
-                "fried": egg_surf_fried,
-                "flying": egg_surf_fly,
-                "flying2": egg_surf_fly2}
-Egg = namedtuple("Egg",
-                 ["rect", "type", "destroyed", "visible"])
-
-# Load power up assets
-health_surf = pygame.image.load(
-    "graphics/power_ups/health.png").convert_alpha()
-shield_surf = pygame.image.load(
-    "graphics/power_ups/shield.png").convert_alpha()
-fly_surf = pygame.image.load(
-    "graphics/power_ups/fly.png").convert_alpha()
-small_surf = pygame.image.load(
-    "graphics/power_ups/small.png").convert_alpha()
-get_power_up_surf = {"health": health_surf,
-                     "shield": shield_surf,
-                     "fly": fly_surf,
-                     "small": small_surf}
-get_max_power_up_val = {"health": 100,  # heal 20 HP
-                        "shield": 75,  # gain 15 shield
-                        "fly": 7 * 60,  # fly for 7 sec
-                        "small": 7 * 60}  # be small for 7 sec
-get_power_up_color = {"health": "#FF0213",
-                      "shield": "#5CE4FF",
-                      "fly": "#FFD4FF",
-                      "small": "#CCFFFF"}
-
-# Power up objects that spawn on the map
-Power_up = namedtuple("Power_up", ["rect", "type", "value"])
-
-# Power up that the player currently has
-Player_power_up = namedtuple("Player_power_up", ["type", "value"])
-no_power_up = Player_power_up("", 0)
-
-# default game state variables
-game_state = "main_menu"  # determines the current state of the game
-jump_start_speed = -17  # the speed at which the player jumps
-players_fall_speed = 0  # the current speed at which the player falls
-gravity = 1  # acceleration from gravity
-
-frame = 0  # used to keep track of score
-screen.fill("black")
-start_time = time.time()
-player_hp = 100
-player_shield = 25
-player_is_small = False
-eggs = []
-power_ups = []
-character = 1
-cur_power_up = no_power_up
-
-while running:
-    frame_events = pygame.event.get()
-    # check if user pressed X and want to exit game
-    for event in frame_events:
-        if event.type == pygame.QUIT:
-            running = False
-
-    if game_state == "playing":
-        screen.fill("purple")  # wipe the screen
-        # display the game's background
-        screen.blit(sky_surf, (0, 0))
-        screen.blit(ground_surf, (0, GROUND_Y))
-
-        # display health and shield bars
-        display_player_health(player_hp, player_shield)
-
-        # display score counter
-        cur_score = frame // 4
-        game_font = pygame.font.Font("font/Pixeltype.ttf", 50)
-        score_surf = game_font.render(f"SCORE: {cur_score}", False, "Black")
-        score_rect = score_surf.get_rect(center=(400, 43))
-        pygame.draw.rect(screen, "#c0e8ec", score_rect)
-        pygame.draw.rect(screen, "#c0e8ec", score_rect, 10)
-        screen.blit(score_surf, score_rect)
-
-        # handle player actions
-        keys = pygame.key.get_pressed()
-        # [space] or [up_arrow] to jump, you can hold down keys
-        if ((keys[pygame.K_SPACE] or keys[pygame.K_UP])
-                and player_rect.bottom >= GROUND_Y):
-            players_fall_speed = jump_start_speed
-        # [down_arrow] to drop down from a jump or flying
-        elif (any(event.type == pygame.KEYDOWN and event.key == pygame.K_DOWN
-                  for event in frame_events)
-              and player_rect.bottom < GROUND_Y):
-            players_fall_speed = max(players_fall_speed,
-                                     -jump_start_speed * 0.75)
-            if cur_power_up.type == "fly":  # stop flying
-                players_fall_speed = -jump_start_speed * 0.75
-                cur_power_up = no_power_up
-
-        # reset power up dependent variables
-        jump_start_speed = -17
-        player_is_small = False
-
-        # handle player's current power up and update if needed
-        display_player_power_up()
-        # heal over time
-        if cur_power_up.type == "health":
-            player_hp = min(100, player_hp + 0.2)
-        # gain shield over time
-        elif cur_power_up.type == "shield":
-            player_shield = min(25, player_shield + 0.2)
-        # start falling after finished flying
-        elif cur_power_up.type == "fly":
-            if cur_power_up.value == 1:
-                player_rect.y = 80
-                players_fall_speed = 0
-        # make player smaller (30px high) so you don't need to crawl
-        # also jump higher
-        elif cur_power_up.type == "small":
-            jump_start_speed = -20
-            player_is_small = True
-
-        # reduce time remaining for power up
-        if cur_power_up != no_power_up:
-            cur_power_up = Player_power_up(cur_power_up.type,
-                                           cur_power_up.value - 1)
-            if cur_power_up.value <= 0:
-                cur_power_up = no_power_up
-            # print(cur_power_up)
-
-        # adjust player's vertical location then blit it
-        players_fall_speed += gravity
-        player_rect.y += players_fall_speed
-        # don't go below ground
-        player_rect.bottom = min(GROUND_Y, player_rect.bottom)
-
-        # check for player actions like jumping
-        handle_player_state()
-
-        # update the states of egg objects and check for collision
-        handle_egg_objects()
-        # print(player_hp, player_shield)
-
-        # spawn power-ups around every 1000 frames
-        if randint(0, 1000) == 0:
-            power_ups.append(get_power_up())
-            # print("spawned power up")
-        handle_power_up_objects()
-
-        # lost game, show death message
-        # also make all eggs visible so player can see what killed them
-        if player_hp <= 0:
-            # make eggs visible
-            for egg in eggs:
-                egg_surf_temp = get_egg_surf[egg.type]
-                egg_surf_temp.set_alpha(255)
-                screen.blit(egg_surf_temp, egg.rect)
-            # death message
-            game_state = "dead"
-            death_font = pygame.font.Font("font/Pixeltype.ttf", 80)
-            death_message = death_font.render("You Died", True, "red")
-            message_rect = death_message.get_rect(center=(WIDTH / 2, 120))
-            screen.blit(death_message, message_rect)
-            death_font = pygame.font.Font("font/Pixeltype.ttf", 60)
-            death_message = death_font.render("Press [SPACE] to restart",
-                                              True, "red")
-            message_rect = death_message.get_rect(center=(WIDTH / 2, 200))
-            screen.blit(death_message, message_rect)
-            # print("You died!")
-
-        # update frame which is used to keep track of current score
-        frame += 1
-
-    # player just died and is in death screen, waiting to go to menu
-    elif game_state == "dead":
-        # player wants to enter main menu by pressing SPACE
+                inputs = get_inputs(keys, frame_events)
+            frame_events = []
+            if self.recorder is not None:
+                self.recorder.write(inputs)
+            self.positions = get_positions(world)
+            self.particles.update()
+            self.particles.emit_events(world.step(inputs))
+            if self.ghost_writer is not None:
+                self.ghost_writer.write(world)
+            if world.dead or (self.replay is not None and
+                              world.frame == self.replay.frames):
+                break
+
+    def run_frame(self, frame_events, keys, steps=1, alpha=1.0):
+        """handle one frame's events and held keys, run `steps` World
+        steps and draw the frame `alpha` of the way to the next step,
+        the caller puts it on screen with self.renderer.present()"""
+        world = self.world
+        renderer = self.renderer
+        if self.online is not None:  # answers from the server
+            self.online.poll()
+
+        # [F3] turns the profiler on/off, [F4] shows/hides its overlay
         for event in frame_events:
-            if event.type == pygame.KEYDOWN and event.key == pygame.K_SPACE:
-                game_state = "main_menu"
-                # print("entered main menu")
-
-    # player is in help menu
-    elif game_state == "help_menu":
-        screen.blit(help_menu_surf, (0, 0))  # display menu
-        # check if player wants to exit help menu
-        for event in frame_events:
-            if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
-                x, y = event.pos  # click position
-                if 711 <= x <= 759 and 28 <= y <= 67:
-                    game_state = "main_menu"
-
-    # player is in main menu, waiting to start a game
-    else:
-        add_score(scores, frame // 4)  # add current score
-
-        # reset game
-        screen.fill("black")
-        start_time = time.time()
-        frame = 0  # reset score counter
-        player_is_small = False
-        power_ups = []
-        cur_power_up = no_power_up
-        get_max_power_up_val = {"health": 100,  # heal 20 HP
-                                "shield": 75,  # gain 15 shield
-                                "fly": 7 * 60,  # fly for 7 sec
-                                "small": 7 * 60}  # be small for 7 sec
-
-        # spawn phase 1 eggs and space them out
-        eggs = [get_egg(800, frame)]
-        eggs.append(get_egg(eggs[-1].rect.right, frame))
-        eggs.append(get_egg(eggs[-1].rect.right, frame))
-        eggs.append(get_egg(eggs[-1].rect.right, frame))
-
-        # load main menu
-        display_main_menu()
-
-        # display help menu button
-        button_font = pygame.font.SysFont('Comic sans', 29)
-        text_surf2 = button_font.render("Help Menu", True, "black")
-        text_rect2 = text_surf2.get_rect(center=(368, 349))
-        pygame.draw.rect(screen, "#FFE5B0", text_rect2)
-        button = screen.blit(text_surf2, text_rect2)
-
-        # check for player clicks
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                profiler.toggle()
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F4:
+                profiler.show_overlay = not profiler.show_overlay
+
+        if self.game_state == "playing":
+            # handle player actions and advance the game
+            with profiler.zone("step"):
+                self.step_world(steps, frame_events, keys)
+            with profiler.zone("draw"):
+                if world.dead:  # show exactly what killed the player
+                    alpha = 1.0
+                with interpolated(world, self.positions, alpha):
+                    renderer.draw_playing(world, self.race,
+                                          self.particles)
+
+            # lost game, add the score once and show death message
+            if world.dead:
+                self.game_state = "dead"
+                if self.replay is None and self.autoplayer is None:
+                    self.add_score(world.score, world.character)
+                if self.recorder is not None:
+                    self.recorder.close(world)
+                    self.recorder = None
+                    self.ghost_writer.close()
+                    self.ghost_writer = None
+                renderer.draw_overlay(lambda queue:
+                                      submit_death_screen(queue, world))
+            # replay of a game that was quit before dying is over
+            elif (self.replay is not None and
+                  world.frame == self.replay.frames):
+                self.game_state = "main_menu"
+
+        # player just died and is in death screen, waiting to go to menu
+        elif self.game_state == "dead":
+            # player wants to enter main menu by pressing SPACE
+            for event in frame_events:
+                if (event.type == pygame.KEYDOWN and
+                        event.key == pygame.K_SPACE):
+                    self.game_state = "main_menu"
+
+        # player is in help menu
+        elif self.game_state == "help_menu":
+            # display menu, only drawn again if something else was shown
+            renderer.draw_static(("help_menu",), draw_help_menu)
+            # check if player wants to exit help menu
+            for event in frame_events:
+                if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+                    x, y = event.pos  # click position
+                    if 711 <= x <= 759 and 28 <= y <= 67:
+                        self.game_state = "main_menu"
+
+        # player is in main menu, waiting to start a game
+        else:
+            # load main menu, only drawn again when the scores change
+            title, scores = self.get_menu_scores()
+            renderer.draw_static(("main_menu", title, tuple(scores)),
+                                 lambda surf: draw_menu(surf, scores, title))
+
+            # check for player clicks
+            for event in frame_events:
+                if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+                    x, y = event.pos  # click position
+                    # check if player wants to enter help menu
+                    if self.button.collidepoint((x, y)):
+                        self.game_state = "help_menu"
+
+                    # check if player selected character to start game
+                    elif 152 <= x <= 290 and 170 <= y <= 317:
+                        self.start_game(1)
+                    elif 299 <= x <= 438 and 170 <= y <= 317:
+                        self.start_game(2)
+                    elif 446 <= x <= 585 and 170 <= y <= 317:
+                        self.start_game(3)
+
+        # frame time graph and slowest parts of the frame
+        if (profiler.enabled and profiler.show_overlay and
+                self.game_state != "dead"):
+            renderer.draw_overlay(lambda queue:
+                                  queue.add_draw(profiler.draw_overlay))
+
+    def quit(self):
+        """save score before exiting, a finished game already added it"""
+        if (self.game_state == "playing" and self.replay is None and
+                self.autoplayer is None):
+            self.add_score(self.world.score, self.world.character)
+        self.leaderboard.close()
+        if self.online is not None:  # try to send what is left
+            self.online.close()
+        if self.recorder is not None:
+            self.recorder.close(self.world)
+            self.ghost_writer.close()
+
+
+def create_window(vsync):
+    """open the game's window, with vsync if asked for and the
+    computer supports it"""
+    if vsync:
+        try:
+            return pygame.display.set_mode((WIDTH, HEIGHT), pygame.SCALED,
+                                           vsync=1)
+        except pygame.error:  # no vsync, use --fps instead
+            pass
+    return pygame.display.set_mode((WIDTH, HEIGHT))
+
+
+def main(renderer="full", record=None, replay=None, fps=60, vsync=False,
+         autoplay=False, capture=None, ghosts=None, online=None):
+    """`fps` limits how often the screen is drawn (0 for no limit),
+    the game itself always runs at 60 steps per second. Every frame
+    drawn is saved to a file in the `capture` folder if it is given.
+    Scores are sent to the leaderboard server at the `online` URL"""
+    # Initialize Pygame and create a window
+    pygame.init()
+    screen = create_window(vsync)
+    pygame.display.set_caption('Egg Jump')
+    clock = pygame.time.Clock()
+    running = True  # Pygame main loop, kills the pygame when False
+
+    build_atlas()  # load all images
+    screen.fill("black")
+    online_leaderboard = None
+    if online is not None:
+        online_leaderboard = OnlineLeaderboard(online)
+    game = Game(screen, renderer, record, replay, Leaderboard.open(),
+                autoplay, ghosts, online_leaderboard)
+    if os.environ.get("EGG_JUMP_PROFILE") == "1":
+        profiler.enable()
+    timestep = FixedTimestep()
+    last_time = time.perf_counter()
+    capture_writer = None
+    if capture is not None:
+        capture_path = os.path.join(capture,
+                                    time.strftime("%Y%m%d-%H%M%S.eggc"))
+        capture_writer = CaptureWriter(capture_path, screen)
+
+    while running:
+        profiler.begin_frame()
+        with profiler.zone("events"):
+            frame_events = pygame.event.get()
+        # check if user pressed X and want to exit game
         for event in frame_events:
-            if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
-                x, y = pygame.mouse.get_pos()
-                # check if player wants to enter help menu
-                if button.collidepoint((x, y)):
-                    game_state = "help_menu"
-                    # print("entered help menu")
-
-                # check if player selected character to start game
-                elif 152 <= x <= 290 and 170 <= y <= 317:
-                    character = 1
-                    game_state = "playing"
-                    player_hp = 100
-                    player_shield = 5
-                    get_max_power_up_val["health"] *= 3
-                elif 299 <= x <= 438 and 170 <= y <= 317:
-                    character = 2
-                    game_state = "playing"
-                    player_hp = 30
-                    player_shield = 25
-                    get_max_power_up_val["shield"] *= 2
-                elif 446 <= x <= 585 and 170 <= y <= 317:
-                    character = 3
-                    game_state = "playing"
-                    player_hp = 50
-                    player_shield = 0
-                    get_max_power_up_val["fly"] *= 2
-                    get_max_power_up_val["small"] *= 2
-
-    # if DEVELOPER_MODE:  # DEBUG FEATURES
-    #     run_debug()
-
-    # flip() the display to put your work on screen
-    pygame.display.flip()
-    clock.tick(60)  # limits FPS to 60
-
-# save score as strings on each line before exiting code
-with open("leaderboard.txt", "w") as leaderboard:
-    add_score(scores, frame // 4)
-    leaderboard.write("\n".join(map(str, scores)))
-
-pygame.quit()
+            if event.type == pygame.QUIT:
+                running = False
+
+        # how many game steps to run for the time that passed
+        now = time.perf_counter()
+        steps, alpha = game.get_steps_and_alpha(timestep, now - last_time)
+        last_time = now
+        game.run_frame(frame_events, pygame.key.get_pressed(), steps, alpha)
+
+        # put your work on screen
+        with profiler.zone("present"):
+            game.renderer.present()
+        if capture_writer is not None:  # save the finished frame
+            with profiler.zone("capture"):
+                capture_writer.grab(screen)
+        profiler.end_frame()
+        clock.tick(fps)  # limits FPS
+
+    game.quit()
+    if capture_writer is not None:
+        capture_writer.close()
+        print(f"saved {capture_writer.written} frames to {capture_path}, "
+              f"dropped {capture_writer.dropped}")
+    if profiler.count:  # save the profiler's timings
+        profiler.save_csv("profile.csv")
+        profiler.save_chrome_trace("profile.json")
+        print("saved profiler timings to profile.csv and profile.json")
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Egg Jump")
+    parser.add_argument("--renderer", choices=sorted(get_renderer),
+                        default="full",
+                        help="full: redraw and flip the whole screen every "
+                             "frame, dirty: only redraw and update the "
+                             "areas that changed, headless: draw "
+                             "nothing (with SDL_VIDEODRIVER=dummy)")
+    parser.add_argument("--record", metavar="FOLDER",
+                        help="save a replay of every game in FOLDER")
+    parser.add_argument("--replay", metavar="FILE",
+                        help="watch a replay saved with --record")
+    parser.add_argument("--fps", type=int, default=60,
+                        help="most frames drawn per second, 0 for no "
+                             "limit (the game speed doesn't change)")
+    parser.add_argument("--vsync", action="store_true",
+                        help="draw frames in sync with the display's "
+                             "refresh rate")
+    parser.add_argument("--autoplay", action="store_true",
+                        help="let the autoplayer play (pick a character "
+                             "on the menu), its scores aren't saved")
+    parser.add_argument("--capture", metavar="FOLDER",
+                        help="save every frame drawn to a capture file in "
+                             "FOLDER (python capture.py turns it into PNGs)")
+    parser.add_argument("--ghosts", metavar="FOLDER",
+                        help="race the ghosts of the games in FOLDER "
+                             "(saved by --record)")
+    parser.add_argument("--online", metavar="URL",
+                        help="send scores to the leaderboard server at URL "
+                             "and show its top 10 (python "
+                             "leaderboard_server.py runs one)")
+    args = parser.parse_args()
+    if args.online is not None:
+        try:
+            parse_url(args.online)
+        except ValueError as error:
+            parser.error(str(error))
+    for folder in (args.record, args.capture):
+        if folder is not None:
+            os.makedirs(folder, exist_ok=True)
+    main(args.renderer, args.record, args.replay, args.fps, args.vsync,
+         args.autoplay, args.capture, args.ghosts, args.online)
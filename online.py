@@ -0,0 +1,223 @@
+"""Online leaderboard client that never makes the game wait
+
+OnlineLeaderboard runs an asyncio event loop on a background thread
+that talks HTTP to the leaderboard server (see leaderboard_server.py).
+The game loop and the client thread only talk through two
+collections.deque: appending and popping are atomic in CPython, so
+neither side takes a lock or waits for the other.
+
+    outbox   game -> client: runs to submit, requests for the top 10
+    inbox    client -> game: the top 10, how many runs were sent,
+             errors
+
+Runs are sent in batches: the client waits BATCH_DELAY seconds after a
+run comes in for more, then sends up to MAX_BATCH in one request. A
+request that fails (server down, too slow, bad answer) is tried again
+after RETRY_MIN seconds, doubling up to RETRY_MAX, so nothing is lost
+while the server is away. Every run has an id, so the server doesn't
+count a batch twice if the answer to it was lost.
+
+The last top 10 fetched is kept for TTL seconds, get_scores() asks for
+a new one once it is older.
+
+Play against a local server with:
+    python leaderboard_server.py --port 8765
+    python main.py --online http://localhost:8765
+"""
+
+import json
+import time
+import uuid
+import asyncio
+import threading
+from collections import deque
+from urllib.parse import urlsplit
+
+SIZE = 10  # scores on the board
+TTL = 30.0  # seconds a fetched board is used before fetching it again
+BATCH_DELAY = 0.5  # seconds to wait for more runs before sending
+MAX_BATCH = 50  # most runs sent in one request
+TIMEOUT = 5.0  # seconds a request can take
+RETRY_MIN = 0.5  # seconds before trying a failed request again
+RETRY_MAX = 8.0  # longest wait between tries
+POLL_INTERVAL = 0.05  # seconds between checks of the outbox
+CLOSE_TIMEOUT = 2.0  # seconds close() waits for unsent runs
+
+
+class ServerError(Exception):
+    """the server answered, but not with what was asked for"""
+
+
+def parse_url(url):
+    """(host, port, path) of a leaderboard URL, raises ValueError if
+    it isn't http://HOST[:PORT][/PATH]"""
+    try:
+        parts = urlsplit(url)
+        port = parts.port or 80  # a port that isn't a number raises
+    except ValueError:
+        parts = None
+    if parts is None or parts.scheme != "http" or not parts.hostname:
+        raise ValueError(f"leaderboard URL must be http://HOST[:PORT]"
+                         f"[/PATH], not {url!r}")
+    return parts.hostname, port, parts.path.rstrip("/")
+
+
+class OnlineLeaderboard:
+    """Submits runs and fetches the global top 10 from the server at
+    `url` on a background thread. submit(), poll() and get_scores()
+    are called from the game loop, they never wait. Only http:// URLs
+    work, a path in the URL goes before /top and /scores"""
+
+    def __init__(self, url, ttl=TTL, batch_delay=BATCH_DELAY,
+                 timeout=TIMEOUT):
+        # prefix is the path the server is under, if any
+        self.host, self.port, self.prefix = parse_url(url)
+        self.ttl = ttl
+        self.batch_delay = batch_delay
+        self.timeout = timeout
+        self.outbox = deque()  # ("submit", run), ("fetch",) or ("close",)
+        self.inbox = deque()  # ("board", scores), ("sent", n), ("error", e)
+        # game loop side
+        self.board = None  # last top 10 fetched
+        self.board_time = 0.0  # time.monotonic() it was fetched
+        self.fetching = False  # a new board was asked for
+        self.sent = 0  # runs the server has
+        self.errors = 0  # requests that failed
+        self.last_error = None
+        # written by the client thread
+        self.waiting = 0  # runs not sent yet
+        self.close_timeout = CLOSE_TIMEOUT
+        self.thread = threading.Thread(target=asyncio.run,
+                                       args=(self.run(),), daemon=True)
+        self.thread.start()
+
+    # game loop side
+
+    def submit(self, score, character):
+        """send the score of a finished game"""
+        self.outbox.append(("submit", {"id": uuid.uuid4().hex,
+                                       "score": score,
+                                       "character": character}))
+
+    def poll(self):
+        """take in what the client thread sent, once per frame"""
+        inbox = self.inbox
+        while inbox:
+            kind, value = inbox.popleft()
+            if kind == "board":
+                self.board = value
+                self.board_time = time.monotonic()
+                self.fetching = False
+            elif kind == "sent":
+                self.sent += value
+            else:
+                self.errors += 1
+                self.last_error = value
+
+    def get_scores(self):
+        """The global top 10 padded with 0 like Leaderboard.get_scores(),
+        or None if it wasn't fetched yet. Asks for a new one if it is
+        older than the TTL"""
+        if not self.fetching and (self.board is None or
+                                  time.monotonic() - self.board_time >
+                                  self.ttl):
+            self.fetching = True
+            self.outbox.append(("fetch",))
+        if self.board is None:
+            return None
+        return self.board + [0] * (SIZE - len(self.board))
+
+    def close(self, timeout=CLOSE_TIMEOUT):
+        """try to send the runs that are left for up to `timeout`
+        seconds, then stop the client thread"""
+        self.close_timeout = timeout
+        self.outbox.append(("close",))
+        self.thread.join(timeout + self.timeout)
+
+    # client thread side
+
+    async def request(self, method, path, data=None):
+        """send an HTTP request, returns the JSON answer"""
+        path = self.prefix + path
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            body = b"" if data is None else json.dumps(data).encode()
+            writer.write(f"{method} {path} HTTP/1.1\r\n"
+                         f"Host: {self.host}:{self.port}\r\n"
+                         f"Content-Type: application/json\r\n"
+                         f"Content-Length: {len(body)}\r\n"
+                         f"Connection: close\r\n\r\n".encode() + body)
+            await writer.drain()
+            response = await reader.read()  # until the server closes
+        finally:
+            writer.close()
+        head, _, body = response.partition(b"\r\n\r\n")
+        status = head.split(b" ", 2)[1:2]
+        if status != [b"200"]:
+            raise ServerError(f"{method} {path}: {head[:40]!r}")
+        return json.loads(body)
+
+    async def try_request(self, method, path, data, key):
+        """the answer's `key`, or None if the request failed"""
+        try:
+            answer = await asyncio.wait_for(
+                self.request(method, path, data), self.timeout)
+            return answer[key]
+        except (OSError, asyncio.TimeoutError, ServerError, ValueError,
+                KeyError, TypeError) as error:
+            self.inbox.append(("error", f"{type(error).__name__}: {error}"))
+            return None
+
+    async def run(self):
+        """the client thread: batch, send and fetch until close()"""
+        loop = asyncio.get_running_loop()
+        pending = []  # runs to send
+        first_time = 0.0  # when the oldest pending run came in
+        fetch = False  # the game asked for the board
+        retry_time = 0.0  # no requests before this after a failure
+        retry_wait = RETRY_MIN
+        close_time = None
+        while True:
+            while self.outbox:
+                item = self.outbox.popleft()
+                if item[0] == "submit":
+                    if not pending:
+                        first_time = loop.time()
+                    pending.append(item[1])
+                elif item[0] == "fetch":
+                    fetch = True
+                else:
+                    close_time = loop.time() + self.close_timeout
+            self.waiting = len(pending)
+            now = loop.time()
+            if close_time is not None and (not pending or now > close_time):
+                break
+
+            if now >= retry_time:
+                ok = True
+                # send a batch once it had time to fill up
+                if pending and (close_time is not None or
+                                len(pending) >= MAX_BATCH or
+                                now - first_time >= self.batch_delay):
+                    batch = pending[:MAX_BATCH]
+                    ok = await self.try_request("POST", "/scores",
+                                                {"runs": batch},
+                                                "added") is not None
+                    if ok:
+                        del pending[:len(batch)]
+                        first_time = now
+                        self.inbox.append(("sent", len(batch)))
+                        fetch = True  # the board may have changed
+                if ok and fetch and close_time is None:
+                    scores = await self.try_request("GET", "/top", None,
+                                                    "scores")
+                    ok = scores is not None
+                    if ok:
+                        fetch = False
+                        self.inbox.append(("board", scores))
+                if ok:
+                    retry_wait = RETRY_MIN
+                else:
+                    retry_time = loop.time() + retry_wait
+                    retry_wait = min(retry_wait * 2, RETRY_MAX)
+            await asyncio.sleep(POLL_INTERVAL)
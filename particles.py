@@ -0,0 +1,154 @@
+"""Particle effects for egg hits and power up pickups
+
+Every particle lives in a slot of a few NumPy arrays made once: x, y,
+velocity, steps of life left and color. update() moves all of them at
+once with array math, emitting writes new particles into the slots of
+dead ones, and when every slot is in use the particles closest to dying
+are replaced, so there are never more than MAX_PARTICLES and no Python
+object is made per particle.
+
+They are drawn in one pass after the render queue's blits: the screen's
+pixels are written through pygame.surfarray with one fancy index for
+all the particles, each one is a SIZE x SIZE square.
+
+Particles are only for show, they use their own random numbers so the
+World (and replays) play out the same with or without them.
+"""
+
+from collections import namedtuple
+from math import pi
+
+import numpy as np
+import pygame
+
+from render import get_power_up_color
+
+MAX_PARTICLES = 8192  # most particles alive at once
+SIZE = 2  # width and height of a particle in pixels
+GRAVITY = 0.2  # added to the y speed every step
+DRAG = 0.98  # speed kept every step
+RISE = 1.5  # upwards speed added when emitted so bursts go up
+
+# what each World event looks like: how many particles, their colors,
+# how fast they fly out (pixels per step) and how many steps they last
+Effect = namedtuple("Effect", ["count", "colors", "speed", "life"])
+get_effect = {
+    # shield shards
+    "shield_break": Effect(60, ["#8FFFF2", "#5CE4FF", "white"], 4.0, 40),
+    # egg shell and yolk
+    "damage": Effect(80, ["#FFF6E0", "#FFD23F", "#FF8C1A"], 3.5, 45),
+    # sparkles in the power up's color
+    "pick_up": Effect(50, ["white"], 3.0, 35),
+}
+
+
+def get_palette(colors):
+    """(n, 3) array of RGB colors"""
+    return np.array([tuple(pygame.Color(color))[:3] for color in colors],
+                    dtype=np.uint8)
+
+
+class ParticleSystem:
+    """All the particles on screen, update() once per World step"""
+
+    def __init__(self, seed=None):
+        self.rng = np.random.default_rng(seed)
+        self.x = np.zeros(MAX_PARTICLES, dtype=np.float32)
+        self.y = np.zeros(MAX_PARTICLES, dtype=np.float32)
+        self.vx = np.zeros(MAX_PARTICLES, dtype=np.float32)
+        self.vy = np.zeros(MAX_PARTICLES, dtype=np.float32)
+        self.life = np.zeros(MAX_PARTICLES, dtype=np.float32)  # 0 is dead
+        self.colors = np.zeros((MAX_PARTICLES, 3), dtype=np.uint8)
+        self.emitted = 0  # particles emitted so far
+        self.recycled = 0  # particles replaced before they died
+        # palette of each effect, power ups get their own color
+        self.palettes = {kind: get_palette(effect.colors)
+                         for kind, effect in get_effect.items()}
+        for power_up, color in get_power_up_color.items():
+            self.palettes[("pick_up", power_up)] = get_palette(
+                [color] + get_effect["pick_up"].colors)
+
+    def __len__(self):
+        """particles alive"""
+        return int(np.count_nonzero(self.life > 0))
+
+    def clear(self):
+        self.life[:] = 0
+
+    def emit(self, x, y, count, palette, speed, life):
+        """Burst `count` particles out of (x, y) in random directions,
+        with colors picked from `palette`"""
+        count = min(count, MAX_PARTICLES)
+        # the dead slots first (life <= 0), then the closest to dying
+        slots = np.argpartition(self.life, count - 1)[:count]
+        self.recycled += int(np.count_nonzero(self.life[slots] > 0))
+        self.emitted += count
+        rng = self.rng
+        angle = rng.uniform(0, 2 * pi, count)
+        particle_speed = rng.uniform(0.3, 1, count) * speed
+        self.x[slots] = x
+        self.y[slots] = y
+        self.vx[slots] = np.cos(angle) * particle_speed
+        self.vy[slots] = np.sin(angle) * particle_speed - RISE
+        self.life[slots] = rng.uniform(0.5, 1, count) * life
+        self.colors[slots] = palette[rng.integers(len(palette), size=count)]
+
+    def emit_events(self, events):
+        """start the effect of each World.step() event that has one"""
+        for event in events:
+            effect = get_effect.get(event.kind)
+            if effect is None:
+                continue
+            palette = self.palettes.get((event.kind, event.type),
+                                        self.palettes[event.kind])
+            x, y = event.rect.center
+            self.emit(x, y, effect.count, palette, effect.speed, effect.life)
+
+    def update(self):
+        """move every particle one step, dead ones too, it is cheaper
+        than picking out the live ones"""
+        self.x += self.vx
+        self.y += self.vy
+        self.vy += GRAVITY
+        self.vx *= DRAG
+        self.vy *= DRAG
+        self.life -= 1
+
+    def get_rect(self):
+        """area the live particles cover, None if there are none"""
+        alive = self.life > 0
+        if not alive.any():
+            return None
+        xs, ys = self.x[alive], self.y[alive]
+        left, top = int(xs.min()), int(ys.min())
+        return pygame.Rect(left, top, int(xs.max()) - left + SIZE,
+                           int(ys.max()) - top + SIZE)
+
+    def draw(self, screen):
+        """write every live particle into the screen's pixels"""
+        alive = np.flatnonzero(self.life > 0)
+        if not len(alive):
+            return
+        xs = self.x[alive].astype(np.intp)
+        ys = self.y[alive].astype(np.intp)
+        # colors in the screen's pixel format
+        red, green, blue, _ = screen.get_shifts()
+        rgb = self.colors[alive].astype(np.uint32)
+        colors = rgb[:, 0] << red | rgb[:, 1] << green | rgb[:, 2] << blue
+        pixels = pygame.surfarray.pixels2d(screen)  # locks the screen
+        width, height = pixels.shape
+        for dx in range(SIZE):
+            for dy in range(SIZE):
+                px, py = xs + dx, ys + dy
+                # particles that left the screen aren't drawn
+                inside = (px >= 0) & (px < width) & (py >= 0) & (py < height)
+                pixels[px[inside], py[inside]] = colors[inside]
+        del pixels
+
+    def submit(self, queue):
+        """draw the particles after a render.RenderQueue's blits,
+        returns the area they cover or None"""
+        rect = self.get_rect()
+        if rect is not None:
+            queue.add_draw(self.draw)
+        return rect
@@ -0,0 +1,237 @@
+"""Frame profiler for finding slow frames
+
+Times named zones of every frame (event polling, the World's step and
+the parts of it, drawing the HUD and sprites, putting the frame on
+screen) into a fixed size ring buffer, so it can stay on for a whole
+game without using more memory.
+
+Turn it on with the environment variable EGG_JUMP_PROFILE=1 or by
+pressing F3 while playing, F4 shows/hides the overlay with a frame time
+graph and the slowest zones. When the game exits the timings are saved
+as profile.csv and profile.json, open the .json in chrome://tracing or
+https://ui.perfetto.dev to see every frame on a timeline.
+
+While the profiler is off, `with profiler.zone(name):` only costs a
+function call and the World's methods aren't wrapped at all.
+"""
+
+import csv
+import json
+from array import array
+from collections import deque
+from time import perf_counter
+
+import pygame
+
+from fonts import render_text
+
+CAPACITY = 1 << 16  # zone timings kept, the oldest are overwritten
+GRAPH_FRAMES = 120  # frames shown in the overlay's graph
+TEXT_FRAMES = 15  # the overlay's text is updated every 15 frames
+FRAME_BUDGET = 1000 / 60  # milliseconds per frame at 60 FPS
+
+
+class NoZone:
+    """what zone() returns while the profiler is off"""
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+NO_ZONE = NoZone()
+
+
+class Zone:
+    """times the code inside `with profiler.zone(name):`"""
+
+    def __init__(self, profiler, zone_id):
+        self.profiler = profiler
+        self.zone_id = zone_id
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = perf_counter()
+
+    def __exit__(self, *exc_info):
+        self.profiler.add(self.zone_id, self.start, perf_counter())
+
+
+class Profiler:
+    def __init__(self, capacity=CAPACITY):
+        self.enabled = False
+        self.show_overlay = True
+        self.capacity = capacity
+        self.names = []  # zone id -> name
+        self.zones = {}  # name -> Zone
+        self.watched = []  # (object, method name, zone name) to wrap
+        # ring buffer, timing i is stored at index i % capacity
+        self.zone_ids = array("H", [0]) * capacity
+        self.starts = array("d", [0]) * capacity
+        self.ends = array("d", [0]) * capacity
+        self.frames = array("l", [0]) * capacity
+        self.count = 0  # timings recorded so far
+        self.frame = 0  # frames profiled so far
+        self.frame_start = 0.0
+        self.frame_times = deque(maxlen=GRAPH_FRAMES)  # milliseconds
+        self.overlay_box = None  # see-through background of the overlay
+        self.overlay_lines = []  # text shown in the overlay
+        self.overlay_frame = -TEXT_FRAMES  # when the text was updated
+        self.epoch = perf_counter()  # time 0 in the exported files
+
+    def get_zone(self, name):
+        zone = self.zones.get(name)
+        if zone is None:
+            zone = self.zones[name] = Zone(self, len(self.names))
+            self.names.append(name)
+        return zone
+
+    def zone(self, name):
+        """use as `with profiler.zone(name):` around code to time"""
+        if not self.enabled:
+            return NO_ZONE
+        return self.get_zone(name)
+
+    def add(self, zone_id, start, end):
+        """record one timing in the ring buffer"""
+        i = self.count % self.capacity
+        self.zone_ids[i] = zone_id
+        self.starts[i] = start
+        self.ends[i] = end
+        self.frames[i] = self.frame
+        self.count += 1
+
+    def begin_frame(self):
+        if self.enabled:
+            self.frame_start = perf_counter()
+
+    def end_frame(self):
+        if self.enabled:
+            end = perf_counter()
+            self.add(self.get_zone("frame").zone_id, self.frame_start, end)
+            self.frame_times.append((end - self.frame_start) * 1000)
+            self.frame += 1
+
+    def watch(self, obj, method, name):
+        """time every call of obj.method as zone `name` while the
+        profiler is on, the method is left alone while it is off"""
+        self.watched.append((obj, method, name))
+        if self.enabled:
+            self.wrap(obj, method, name)
+
+    def wrap(self, obj, method, name):
+        function = getattr(obj, method)
+        zone = self.get_zone(name)
+
+        def timed(*args, **kwargs):
+            with zone:
+                return function(*args, **kwargs)
+        setattr(obj, method, timed)
+
+    def enable(self):
+        if not self.enabled:
+            self.enabled = True
+            self.frame_start = perf_counter()
+            for obj, method, name in self.watched:
+                self.wrap(obj, method, name)
+
+    def disable(self):
+        if self.enabled:
+            self.enabled = False
+            for obj, method, name in self.watched:
+                delattr(obj, method)  # back to the class's method
+
+    def toggle(self):
+        if self.enabled:
+            self.disable()
+        else:
+            self.enable()
+
+    def get_timings(self):
+        """(zone name, frame, start, end) of every timing still in the
+        ring buffer, oldest first, times are seconds since the epoch"""
+        first = max(0, self.count - self.capacity)
+        for n in range(first, self.count):
+            i = n % self.capacity
+            yield (self.names[self.zone_ids[i]], self.frames[i],
+                   self.starts[i] - self.epoch, self.ends[i] - self.epoch)
+
+    def get_worst_zones(self, frames=GRAPH_FRAMES, count=3):
+        """[(milliseconds, zone name)] of the slowest zones in the last
+        `frames` frames, slowest first"""
+        worst = {}
+        first = max(0, self.count - self.capacity)
+        for n in range(self.count - 1, first - 1, -1):
+            i = n % self.capacity
+            if self.frames[i] < self.frame - frames:
+                break
+            name = self.names[self.zone_ids[i]]
+            if name == "frame":
+                continue
+            duration = (self.ends[i] - self.starts[i]) * 1000
+            worst[name] = max(worst.get(name, 0), duration)
+        return sorted(((ms, name) for name, ms in worst.items()),
+                      reverse=True)[:count]
+
+    def draw_overlay(self, screen):
+        """frame time graph and the slowest zones in the bottom right
+        corner, the red line is the 60 FPS budget"""
+        width, height = 2 * GRAPH_FRAMES + 10, 120
+        x = screen.get_width() - width - 5
+        y = screen.get_height() - height - 5
+        if self.overlay_box is None:
+            self.overlay_box = pygame.Surface((width, height),
+                                              pygame.SRCALPHA)
+            self.overlay_box.fill((0, 0, 0, 170))
+        screen.blit(self.overlay_box, (x, y))
+
+        # graph, 60 pixels is 2 frame budgets
+        graph_bottom = y + height - 5
+        scale = 30 / FRAME_BUDGET
+        for i, ms in enumerate(self.frame_times):
+            bar = min(60, round(ms * scale))
+            color = "green" if ms <= FRAME_BUDGET else "red"
+            pygame.draw.rect(screen, color,
+                             (x + 5 + 2 * i, graph_bottom - bar, 2, bar))
+        pygame.draw.line(screen, "red", (x + 5, graph_bottom - 30),
+                         (x + width - 5, graph_bottom - 30))
+
+        # text, last frame and slowest zones, not updated every frame
+        # so it can be read (and isn't rendered every frame)
+        if self.frame - self.overlay_frame >= TEXT_FRAMES:
+            self.overlay_frame = self.frame
+            lines = []
+            if self.frame_times:
+                lines.append(f"frame {self.frame_times[-1]:.2f} ms  "
+                             f"max {max(self.frame_times):.2f} ms")
+            for ms, name in self.get_worst_zones():
+                lines.append(f"{name}: {ms:.2f} ms")
+            self.overlay_lines = lines
+        for i, line in enumerate(self.overlay_lines):
+            text = render_text('Comic sans', 14, line, True, "white")
+            screen.blit(text, (x + 5, y + 3 + 13 * i))
+
+    def save_csv(self, path):
+        """one row per timing, in milliseconds"""
+        with open(path, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(["zone", "frame", "start_ms", "duration_ms"])
+            for name, frame, start, end in self.get_timings():
+                writer.writerow([name, frame, f"{start * 1000:.4f}",
+                                 f"{(end - start) * 1000:.4f}"])
+
+    def save_chrome_trace(self, path):
+        """Chrome trace-event JSON, times are microseconds"""
+        events = [{"name": name, "ph": "X", "pid": 1, "tid": 1,
+                   "ts": round(start * 1e6, 3),
+                   "dur": round((end - start) * 1e6, 3),
+                   "args": {"frame": frame}}
+                  for name, frame, start, end in self.get_timings()]
+        with open(path, "w") as file:
+            json.dump({"traceEvents": events,
+                       "displayTimeUnit": "ms"}, file)
+
+
+profiler = Profiler()  # the game's profiler
@@ -0,0 +1,539 @@
+"""Drawing code for Egg Jump
+
+Everything that puts pixels on the screen: the HUD, the World's
+player, eggs and power ups, the menus and the death screen.
+
+Playing frames aren't drawn as they are worked out: draw commands
+(layer, surface, position) are submitted to a RenderQueue, and its
+flush() draws each layer with one Surface.blits() call, from the
+background up. HUD elements are drawn over a copy of the background
+once each time what they show changes (get_hud()), so they are blits
+too.
+
+Three renderers decide how each frame reaches the display:
+FullRenderer redraws the whole screen and flips it every frame,
+DirtyRectRenderer keeps a pre-composed background, only redraws the
+areas that changed and sends just those to the display, and
+HeadlessRenderer throws the draw commands away.
+"""
+
+import pygame
+
+from math import ceil
+from functools import lru_cache
+
+from fonts import render_text
+from profiler import profiler
+from sprites import (MENU_CHARACTER_SIZE, POWER_UP_ICON_SIZE, FADE_LEVELS,
+                     get_sprite, get_fade_frame)
+from world import WIDTH, HEIGHT, GROUND_Y, SMALL_SCALE
+
+get_power_up_color = {"health": "#FF0213",
+                      "shield": "#5CE4FF",
+                      "fly": "#FFD4FF",
+                      "small": "#CCFFFF"}
+
+
+def display_scores(screen, scores, title="Top 10 Scores"):
+    """Displays the top 10 scores on the game menu"""
+    x_pos = 620  # top-left corner of scores display
+    y_pos = 20
+    spacing = 32
+
+    # display leaderboard title
+    title_text = render_text('Comic sans', 24, title, True, "white",
+                             bold=True)
+    screen.blit(title_text, (x_pos, y_pos))
+
+    # display top 10 scores
+    for index, score in enumerate(scores):
+        y_pos += spacing  # space out scores evenly
+        score_text = render_text('Comic sans', 24, f"{index + 1}. {score}",
+                                 True, "white")
+        screen.blit(score_text, (x_pos, y_pos))
+
+
+def display_main_menu(screen, scores, title="Top 10 Scores"):
+    """Display the main menu with game title, leaderboard,
+    and character selection"""
+
+    # display character selection options
+    screen.blit(get_sprite("level", "main_menu"), (0, 0))
+
+    # display leaderboard with top 10 scores
+    display_scores(screen, scores, title)
+
+    # write the game's title on the screen
+    game_name = 'EGG JUMP'
+    text_surf = render_text("font/MainluxLight-DOAJx.otf", 110, game_name,
+                            True, "#FFF6F6")
+    text_rect = text_surf.get_rect(center=(307, 80))
+    screen.blit(text_surf, text_rect)
+
+    # display jumping character, with color inverted
+    inv = get_sprite("player_inverted", "jump", MENU_CHARACTER_SIZE)
+    inv_rect = inv.get_rect(topleft=(40, 140))
+    screen.blit(inv, inv_rect)
+
+
+def display_help_button(screen):
+    """display help menu button and return its rect for clicks"""
+    text_surf2 = render_text('Comic sans', 29, "Help Menu", True, "black")
+    text_rect2 = text_surf2.get_rect(center=(368, 349))
+    pygame.draw.rect(screen, "#FFE5B0", text_rect2)
+    return screen.blit(text_surf2, text_rect2)
+
+
+@lru_cache(maxsize=1)
+def get_main_menu(scores, title="Top 10 Scores"):
+    """The whole main menu with the help button, composed once and
+    remembered until `scores` (a tuple) or the leaderboard's title
+    changes, don't draw on the returned surface"""
+    menu_surf = pygame.Surface((WIDTH, HEIGHT)).convert()
+    menu_surf.fill("black")
+    display_main_menu(menu_surf, scores, title)
+    display_help_button(menu_surf)
+    return menu_surf
+
+
+def display_player_health(screen, hp, shield):
+    """display the current player HP and shield, returns the area that
+    was drawn on"""
+    hp = ceil(hp)
+    shield = ceil(shield)
+    x, y = 20, 20
+    scaling = 2.1
+    width, height = 100, 40
+    border_width = 2
+
+    width *= scaling
+
+    # draw hp bar and create black border
+    bar_width = hp * scaling
+    pygame.draw.rect(screen, "green", (x, y, bar_width, height))
+    drawn = pygame.draw.rect(screen, "black", (x, y, width, height),
+                             border_width)
+
+    # write hp as text
+    hp_text = render_text('Comic sans', 19, f"{hp}/100", True, "black",
+                          bold=True)
+    text_rect = hp_text.get_rect(center=(x + width // 2, y + height // 2))
+    screen.blit(hp_text, text_rect)
+
+    if shield > 0:  # draw shield bar to the left of HP bar
+        x += width
+        width, height = 25, 40
+
+        width -= border_width  # adjust borders
+        width *= scaling
+
+        # draw shield bar and create black border
+        bar_width = width - (25 - shield) * scaling
+        pygame.draw.rect(screen, "#8FFFF2", (x, y, bar_width, height))
+        drawn.union_ip(pygame.draw.rect(screen, "black",
+                                        (x, y, width, height), border_width))
+
+        # write shield as text
+        hp_text = render_text('Comic sans', 19, f"{shield}", True, "black",
+                              bold=True)
+        text_rect = hp_text.get_rect(center=(x + width / 2, y + height / 2))
+        screen.blit(hp_text, text_rect)
+    return drawn
+
+
+def display_player_power_up(screen, world):
+    """Displays the player's current power up and how much time
+    there is remaining if you currently have one active, returns the
+    area that was drawn on (None if there is no power up)"""
+    cur_power_up = world.cur_power_up
+    if not cur_power_up.type:
+        return None
+    x, y = 560, 20
+    width, height = 140, 40
+    border_width = 2
+
+    # draw the power up icon, scaled down to fit in the bar
+    icon_surf = get_sprite("power_up", cur_power_up.type,
+                           POWER_UP_ICON_SIZE)
+    icon_rect = icon_surf.get_rect(topleft=(x - height, y))
+    screen.blit(icon_surf, icon_rect)
+
+    # fill in the bar to represent how much time the power up has left
+    max_val = world.get_max_power_up_val[cur_power_up.type]
+    power_up_color = get_power_up_color[cur_power_up.type]
+    bar_width = width * (cur_power_up.value / max_val)
+    pygame.draw.rect(screen, power_up_color, (x, y, bar_width, height))
+
+    # draw borders
+    border = pygame.draw.rect(screen, "black", (x, y, width, height),
+                              border_width)
+    return border.union(icon_rect)
+
+
+def display_score(screen, score):
+    """display score counter at the top of the screen, returns the area
+    that was drawn on"""
+    score_surf = render_text("font/Pixeltype.ttf", 50, f"SCORE: {score}",
+                             False, "Black")
+    score_rect = score_surf.get_rect(center=(400, 43))
+    pygame.draw.rect(screen, "#c0e8ec", score_rect)
+    pygame.draw.rect(screen, "#c0e8ec", score_rect, 10)
+    screen.blit(score_surf, score_rect)
+    return score_rect
+
+
+def get_fade_level(x):
+    """how visible a fading egg is at x, it is fully gone at x=300"""
+    level = round((x - 300) * (FADE_LEVELS - 1) / WIDTH)
+    return min(max(level, 0), FADE_LEVELS - 1)
+
+
+# draw layers, from the bottom up
+LAYER_BACKGROUND = 0
+LAYER_HUD = 1
+LAYER_GHOSTS = 2
+LAYER_PLAYER = 3
+LAYER_EGGS = 4
+LAYER_POWER_UPS = 5
+LAYER_OVERLAY = 6
+LAYERS = 7
+SPRITE_LAYERS = (LAYER_PLAYER, LAYER_EGGS, LAYER_POWER_UPS)
+
+HUD_AREA = pygame.Rect(0, 0, WIDTH, 80)  # every HUD element is in here
+hud_cache = {}  # HUD name -> (what it shows, surface, rect)
+
+
+class RenderQueue:
+    """Draw commands for a frame, drawn by flush(). Commands are
+    Surface.blits() items: (surface, position) or (surface, position,
+    area). Each layer is its own list, so flush() draws them in order
+    without sorting, with one Surface.blits() call per layer.
+    A headless queue throws the commands away instead of drawing them"""
+
+    def __init__(self, headless=False):
+        self.headless = headless
+        self.layers = [[] for _ in range(LAYERS)]
+        self.draws = []  # draw(screen) functions called after the blits
+        self.calls = 0  # Surface.blits() calls made so far
+        self.commands = 0  # blits drawn so far
+
+    def add(self, layer, surface, position, area=None):
+        """draw `surface` at `position` (or its `area` part)"""
+        if area is None:
+            self.layers[layer].append((surface, position))
+        else:
+            self.layers[layer].append((surface, position, area))
+
+    def extend(self, layer, blits):
+        """add a list of commands"""
+        self.layers[layer].extend(blits)
+
+    def add_draw(self, draw):
+        """call draw(screen) after the blits, for drawing that isn't a
+        blit (the profiler overlay)"""
+        self.draws.append(draw)
+
+    def flush(self, screen, rect_layers=()):
+        """Draw every command from the bottom layer up and empty the
+        queue. Returns the rects drawn on by the layers in
+        `rect_layers`"""
+        rects = []
+        for layer, blits in enumerate(self.layers):
+            if not blits:
+                continue
+            if not self.headless:
+                if layer in rect_layers:
+                    rects += screen.blits(blits)
+                else:
+                    screen.blits(blits, False)
+                self.calls += 1
+                self.commands += len(blits)
+            blits.clear()
+        if not self.headless:
+            for draw in self.draws:
+                draw(screen)
+        self.draws.clear()
+        return rects
+
+
+@lru_cache(maxsize=1)
+def get_background():
+    """the sky and ground every playing frame is drawn on, composed
+    once, don't draw on the returned surface"""
+    background = pygame.Surface((WIDTH, HEIGHT)).convert()
+    background.fill("purple")
+    background.blit(get_sprite("level", "sky"), (0, 0))
+    background.blit(get_sprite("level", "ground"), (0, GROUND_Y))
+    return background
+
+
+def get_hud(name, key, draw):
+    """The HUD element `name` as (surface, rect), drawn by draw(surf)
+    on a copy of the background so it is blitted without transparency.
+    It is only drawn again when `key` (what it shows) changes, both are
+    None if draw() drew nothing"""
+    cached = hud_cache.get(name)
+    if cached is not None and cached[0] == key:
+        return cached[1], cached[2]
+    surf = get_background().subsurface(HUD_AREA).copy()
+    rect = draw(surf)  # HUD_AREA is at (0, 0), no need to move it
+    if rect is not None:
+        rect = rect.clip(HUD_AREA)
+        surf = surf.subsurface(rect)
+    else:
+        surf = None
+    hud_cache[name] = (key, surf, rect)
+    return surf, rect
+
+
+def get_hud_elements(world):
+    """(name, what it shows, draw(surf)) of each HUD element: health
+    and shield bars, score and power up bar"""
+    hp, shield = ceil(world.player_hp), ceil(world.player_shield)
+    power_up = world.cur_power_up
+    # the bar's length depends on the character's max too
+    max_val = world.get_max_power_up_val.get(power_up.type)
+    return [("health", (hp, shield),
+             lambda surf: display_player_health(surf, hp, shield)),
+            ("score", world.score,
+             lambda surf: display_score(surf, world.score)),
+            ("power_up", (power_up.type, power_up.value, max_val),
+             lambda surf: display_player_power_up(surf, world))]
+
+
+def get_egg_blits(eggs):
+    """draw commands for each egg, some eggs gradually turn invisible"""
+    blits = []
+    for egg in eggs:
+        # this type of eggs gradually turns invisible
+        if not egg.visible:
+            egg_surf_temp = get_fade_frame(egg.type,
+                                           get_fade_level(egg.rect.x))
+        else:
+            egg_surf_temp = get_sprite("egg", egg.type)
+        blits.append((egg_surf_temp, egg.rect))
+    return blits
+
+
+def get_power_up_blits(power_ups):
+    """draw commands for the power ups that can be picked up"""
+    return [(get_sprite("power_up", power_up_obj.type), power_up_obj.rect)
+            for power_up_obj in power_ups]
+
+
+def get_player_blit(world):
+    """draw command for the player using the animation chosen by the
+    World, the sprite is shrunk if player is currently small"""
+    scale = SMALL_SCALE if world.player_is_small else 1
+    return get_sprite("player", world.player_pose, scale), world.player_rect
+
+
+def submit_sprites(queue, world, ghosts=None, particles=None):
+    """submit the player, eggs and power ups, the ghosts of a
+    GhostRace behind the player and a ParticleSystem's particles on top
+    if they are given. Returns the areas the ghosts and particles cover"""
+    areas = []
+    if ghosts is not None:
+        areas.append(ghosts.submit(queue, world.frame))
+    queue.add(LAYER_PLAYER, *get_player_blit(world))
+    queue.extend(LAYER_EGGS, get_egg_blits(world.eggs))
+    queue.extend(LAYER_POWER_UPS, get_power_up_blits(world.power_ups))
+    if particles is not None:
+        areas.append(particles.submit(queue))
+    return [area for area in areas if area is not None]
+
+
+def submit_world(queue, world, ghosts=None, particles=None):
+    """submit one playing frame"""
+    queue.add(LAYER_BACKGROUND, get_background(), (0, 0))
+    # health and shield bars, score and power up bar, not composed
+    # when nothing will be drawn
+    with profiler.zone("hud"):
+        if not queue.headless:
+            for name, key, draw in get_hud_elements(world):
+                surf, rect = get_hud(name, key, draw)
+                if surf is not None:
+                    queue.add(LAYER_HUD, surf, rect)
+    submit_sprites(queue, world, ghosts, particles)
+
+
+def draw_world(screen, world, ghosts=None, particles=None):
+    """draw one playing frame straight away"""
+    queue = RenderQueue()
+    submit_world(queue, world, ghosts, particles)
+    queue.flush(screen)
+
+
+def submit_death_screen(queue, world):
+    """make all eggs visible so player can see what killed them,
+    then show the death message"""
+    # make eggs visible
+    queue.extend(LAYER_EGGS, [(get_sprite("egg", egg.type), egg.rect)
+                              for egg in world.eggs])
+    # death message
+    death_message = render_text("font/Pixeltype.ttf", 80, "You Died", True,
+                                "red")
+    message_rect = death_message.get_rect(center=(WIDTH / 2, 120))
+    queue.add(LAYER_OVERLAY, death_message, message_rect)
+    death_message = render_text("font/Pixeltype.ttf", 60,
+                                "Press [SPACE] to restart", True, "red")
+    message_rect = death_message.get_rect(center=(WIDTH / 2, 200))
+    queue.add(LAYER_OVERLAY, death_message, message_rect)
+
+
+def get_help_button_rect():
+    """where display_help_button() draws the button"""
+    text_surf2 = render_text('Comic sans', 29, "Help Menu", True, "black")
+    return text_surf2.get_rect(center=(368, 349))
+
+
+class FullRenderer:
+    """Redraws everything every frame and sends the whole screen to the
+    display with pygame.display.flip()"""
+
+    def __init__(self, screen):
+        self.screen = screen
+        self.queue = RenderQueue()
+        self.pixels_pushed = 0  # pixels sent to the display so far
+
+    def draw_playing(self, world, ghosts=None, particles=None):
+        """draw one playing frame, with a GhostRace's ghosts and a
+        ParticleSystem's particles"""
+        submit_world(self.queue, world, ghosts, particles)
+        with profiler.zone("flush"):
+            self.queue.flush(self.screen)
+
+    def draw_static(self, key, draw):
+        """draw a screen that only changes when `key` changes, like the
+        menus, by calling draw(screen)"""
+        draw(self.screen)
+
+    def draw_overlay(self, submit):
+        """draw on top of the current frame, submit(queue) adds what
+        to draw"""
+        submit(self.queue)
+        self.queue.flush(self.screen)
+
+    def present(self):
+        """put this frame's work on screen"""
+        pygame.display.flip()
+        self.pixels_pushed += WIDTH * HEIGHT
+
+
+class HeadlessRenderer(FullRenderer):
+    """Submits frames like FullRenderer but its queue throws them away,
+    nothing is drawn or sent to the display. For running the game loop
+    without a window (SDL_VIDEODRIVER=dummy)"""
+
+    def __init__(self, screen):
+        super().__init__(screen)
+        self.queue = RenderQueue(headless=True)
+
+    def draw_static(self, key, draw):
+        pass
+
+    def present(self):
+        pass
+
+
+class DirtyRectRenderer:
+    """Only redraws and sends to the display the parts of the screen that
+    changed with pygame.display.update(rects)
+
+    Moving sprites are erased by copying the pre-composed background over
+    where they were last frame. HUD elements are only redrawn when what
+    they show changes, or when a sprite drawn over them moved. Static
+    screens (menus) are drawn once and not sent again until their key
+    changes."""
+
+    def __init__(self, screen):
+        self.screen = screen
+        self.queue = RenderQueue()
+        self.pixels_pushed = 0  # pixels sent to the display so far
+        self.background = get_background()
+        self.dirty = []  # areas to send to the display this frame
+        self.sprite_rects = []  # where sprites were drawn last frame
+        self.hud = {}  # HUD name -> (what it shows, rect it was drawn in)
+        self.static_key = None  # key of the static screen on display
+
+    def redraw_all(self):
+        """forget what is on screen so the next frame is drawn fully"""
+        self.static_key = None
+        self.sprite_rects = []
+        self.hud = {}
+
+    def erase(self, rect):
+        """put the background back over `rect`"""
+        self.queue.add(LAYER_BACKGROUND, self.background, rect, rect)
+        self.dirty.append(rect)
+
+    def draw_hud(self, name, key, draw):
+        """redraw a HUD element with draw(surf) if `key` changed"""
+        old_key, old_rect = self.hud.get(name, (None, None))
+        if key == old_key:
+            return
+        if old_rect is not None:
+            self.erase(old_rect)
+        surf, rect = get_hud(name, key, draw)
+        if surf is not None:
+            self.queue.add(LAYER_HUD, surf, rect)
+            self.dirty.append(rect)
+        self.hud[name] = (key, rect)
+
+    def draw_playing(self, world, ghosts=None, particles=None):
+        """draw one playing frame, with a GhostRace's ghosts and a
+        ParticleSystem's particles"""
+        queue = self.queue
+        if self.static_key is not None:  # coming from a menu
+            self.redraw_all()
+            queue.add(LAYER_BACKGROUND, self.background, (0, 0))
+            self.dirty.append(self.screen.get_rect())
+        for rect in self.sprite_rects:
+            self.erase(rect)
+            # a sprite that was drawn over the HUD (flying player)
+            # wiped part of it, draw that HUD element again
+            for name, (key, hud_rect) in list(self.hud.items()):
+                if hud_rect is not None and hud_rect.colliderect(rect):
+                    self.erase(hud_rect)
+                    self.hud[name] = (None, None)
+
+        # HUD elements are below the sprites so sprites are always on top
+        with profiler.zone("hud"):
+            for name, key, draw in get_hud_elements(world):
+                self.draw_hud(name, key, draw)
+
+        # all the ghosts are erased as one rect, and the particles too
+        areas = submit_sprites(queue, world, ghosts, particles)
+        with profiler.zone("flush"):
+            sprite_rects = queue.flush(self.screen, SPRITE_LAYERS)
+        sprite_rects += areas
+        self.dirty += sprite_rects
+        self.sprite_rects = sprite_rects
+
+    def draw_static(self, key, draw):
+        """draw a screen that only changes when `key` changes, like the
+        menus, by calling draw(screen)"""
+        if key == self.static_key:
+            return
+        self.redraw_all()
+        self.static_key = key
+        draw(self.screen)
+        self.dirty.append(self.screen.get_rect())
+
+    def draw_overlay(self, submit):
+        """draw on top of the current frame, submit(queue) adds what to
+        draw. The next playing frame is drawn fully"""
+        submit(self.queue)
+        self.queue.flush(self.screen)
+        self.dirty.append(self.screen.get_rect())
+        self.static_key = ("overlay",)
+
+    def present(self):
+        """put this frame's changed areas on screen"""
+        if not self.dirty:
+            return
+        screen_rect = self.screen.get_rect()
+        rects = [rect.clip(screen_rect) for rect in self.dirty]
+        pygame.display.update(rects)
+        self.pixels_pushed += sum(rect.width * rect.height for rect in rects)
+        self.dirty = []
@@ -0,0 +1,157 @@
+"""Record and replay games
+
+A game of Egg Jump is decided by its seed, the character and the input
+bits of every frame (see world.py), so that is all a replay stores:
+
+    header   "EGGR", version, character, seed      (14 bytes)
+    records  one byte per run of frames with the same inputs:
+             bits 0-2 are the INPUT_* bits, bit 3 is 0 and
+             bits 4-7 are the run length - 1 (1 to 16 frames)
+    end      END byte, number of frames and a digest of the final state
+
+Records are written as soon as a run ends, so a replay can be streamed
+to disk while the game is played, and a file without an end (the game
+crashed) can still be played. Replaying runs a World without drawing,
+thousands of times faster than real time, and checks the digest to be
+sure the game reached the exact same state.
+
+Verify replays from the command line with:
+    python replay.py game1.eggr game2.eggr ...
+"""
+
+import sys
+import time
+import struct
+import hashlib
+from collections import namedtuple
+
+from world import World
+
+MAGIC = b"EGGR"
+VERSION = 3  # 2: spawn_rules.json, eggs are picked with the alias method
+             # 3: pixel perfect egg collisions
+HEADER = struct.Struct("<4sBBQ")  # magic, version, character, seed
+FOOTER = struct.Struct("<I8s")  # frames, state digest
+END = 0x08  # not a valid record, bit 3 is never set in records
+MAX_RUN = 16  # longest run of frames in one record
+
+Replay = namedtuple("Replay",
+                    ["seed", "character", "inputs", "frames", "digest"])
+
+
+def get_state_digest(world):
+    """8 byte hash of everything in the World that can change, two
+    worlds with the same digest are in the same state"""
+    state = (world.frame, world.character, world.player_hp,
+             world.player_shield, world.players_fall_speed,
+             world.jump_start_speed, world.player_is_small,
+             world.player_pose, tuple(world.player_rect),
+             (world.cur_power_up.type, world.cur_power_up.value),
+             [(tuple(egg.rect), egg.type, egg.destroyed, egg.visible)
+              for egg in world.eggs],
+             [(tuple(power_up.rect), power_up.type, power_up.value)
+              for power_up in world.power_ups],
+             world.next_power_up, world.rng.getstate())
+    return hashlib.blake2b(repr(state).encode(), digest_size=8).digest()
+
+
+class ReplayWriter:
+    """Writes a replay while the game is played, call write() with the
+    inputs of every frame and close() with the World when the game ends"""
+
+    def __init__(self, path, seed, character):
+        self.file = open(path, "wb")
+        self.file.write(HEADER.pack(MAGIC, VERSION, character, seed))
+        self.inputs = None  # inputs of the current run
+        self.run = 0  # frames in the current run
+        self.frames = 0
+
+    def write_run(self):
+        if self.run:
+            self.file.write(bytes([self.inputs | (self.run - 1) << 4]))
+
+    def write(self, inputs):
+        """add one frame's INPUT_* bits"""
+        if inputs != self.inputs or self.run == MAX_RUN:
+            self.write_run()
+            self.inputs = inputs
+            self.run = 0
+        self.run += 1
+        self.frames += 1
+
+    def close(self, world):
+        """finish the replay with the state the game ended in"""
+        self.write_run()
+        self.file.write(bytes([END]))
+        self.file.write(FOOTER.pack(self.frames, get_state_digest(world)))
+        self.file.close()
+
+
+def read_replay(path):
+    """Load a replay, inputs has one byte of INPUT_* bits per frame.
+    digest is None if the replay has no end"""
+    with open(path, "rb") as file:
+        data = file.read()
+    magic, version, character, seed = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a version {VERSION} replay")
+
+    runs = []
+    digest = None
+    end = data.find(END, HEADER.size)  # END can't be part of a record
+    if end == -1:
+        records = data[HEADER.size:]
+    else:
+        records = data[HEADER.size:end]
+        frames, digest = FOOTER.unpack_from(data, end + 1)
+    for record in records:
+        runs.append(bytes([record & 7]) * ((record >> 4) + 1))
+    inputs = b"".join(runs)
+    if digest is not None and frames != len(inputs):
+        raise ValueError(f"{path} has {len(inputs)} frames of inputs "
+                         f"but should have {frames}")
+    return Replay(seed, character, inputs, len(inputs), digest)
+
+
+def play_replay(replay, world=None):
+    """Re-drive a World with the replay's seed and inputs, without
+    drawing, and return it"""
+    if world is None:
+        world = World()
+    world.reset(replay.character, replay.seed)
+    step = world.step
+    for inputs in replay.inputs:
+        step(inputs)
+    return world
+
+
+def verify_replay(path, world=None):
+    """True if playing the replay ends in the state it recorded"""
+    replay = read_replay(path)
+    world = play_replay(replay, world)
+    return get_state_digest(world) == replay.digest
+
+
+def main(paths):
+    world = World()
+    failed = 0
+    frames = 0
+    start = time.perf_counter()
+    for path in paths:
+        replay = read_replay(path)
+        play_replay(replay, world)
+        frames += replay.frames
+        if replay.digest is None:
+            print(f"{path}: no end, played {replay.frames} frames")
+        elif get_state_digest(world) != replay.digest:
+            print(f"{path}: MISMATCH after {replay.frames} frames")
+            failed += 1
+    elapsed = time.perf_counter() - start
+    print(f"{len(paths) - failed}/{len(paths)} replays match, "
+          f"{frames} frames in {elapsed:.2f}s "
+          f"({frames / max(elapsed, 1e-9) / 60:.0f}x real time)")
+    return failed == 0
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main(sys.argv[1:]) else 1)
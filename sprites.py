@@ -0,0 +1,199 @@
+"""Sprite atlas
+
+Loads every image once and builds every scaled or derived version the
+game draws (small player, HUD power up icons, inverted menu character),
+so nothing has to be scaled while the game is running.
+
+Sprites are looked up by (sprite, state, scale), for example
+get_sprite("player", "crawl", SMALL_SCALE). `scale` is either a factor
+(1 is the original image) or a (width, height) size.
+
+Ghosts of earlier runs (see ghosts.py) are drawn with
+get_sprite("ghost", pose, scale), player sprites already tinted
+GHOST_TINT and made see-through.
+
+Eggs that slowly turn invisible use get_fade_frame(state, level), copies
+of the egg image with their transparency already applied, so no shared
+image has its alpha changed while drawing.
+
+Everything build_atlas() makes is saved to BUNDLE_FILE and loaded from
+it the next time the game starts, without decoding any PNG (see
+bundle.py).
+"""
+
+import pygame
+
+import bundle
+from world import SMALL_SCALE
+
+# image files for each (sprite, state)
+SPRITE_FILES = {
+    ("level", "sky"): "graphics/level/sky.png",
+    ("level", "ground"): "graphics/level/ground.png",
+    ("level", "help_menu"): "graphics/help_menu.png",
+    ("level", "main_menu"): "graphics/main_menu.png",
+    # player states are World.player_pose
+    ("player", "walk"): "graphics/player/player_walk_1.png",
+    ("player", "walk2"): "graphics/player/player_walk_2.png",
+    ("player", "jump"): "graphics/player/player_jump.png",
+    ("player", "crawl"): "graphics/player/player_crawl_1.png",
+    ("player", "crawl2"): "graphics/player/player_crawl_2.png",
+    ("player", "fly"): "graphics/player/player_fly.png",
+    ("egg", "normal"): "graphics/egg/egg_normal.png",
+    ("egg", "fried"): "graphics/egg/egg_fried.png",
+    ("egg", "flying"): "graphics/egg/egg_flying.png",
+    ("egg", "flying2"): "graphics/egg/egg_flying_2.png",
+    ("power_up", "health"): "graphics/power_ups/health.png",
+    ("power_up", "shield"): "graphics/power_ups/shield.png",
+    ("power_up", "fly"): "graphics/power_ups/fly.png",
+    ("power_up", "small"): "graphics/power_ups/small.png",
+}
+
+# every variant build_atlas() makes up front, besides scale 1
+PLAYER_POSES = ["walk", "walk2", "jump", "crawl", "crawl2", "fly"]
+POWER_UP_ICON_SIZE = (40, 40)  # power up icon next to the HUD bar
+MENU_CHARACTER_SIZE = (90, 150)  # jumping character on the main menu
+EGG_STATES = ["normal", "fried", "flying", "flying2"]
+FADE_LEVELS = 32  # level 0 is invisible, FADE_LEVELS - 1 fully visible
+GHOST_TINT = (120, 170, 255, 110)  # multiplies the player's colors and alpha
+VARIANTS = ([("player", pose, SMALL_SCALE) for pose in PLAYER_POSES] +
+            [("ghost", pose, scale) for pose in PLAYER_POSES
+             for scale in (1, SMALL_SCALE)] +
+            [("power_up", name, POWER_UP_ICON_SIZE)
+             for name in ("health", "shield", "fly", "small")] +
+            [("player_inverted", "jump", MENU_CHARACTER_SIZE)])
+
+BUNDLE_FILE = "graphics/sprites.bundle"
+
+atlas = {}
+fade_frames = {}  # egg state -> list of FADE_LEVELS images
+
+
+def load_image(sprite, state):
+    """load an image in the display's pixel format, backgrounds don't
+    need transparency"""
+    image = pygame.image.load(SPRITE_FILES[(sprite, state)])
+    if sprite == "level":
+        return image.convert()
+    return image.convert_alpha()
+
+
+def make_variant(sprite, state, scale):
+    """build a scaled or derived version of an image"""
+    if sprite == "player_inverted":
+        # player with color inverted, drawn on a white background
+        character_surf = get_sprite("player", state, scale)
+        inv = pygame.Surface(character_surf.get_size())
+        inv.fill("white")
+        inv.blit(character_surf, (0, 0), None, pygame.BLEND_RGBA_SUB)
+        return inv
+    if sprite == "ghost":
+        # tinted see-through player, blits can't change a sprite's
+        # alpha so it is done once here
+        ghost = get_sprite("player", state, scale).copy()
+        ghost.fill(GHOST_TINT, None, pygame.BLEND_RGBA_MULT)
+        return ghost
+    if scale == 1:
+        return load_image(sprite, state)
+    original = get_sprite(sprite, state)
+    if isinstance(scale, tuple):
+        return pygame.transform.scale(original, scale)
+    return pygame.transform.scale_by(original, scale)
+
+
+def get_sprite(sprite, state, scale=1):
+    """Get an image from the atlas, building it the first time"""
+    key = (sprite, state, scale)
+    surf = atlas.get(key)
+    if surf is None:
+        surf = atlas[key] = make_variant(sprite, state, scale)
+    return surf
+
+
+def make_fade_frames(state):
+    """copies of an egg image from invisible to fully visible"""
+    original = get_sprite("egg", state)
+    frames = []
+    for level in range(FADE_LEVELS):
+        alpha = round(255 * level / (FADE_LEVELS - 1))
+        frame = original.copy()
+        # scale every pixel's alpha, colors are kept
+        frame.fill((255, 255, 255, alpha), None, pygame.BLEND_RGBA_MULT)
+        frames.append(frame)
+    return frames
+
+
+def get_fade_frame(state, level):
+    """Get an egg image with transparency `level`, building the frames
+    the first time"""
+    frames = fade_frames.get(state)
+    if frames is None:
+        frames = fade_frames[state] = make_fade_frames(state)
+    return frames[level]
+
+
+def get_source_hash():
+    """hash of everything build_atlas() uses, the bundle is rebuilt
+    when it changes"""
+    return bundle.get_source_hash(
+        sorted(set(SPRITE_FILES.values())),
+        (sorted(SPRITE_FILES.items()), VARIANTS, EGG_STATES, FADE_LEVELS,
+         GHOST_TINT))
+
+
+def get_bundle_surfaces():
+    """every sprite and fade frame, keyed for the bundle"""
+    surfaces = dict(atlas)
+    for state, frames in fade_frames.items():
+        for level, frame in enumerate(frames):
+            surfaces[("fade", state, level)] = frame
+    return surfaces
+
+
+def load_atlas_bundle():
+    """fill the atlas from the bundle, returns False if the bundle is
+    missing or out of date"""
+    surfaces = bundle.load_bundle(BUNDLE_FILE, get_source_hash())
+    if surfaces is None:
+        return False
+    for key, surf in surfaces.items():
+        if key[0] == "fade":
+            _, state, level = key
+            frames = fade_frames.setdefault(state, [None] * FADE_LEVELS)
+            frames[level] = surf
+        else:
+            atlas[key] = surf
+    return True
+
+
+def build_atlas(use_bundle=True):
+    """Load every image and build every variant the game uses, must be
+    called after the display is created because convert() needs to
+    know the display's pixel format.
+    With `use_bundle` they are loaded from the bundle if it is up to
+    date, otherwise they are built from the PNGs and saved to it"""
+    atlas.clear()
+    fade_frames.clear()
+    if use_bundle and load_atlas_bundle():
+        return
+    for sprite, state in SPRITE_FILES:
+        get_sprite(sprite, state)
+    for key in VARIANTS:
+        get_sprite(*key)
+    for state in EGG_STATES:
+        get_fade_frame(state, 0)
+    if use_bundle:
+        try:
+            bundle.save_bundle(BUNDLE_FILE, get_source_hash(),
+                               get_bundle_surfaces())
+        except OSError:  # can't write to graphics/, load PNGs next time
+            pass
+
+
+if __name__ == "__main__":
+    # build the bundle, a hidden window gives convert() a pixel format
+    pygame.init()
+    pygame.display.set_mode((1, 1), pygame.HIDDEN)
+    build_atlas(use_bundle=False)
+    bundle.save_bundle(BUNDLE_FILE, get_source_hash(), get_bundle_surfaces())
+    print(f"saved {len(get_bundle_surfaces())} sprites to {BUNDLE_FILE}")
@@ -0,0 +1,97 @@
+"""Fixed timestep for the game loop
+
+The World always moves in steps of 1/60 of a second (score, phases,
+egg speed and power up times all count steps), but the screen can be
+drawn at any rate. FixedTimestep adds up the real time that passed each
+frame and says how many steps to run, so the game runs at the same
+speed at 30, 60 or 144 FPS. At most MAX_STEPS are run in one frame,
+if the computer is too slow to keep up the game slows down instead of
+freezing while it tries to catch up.
+
+Between steps, interpolated() moves the player, eggs and power ups
+part of the way from where they were before the last step to where
+they are now, so movement looks smooth when frames don't line up with
+steps.
+"""
+
+from contextlib import contextmanager
+
+STEP = 1 / 60  # seconds of game time per World.step()
+MAX_STEPS = 5  # most steps run in one frame
+EPSILON = 1e-6  # timer rounding, a step that is this close is run
+
+
+class FixedTimestep:
+    def __init__(self, step=STEP, max_steps=MAX_STEPS):
+        self.step = step
+        self.max_steps = max_steps
+        self.accumulator = 0.0  # real time not yet simulated, seconds
+        self.dropped = 0.0  # time thrown away because of MAX_STEPS
+
+    def advance(self, elapsed):
+        """add `elapsed` seconds of real time, returns how many steps
+        to run this frame"""
+        self.accumulator += elapsed
+        steps = int((self.accumulator + EPSILON) // self.step)
+        if steps > self.max_steps:  # too far behind, don't catch up
+            self.dropped += self.accumulator - self.max_steps * self.step
+            self.accumulator = self.max_steps * self.step
+            steps = self.max_steps
+        self.accumulator = max(0.0, self.accumulator - steps * self.step)
+        return steps
+
+    @property
+    def alpha(self):
+        """how far the game is between the last step and the next,
+        from 0 to 1"""
+        return min(1.0, self.accumulator / self.step)
+
+
+def get_positions(world):
+    """where everything that moves is, to interpolate from after the
+    next step. Eggs and power ups keep their rect between steps, the
+    rects are kept in the dict so a new rect can't reuse their id().
+    The player's rect changes size with its pose so its bottom left
+    corner is used"""
+    positions = {id(egg.rect): (egg.rect, egg.rect.topleft)
+                 for egg in world.eggs}
+    for power_up in world.power_ups:
+        positions[id(power_up.rect)] = (power_up.rect,
+                                        power_up.rect.topleft)
+    positions["player"] = world.player_rect.bottomleft
+    return positions
+
+
+def lerp(start, end, alpha):
+    return (round(start[0] + (end[0] - start[0]) * alpha),
+            round(start[1] + (end[1] - start[1]) * alpha))
+
+
+@contextmanager
+def interpolated(world, positions, alpha):
+    """move everything to between `positions` (from get_positions()
+    before the last step) and where it is now while drawing, then put
+    it back. Things that didn't exist before the last step don't move.
+    Eggs and power ups are reused from world.py's pools, so a rect that
+    was off the left of the screen can be a new one on the right: they
+    only ever move left, so a rect that was further left is a new one"""
+    if positions is None or alpha >= 1:
+        yield world
+        return
+    rects = [egg.rect for egg in world.eggs]
+    rects += [power_up.rect for power_up in world.power_ups]
+    moved = []
+    for rect in rects:
+        start = positions.get(id(rect))
+        if start is not None and start[1][0] >= rect.x:
+            moved.append((rect, rect.topleft))
+            rect.topleft = lerp(start[1], rect.topleft, alpha)
+    player_rect = world.player_rect
+    moved.append((player_rect, player_rect.topleft))
+    player_rect.bottomleft = lerp(positions["player"],
+                                  player_rect.bottomleft, alpha)
+    try:
+        yield world
+    finally:
+        for rect, topleft in moved:
+            rect.topleft = topleft
@@ -0,0 +1,735 @@
+"""Headless simulation core for Egg Jump
+
+Holds all of the game's state (player, eggs, power-ups, score) and
+advances it one frame at a time without opening a window, so the same
+rules can be used by the interactive game in main.py, by benchmarks and
+by tools that need to simulate many frames quickly.
+
+Nothing in this file draws to the screen, only pygame.Rect and
+pygame.mask are used. Collisions are checked with rects first, then
+with masks of the player's and eggs' non transparent pixels, so the
+transparent corners of the images can't hit the player.
+
+Each World has its own random number generator seeded at reset(), so a
+game can be played again exactly from its seed and inputs (see
+replay.py).
+
+Which eggs spawn in each phase, how far apart, and how fast they move
+are loaded from spawn_rules.json (see load_spawn_rules()).
+"""
+
+import os
+import json
+import random
+from collections import deque, namedtuple
+from math import log, log2
+
+import pygame
+
+
+# constants
+WIDTH = 800
+HEIGHT = 400
+MIN_EGG_DIST = 120  # minimum distance between eggs
+GROUND_Y = 300  # The Y-coordinate of the ground level
+GRAVITY = 1  # acceleration from gravity
+SMALL_SCALE = 0.6  # how much the "small" power up shrinks the player
+
+# images the player, eggs and power ups are drawn with (same files as
+# sprites.SPRITE_FILES), only their sizes and transparency are used
+GRAPHICS_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                               "graphics")
+get_player_image = {"walk": "player/player_walk_1.png",
+                    "walk2": "player/player_walk_2.png",
+                    "jump": "player/player_jump.png",
+                    "crawl": "player/player_crawl_1.png",
+                    "crawl2": "player/player_crawl_2.png",
+                    "fly": "player/player_fly.png"}
+get_egg_image = {"normal": "egg/egg_normal.png",
+                 "fried": "egg/egg_fried.png",
+                 "flying": "egg/egg_flying.png",
+                 "flying2": "egg/egg_flying_2.png"}
+get_power_up_image = {"health": "power_ups/health.png",
+                      "shield": "power_ups/shield.png",
+                      "fly": "power_ups/fly.png",
+                      "small": "power_ups/small.png"}
+# how far above the ground each egg type floats
+get_egg_lift = {"normal": 0,
+                "fried": 0,
+                "flying": 35,
+                "flying2": 35}
+# how long/strong each power up is before character bonuses
+DEFAULT_MAX_POWER_UP_VAL = {"health": 100,  # heal 20 HP
+                            "shield": 75,  # gain 15 shield
+                            "fly": 7 * 60,  # fly for 7 sec
+                            "small": 7 * 60}  # be small for 7 sec
+
+# per-frame input bits passed to World.step()
+INPUT_JUMP = 1  # [space] or [up_arrow] is held down
+INPUT_DOWN = 2  # [down_arrow] is held down
+INPUT_DROP = 4  # [down_arrow] was pressed this frame
+
+
+class Egg:
+    """An egg on the map. Eggs are reused (see egg_pool) so they can
+    change instead of making a new Egg every time"""
+    __slots__ = ("rect", "type", "destroyed", "visible")
+
+    def __init__(self, rect, type, destroyed, visible):
+        self.rect = rect
+        self.type = type
+        self.destroyed = destroyed  # already hit the player once
+        self.visible = visible
+
+    def __repr__(self):
+        return (f"Egg({self.rect}, {self.type!r}, {self.destroyed}, "
+                f"{self.visible})")
+
+
+class Power_up:
+    """Power up object that spawns on the map"""
+    __slots__ = ("rect", "type", "value")
+
+    def __init__(self, rect, type, value):
+        self.rect = rect
+        self.type = type
+        self.value = value
+
+    def __repr__(self):
+        return f"Power_up({self.rect}, {self.type!r}, {self.value})"
+
+
+class Player_power_up:
+    """Power up that the player currently has, type "" means none.
+    Each World keeps one and changes it"""
+    __slots__ = ("type", "value")
+
+    def __init__(self, type="", value=0):
+        self.type = type
+        self.value = value
+
+    def __repr__(self):
+        return f"Player_power_up({self.type!r}, {self.value})"
+
+    def clear(self):
+        self.type = ""
+        self.value = 0
+
+
+# Eggs and Power_ups that left the map, reused by the next spawn of any
+# World instead of allocating new objects
+egg_pool = []
+power_up_pool = []
+
+
+def new_egg(egg_type, left, bottom, visible):
+    """An Egg from egg_pool (or a new one if it is empty) with its
+    bottom left corner at (left, bottom)"""
+    if egg_pool:
+        egg = egg_pool.pop()
+        rect = egg.rect
+        rect.size = get_egg_size[egg_type]
+        egg.type = egg_type
+        egg.destroyed = False
+        egg.visible = visible
+    else:
+        rect = pygame.Rect(0, 0, *get_egg_size[egg_type])
+        egg = Egg(rect, egg_type, False, visible)
+    rect.left = left
+    rect.bottom = bottom
+    return egg
+
+
+def new_power_up(power_up_type, left, value):
+    """A Power_up on the ground from power_up_pool (or a new one if it
+    is empty)"""
+    if power_up_pool:
+        power_up = power_up_pool.pop()
+        rect = power_up.rect
+        rect.size = get_power_up_size[power_up_type]
+        power_up.type = power_up_type
+        power_up.value = value
+    else:
+        rect = pygame.Rect(0, 0, *get_power_up_size[power_up_type])
+        power_up = Power_up(rect, power_up_type, value)
+    rect.left = left
+    rect.bottom = GROUND_Y
+    return power_up
+
+
+# Something that happened during a step, returned to the caller so it
+# can play effects without looking at the state
+# kind is one of "shield_break", "damage", "pick_up", "death"
+# rect is a copy, eggs and power ups are reused after they are gone
+Event = namedtuple("Event", ["kind", "type", "rect"])
+
+
+class Track(deque):
+    """Eggs or Power_ups ordered by their left edge, left to right.
+
+    Everything on a track moves left at the same speed, so the order
+    never changes: things leave the screen from the left end and new
+    ones are spawned on the right end. Only the few things at the left
+    end can be near the player (who never moves past x=73), so they are
+    the only ones that need to be checked for collisions."""
+
+    def add(self, entity):
+        """add an entity, keeping the track in order. New entities are
+        almost always the furthest right so this is usually an append"""
+        left = entity.rect.left
+        i = len(self)
+        while i > 0 and self[i - 1].rect.left > left:
+            i -= 1
+        if i == len(self):
+            self.append(entity)
+        else:
+            self.insert(i, entity)
+
+    def scroll(self, speed):
+        """move everything `speed` pixels to the left"""
+        for entity in self:
+            entity.rect.x -= speed
+
+    def retire(self, pool):
+        """move entities that went off the left of the screen to `pool`,
+        returns how many were removed"""
+        removed = 0
+        i = 0
+        # only entities starting left of the screen can be off it
+        while i < len(self) and self[i].rect.left < 0:
+            if self[i].rect.right <= 0:
+                if i == 0:
+                    pool.append(self.popleft())
+                else:  # behind a wider entity that is still on screen
+                    pool.append(self[i])
+                    del self[i]
+                removed += 1
+            else:
+                i += 1
+        return removed
+
+    def get_near(self, rect):
+        """indexes of the entities whose x-span overlaps `rect`'s,
+        scanning from the left end until they start past it"""
+        near = []
+        for i, entity in enumerate(self):
+            if entity.rect.left >= rect.right:
+                break
+            if entity.rect.right > rect.left:
+                near.append(i)
+        return near
+
+    def get_after(self, x):
+        """entities whose left edge is at or past `x`, left to right,
+        scanning from the right end"""
+        after = []
+        for entity in reversed(self):
+            if entity.rect.left < x:
+                break
+            after.append(entity)
+        after.reverse()
+        return after
+
+
+def get_rect(size, **kwargs):
+    """Same as Surface.get_rect() but only needs the surface's size"""
+    rect = pygame.Rect((0, 0), size)
+    for attribute, value in kwargs.items():
+        setattr(rect, attribute, value)
+    return rect
+
+
+def load_mask(path, scale=1):
+    """Mask of the pixels of an image that can be hit, scaled the same
+    way sprites.py scales the image that is drawn. Images can be loaded
+    without a window, they just aren't converted"""
+    image = pygame.image.load(os.path.join(GRAPHICS_FOLDER, path))
+    if scale != 1:
+        image = pygame.transform.scale_by(image, scale)
+    return pygame.mask.from_surface(image)
+
+
+# hit masks, made once when the game starts:
+# (pose, is_small) -> player Mask, egg type -> egg Mask
+get_player_mask = {(pose, is_small): load_mask(path,
+                                               SMALL_SCALE if is_small else 1)
+                   for pose, path in get_player_image.items()
+                   for is_small in (False, True)}
+get_egg_mask = {egg_type: load_mask(path)
+                for egg_type, path in get_egg_image.items()}
+
+# hitbox sizes, taken from the images so they can't get out of date.
+# The small player's are the size of its scaled mask
+get_player_size = {pose: get_player_mask[(pose, False)].get_size()
+                   for pose in get_player_image}
+get_small_player_size = {pose: get_player_mask[(pose, True)].get_size()
+                         for pose in get_player_image}
+get_egg_size = {egg_type: mask.get_size()
+                for egg_type, mask in get_egg_mask.items()}
+get_power_up_size = {power_up_type: pygame.image.load(
+                         os.path.join(GRAPHICS_FOLDER, path)).get_size()
+                     for power_up_type, path in get_power_up_image.items()}
+MAX_EGG_WIDTH = max(width for width, height in get_egg_size.values())
+
+
+def get_player_rect(pose, is_small, **kwargs):
+    """Get the player's hitbox for an animation pose, the "small"
+    power up shrinks it the same way pygame.transform.scale_by does"""
+    if is_small:
+        return get_rect(get_small_player_size[pose], **kwargs)
+    return get_rect(get_player_size[pose], **kwargs)
+
+
+SPAWN_RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "spawn_rules.json")
+TABLE_FRAMES = 20 * 60 * 60  # frames of speeds and phases worked out at start
+
+# one kind of egg a phase can spawn: its weight against the phase's other
+# eggs, and the (low, high) ranges of randint() for the gap to the last
+# egg and the minimum spawn location
+Egg_rule = namedtuple("Egg_rule", ["type", "weight", "gap", "far"])
+# phases are numbered from 1, `table` picks one of `eggs` by weight
+Phase = namedtuple("Phase", ["number", "start", "eggs", "table",
+                             "invisible_chance"])
+# obstacles speed up linearly from slowest to fastest over ramp_frames,
+# then logarithmically
+Speed_curve = namedtuple("Speed_curve", ["slowest", "fastest", "ramp_frames",
+                                         "log_scale"])
+# power_up_chance is the chance a power up spawns on any frame
+Spawn_rules = namedtuple("Spawn_rules", ["phases", "speed",
+                                         "power_up_chance"])
+
+
+class AliasTable:
+    """Picks index i with probability weights[i] / sum(weights) in O(1)
+    with one random number, using Vose's alias method: each index gets
+    a column that is split between itself (prob) and one other index
+    (alias)"""
+
+    def __init__(self, weights):
+        count = len(weights)
+        total = sum(weights)
+        scaled = [weight * count / total for weight in weights]
+        self.prob = [1.0] * count
+        self.alias = list(range(count))
+        small = [i for i, p in enumerate(scaled) if p < 1]
+        large = [i for i, p in enumerate(scaled) if p >= 1]
+        while small and large:
+            less = small.pop()
+            more = large.pop()
+            self.prob[less] = scaled[less]
+            self.alias[less] = more  # fill the rest of the column
+            scaled[more] += scaled[less] - 1
+            if scaled[more] < 1:
+                small.append(more)
+            else:
+                large.append(more)
+
+    def sample(self, rng):
+        """an index, using rng.random() (nothing if there is only one)"""
+        count = len(self.prob)
+        if count == 1:
+            return 0
+        column = rng.random() * count
+        i = int(column)
+        return i if column - i < self.prob[i] else self.alias[i]
+
+
+def load_spawn_rules(path=SPAWN_RULES_FILE):
+    """Read the spawn rules from a JSON file with:
+    "speed": slowest, fastest, ramp_frames and log_scale of the speed curve
+    "power_up_chance": chance of a power up spawning each frame
+    "phases": list of phases in order, each with the frame it starts
+        on, the chance an egg slowly turns invisible and its "eggs":
+        type, weight, and the "gap" and "far" randint() ranges"""
+    with open(path) as file:
+        rules = json.load(file)
+    phases = []
+    for number, phase in enumerate(rules["phases"], start=1):
+        eggs = [Egg_rule(egg["type"], egg["weight"], tuple(egg["gap"]),
+                         tuple(egg["far"]))
+                for egg in phase["eggs"]]
+        phases.append(Phase(number, phase["start"], eggs,
+                            AliasTable([egg.weight for egg in eggs]),
+                            phase["invisible_chance"]))
+    return Spawn_rules(phases, Speed_curve(**rules["speed"]),
+                       rules["power_up_chance"])
+
+
+def get_curve_speed(curve, frame):
+    """Speed of the obstacles on a frame, from the speed curve"""
+    if frame < curve.ramp_frames:  # start with linear increase
+        return (frame * (curve.fastest - curve.slowest) / curve.ramp_frames
+                + curve.slowest)
+    else:  # then use logarithmic increase
+        return curve.fastest + curve.log_scale*log2(frame/curve.ramp_frames)
+
+
+def get_phase_rules(frame):
+    """The Phase a frame is in"""
+    if frame < TABLE_FRAMES:
+        return PHASE_TABLE[frame]
+    return SPAWN_RULES.phases[-1]
+
+
+def get_phase(frame):
+    """Gets the current game phase number based on the current frame"""
+    return get_phase_rules(frame).number
+
+
+def get_obstacle_speed(frame):
+    """Get the speed at which obstacles move left, depending on the
+    frame, looked up in a table for the first TABLE_FRAMES frames"""
+    if frame < TABLE_FRAMES:
+        return SPEED_TABLE[frame]
+    return get_curve_speed(SPAWN_RULES.speed, frame)
+
+
+def get_power_up_wait(number, chance=None):
+    """Frames until the next power up spawns, from a random number in
+    [0, 1). A power up spawning with `chance` on each frame has to wait
+    this long (geometric distribution), so it only needs one random
+    number per power up instead of one every frame"""
+    if chance is None:
+        chance = SPAWN_RULES.power_up_chance
+    return int(log(1.0 - number) / log(1.0 - chance))
+
+
+def get_phase_table(rules, frames):
+    """the Phase of each of the first `frames` frames"""
+    table = []
+    for phase, next_phase in zip(rules.phases, rules.phases[1:] + [None]):
+        end = frames if next_phase is None else min(frames,
+                                                    next_phase.start)
+        table += [phase] * (end - phase.start)
+    return table
+
+
+SPAWN_RULES = load_spawn_rules()
+PHASE_TABLE = get_phase_table(SPAWN_RULES, TABLE_FRAMES)
+SPEED_TABLE = [get_curve_speed(SPAWN_RULES.speed, frame)
+               for frame in range(TABLE_FRAMES)]
+
+
+def get_egg(prev_loc, frame, rng=random):
+    """Returns an Egg object based on current phase and previous egg
+    location,
+    Makes sure that 2 eggs are not too close together, so it is always
+    possible to win.
+    Random numbers come from `rng`, a random.Random or the random module.
+    The Egg is reused from egg_pool if possible"""
+    phase = get_phase_rules(frame)
+    # pick the type of egg using the phase's weights
+    rule = phase.eggs[phase.table.sample(rng)]
+    # in later phases eggs can slowly become invisible
+    # (they can still kill you)
+    visible = True
+    if phase.invisible_chance:
+        visible = rng.random() >= phase.invisible_chance
+    # ensure eggs aren't too close to each other and have some
+    # variation, fried eggs can be closer together
+    left = max(MIN_EGG_DIST + prev_loc + rng.randint(*rule.gap),
+               rng.randint(*rule.far))
+    return new_egg(rule.type, left, GROUND_Y - get_egg_lift[rule.type],
+                   visible)
+
+
+class World:
+    """The state of one game of Egg Jump
+
+    Call reset() to start a game with a character, then step() once per
+    frame with the player's input bits. Drawing is left to the caller,
+    player_pose and player_is_small tell it which sprite to use."""
+
+    def __init__(self, character=1, seed=None):
+        self.eggs = Track()
+        self.power_ups = Track()
+        self.cur_power_up = Player_power_up()
+        self.reset(character, seed)
+
+    def reset(self, character=1, seed=None):
+        """Start a new game with the chosen character (1, 2 or 3),
+        the same seed and inputs always play the same game. Without a
+        seed one is picked with the random module"""
+        if seed is None:
+            seed = random.getrandbits(32)
+        self.seed = seed
+        self.rng = random.Random(seed)  # all of this game's randomness
+        self.character = character
+        self.frame = 0  # used to keep track of score
+        self.jump_start_speed = -17  # the speed at which the player jumps
+        self.players_fall_speed = 0  # the current speed the player falls
+        self.player_is_small = False
+        self.player_pose = "walk"
+        self.player_rect = get_player_rect("walk", False,
+                                           bottomleft=(25, GROUND_Y))
+        # give the last game's eggs and power ups back to the pools
+        egg_pool.extend(self.eggs)
+        self.eggs.clear()
+        power_up_pool.extend(self.power_ups)
+        self.power_ups.clear()
+        self.cur_power_up.clear()
+        self.get_max_power_up_val = dict(DEFAULT_MAX_POWER_UP_VAL)
+
+        # spawn phase 1 eggs and space them out
+        rng = self.rng
+        self.eggs.append(get_egg(800, self.frame, rng))
+        self.eggs.append(get_egg(self.eggs[-1].rect.right, self.frame, rng))
+        self.eggs.append(get_egg(self.eggs[-1].rect.right, self.frame, rng))
+        self.eggs.append(get_egg(self.eggs[-1].rect.right, self.frame, rng))
+        # frame the first power up spawns on
+        self.next_power_up = get_power_up_wait(rng.random())
+
+        # each character has different stats and a better power up
+        if character == 1:
+            self.player_hp = 100
+            self.player_shield = 5
+            self.get_max_power_up_val["health"] *= 3
+        elif character == 2:
+            self.player_hp = 30
+            self.player_shield = 25
+            self.get_max_power_up_val["shield"] *= 2
+        else:
+            self.player_hp = 50
+            self.player_shield = 0
+            self.get_max_power_up_val["fly"] *= 2
+            self.get_max_power_up_val["small"] *= 2
+
+    def copy_to(self, other):
+        """Make `other` a copy of this game to look ahead with (see
+        autoplay.py). Its eggs and power ups come from the pools and
+        its random numbers are its own, so eggs that haven't spawned
+        yet can't be known"""
+        egg_pool.extend(other.eggs)
+        other.eggs.clear()
+        for egg in self.eggs:
+            copy = new_egg(egg.type, egg.rect.left, egg.rect.bottom,
+                           egg.visible)
+            copy.destroyed = egg.destroyed
+            other.eggs.append(copy)
+        power_up_pool.extend(other.power_ups)
+        other.power_ups.clear()
+        for power_up in self.power_ups:
+            other.power_ups.append(new_power_up(
+                power_up.type, power_up.rect.left, power_up.value))
+        other.cur_power_up.type = self.cur_power_up.type
+        other.cur_power_up.value = self.cur_power_up.value
+        other.player_rect.update(self.player_rect)
+        other.get_max_power_up_val = self.get_max_power_up_val  # not changed
+        other.character = self.character
+        other.frame = self.frame
+        other.jump_start_speed = self.jump_start_speed
+        other.players_fall_speed = self.players_fall_speed
+        other.player_is_small = self.player_is_small
+        other.player_pose = self.player_pose
+        other.next_power_up = self.next_power_up
+        other.player_hp = self.player_hp
+        other.player_shield = self.player_shield
+
+    @property
+    def score(self):
+        return self.frame // 4
+
+    @property
+    def dead(self):
+        return self.player_hp <= 0
+
+    def step(self, inputs=0):
+        """Advance the game by one frame using the INPUT_* bits and
+        return a list of Events that happened during the frame"""
+        events = []
+        player_rect = self.player_rect
+
+        # [space] or [up_arrow] to jump, you can hold down keys
+        if inputs & INPUT_JUMP and player_rect.bottom >= GROUND_Y:
+            self.players_fall_speed = self.jump_start_speed
+        # [down_arrow] to drop down from a jump or flying
+        elif inputs & INPUT_DROP and player_rect.bottom < GROUND_Y:
+            self.players_fall_speed = max(self.players_fall_speed,
+                                          -self.jump_start_speed * 0.75)
+            if self.cur_power_up.type == "fly":  # stop flying
+                self.players_fall_speed = -self.jump_start_speed * 0.75
+                self.cur_power_up.clear()
+
+        # reset power up dependent variables
+        self.jump_start_speed = -17
+        self.player_is_small = False
+
+        # heal over time
+        if self.cur_power_up.type == "health":
+            self.player_hp = min(100, self.player_hp + 0.2)
+        # gain shield over time
+        elif self.cur_power_up.type == "shield":
+            self.player_shield = min(25, self.player_shield + 0.2)
+        # start falling after finished flying
+        elif self.cur_power_up.type == "fly":
+            if self.cur_power_up.value == 1:
+                player_rect.y = 80
+                self.players_fall_speed = 0
+        # make player smaller so you don't need to crawl
+        # also jump higher
+        elif self.cur_power_up.type == "small":
+            self.jump_start_speed = -20
+            self.player_is_small = True
+
+        # reduce time remaining for power up
+        if self.cur_power_up.type:
+            self.cur_power_up.value -= 1
+            if self.cur_power_up.value <= 0:
+                self.cur_power_up.clear()
+
+        # adjust player's vertical location
+        self.players_fall_speed += GRAVITY
+        player_rect.y += self.players_fall_speed
+        # don't go below ground
+        player_rect.bottom = min(GROUND_Y, player_rect.bottom)
+
+        # check for player actions like jumping
+        self.update_player_pose(inputs)
+
+        # update the states of egg objects and check for collision
+        self.update_eggs(events)
+
+        # spawn power-ups around every 1000 frames
+        if self.frame >= self.next_power_up:
+            self.power_ups.add(self.get_power_up())
+            self.next_power_up = (self.frame + 1 +
+                                  get_power_up_wait(self.rng.random()))
+        self.update_power_ups(events)
+
+        if self.dead:
+            events.append(Event("death", "", self.player_rect.copy()))
+
+        # update frame which is used to keep track of current score
+        self.frame += 1
+        return events
+
+    def update_player_pose(self, inputs):
+        """Pick the player's animation and hitbox from their current
+        action, the hitbox is shrunk if the player is small"""
+        rect = self.player_rect  # changed in place
+        bottom = rect.bottom
+        sizes = get_small_player_size if self.player_is_small \
+            else get_player_size
+        # player is flying
+        if self.cur_power_up.type == "fly":
+            pose = "fly"
+            rect.size = sizes[pose]
+            rect.left = 15
+            rect.top = 80
+        # player is crawling
+        elif inputs & INPUT_DOWN and bottom == GROUND_Y:
+            # animate based on frame
+            pose = "crawl" if self.frame % 20 < 10 else "crawl2"
+            rect.size = sizes[pose]
+            rect.left = 15
+            rect.bottom = bottom
+        # player is walking or jumping
+        else:
+            if bottom != GROUND_Y:  # use jump animation
+                pose = "jump"
+            # on the ground, determine animation based on frame
+            elif self.frame % 20 < 10:
+                pose = "walk"
+            else:
+                pose = "walk2"
+            rect.size = sizes[pose]
+            rect.left = 25
+            rect.bottom = bottom
+        self.player_pose = pose
+
+    def update_eggs(self, events):
+        """Does the following actions on the egg objects:
+        1. move towards player
+        2. replace eggs that left the screen with new ones
+        3. check for collision with player and change player HP if needed"""
+        eggs = self.eggs
+        eggs.scroll(get_obstacle_speed(self.frame))
+        for _ in range(eggs.retire(egg_pool)):  # replace eggs with new ones
+            eggs.add(get_egg(eggs[-1].rect.right, self.frame, self.rng))
+
+        # handle player-egg collision, only eggs in the player's column
+        # can hit them
+        player_rect = self.player_rect
+        player_mask = get_player_mask[(self.player_pose,
+                                       self.player_is_small)]
+        for i in reversed(eggs.get_near(player_rect)):
+            egg = eggs[i]
+            # no collisions or egg has already hit player once
+            if not egg.rect.colliderect(player_rect) or egg.destroyed:
+                continue
+            # the rects overlap, check if any pixels do
+            if not player_mask.overlap(get_egg_mask[egg.type],
+                                       (egg.rect.x - player_rect.x,
+                                        egg.rect.y - player_rect.y)):
+                continue
+            # make sure the same egg doesn't deal damage again
+            egg.destroyed = True
+            hit_rect = egg.rect.copy()  # where the egg hit, for the event
+
+            # normal egg: instant kill or break shield
+            if (egg.type == "normal" or
+                    egg.type == "flying" or
+                    egg.type == "flying2"):
+                if self.player_shield > 0:
+                    self.player_shield = 0
+                    events.append(Event("shield_break", egg.type, hit_rect))
+                else:
+                    self.player_hp = 0
+                    events.append(Event("damage", egg.type, hit_rect))
+            # fried egg: take 20 damage
+            elif egg.type == "fried":
+                if self.player_shield > 0:
+                    self.player_shield = max(0, self.player_shield - 20)
+                    events.append(Event("shield_break", egg.type, hit_rect))
+                else:
+                    self.player_hp -= 20
+                    events.append(Event("damage", egg.type, hit_rect))
+
+    def update_power_ups(self, events):
+        """move power up spawns towards player and check if
+        the player picked up any"""
+        power_ups = self.power_ups
+        power_ups.scroll(get_obstacle_speed(self.frame))
+        power_ups.retire(power_up_pool)  # out of map, remove them
+
+        # check for collisions and update player's power up if needed,
+        # last one first so the first power up picked up wins
+        for i in reversed(power_ups.get_near(self.player_rect)):
+            power_up_obj = power_ups[i]
+            if power_up_obj.rect.colliderect(self.player_rect):
+                self.cur_power_up.type = power_up_obj.type
+                self.cur_power_up.value = power_up_obj.value
+                del power_ups[i]  # don't pick up power-up twice
+                power_up_pool.append(power_up_obj)
+                events.append(Event("pick_up", power_up_obj.type,
+                                    power_up_obj.rect.copy()))
+
+    def get_power_up(self):
+        """Spawns a power up object with equal probability"""
+        # make sure it doesn't fully overlap with eggs
+        location = 800
+        # eggs that end before 800 can't overlap, and eggs are in order
+        # so once one starts past the power up the rest do too
+        for egg in self.eggs.get_after(location - MAX_EGG_WIDTH):
+            egg_l = egg.rect.left
+            egg_r = egg.rect.right
+            if egg_l > location + 40:
+                break
+            if (egg_l <= location <= egg_r or
+                    location <= egg_l <= location + 40):
+                location = egg.rect.right + 20
+
+        # randomly decide what power up you get
+        choices = ["health", "shield", "fly", "small"]
+        # don't spawn power ups that are currently useless
+        # also apply character power up restrictions
+        if self.player_hp > 99 or self.character == 3:
+            choices.remove("health")
+        if self.character == 3:
+            choices.remove("shield")
+        chosen = self.rng.choice(choices)
+
+        # create Power_up object
+        return new_power_up(chosen, location,
+                            self.get_max_power_up_val[chosen])